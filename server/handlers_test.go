@@ -585,6 +585,49 @@ func TestHandleRecommendations(t *testing.T) {
 	}
 }
 
+// TestSampleRecipes tests the random recipe sampler used by the random recommendations
+func TestSampleRecipes(t *testing.T) {
+	db := setupTestDB(t)
+	defer db.Close()
+	seedTestData(t, db)
+
+	// A far away id leaves the id range mostly gaps
+	if _, err := db.Exec("INSERT INTO Recipe (id, name) VALUES (1000, 'Far Away Soup')"); err != nil {
+		t.Fatalf("Failed to insert test recipe: %v", err)
+	}
+
+	for _, number := range []int{1, 2, 4, 10} {
+		first, err := sampleRecipes(db, number, newSampleRand(`{"seed": 7}`))
+		if err != nil {
+			t.Fatalf("sampleRecipes failed: %v", err)
+		}
+		second, err := sampleRecipes(db, number, newSampleRand(`{"seed": 7}`))
+		if err != nil {
+			t.Fatalf("sampleRecipes failed: %v", err)
+		}
+
+		expected := number
+		if expected > 4 {
+			expected = 4
+		}
+		if len(first) != expected {
+			t.Errorf("Expected %d recipes, got %d", expected, len(first))
+		}
+
+		seen := make(map[int]bool)
+		for i, recipe := range first {
+			if seen[recipe.Id] {
+				t.Errorf("Recipe %d drawn twice", recipe.Id)
+			}
+			seen[recipe.Id] = true
+			if i >= len(second) || second[i].Id != recipe.Id {
+				t.Errorf("Same seed should draw the same recipes, got %v and %v", first, second)
+				break
+			}
+		}
+	}
+}
+
 // TestHandleSearchRecipes tests the handleSearchRecipes function
 func TestHandleSearchRecipes(t *testing.T) {
 	db := setupTestDB(t)
@@ -0,0 +1,173 @@
+package main
+
+import (
+	"database/sql"
+	"encoding/json"
+	"fmt"
+	"math/rand"
+	"strings"
+	"time"
+)
+
+// Rounds of rejection sampling before falling back to loading every id,
+// only reached when the id range is mostly gaps
+const maxSampleRounds = 8
+
+// Ids per IN (...) query, below SQLite's default parameter limit
+const sampleChunkSize = 500
+
+// newSampleRand seeds the sampler from the optional "seed" of the request data,
+// so seeded requests return the same recipes while the catalogue is unchanged
+func newSampleRand(data string) *rand.Rand {
+	var options struct {
+		Seed *int64 `json:"seed"`
+	}
+	if err := json.Unmarshal([]byte(data), &options); err == nil && options.Seed != nil {
+		return rand.New(rand.NewSource(*options.Seed))
+	}
+	return rand.New(rand.NewSource(time.Now().UnixNano()))
+}
+
+// sampleRecipes draws up to number distinct recipes uniformly at random without
+// ORDER BY RANDOM(), which computes a key for every row and sorts the table.
+// Ids are drawn from the [MIN(id), MAX(id)] rowid range and looked up through
+// the primary key; ids falling in gaps are simply redrawn.
+func sampleRecipes(db *sql.DB, number int, rng *rand.Rand) ([]ShortRecipe, error) {
+	if number <= 0 {
+		return nil, nil
+	}
+
+	var minId, maxId sql.NullInt64
+	if err := db.QueryRow("SELECT MIN(id), MAX(id) FROM Recipe").Scan(&minId, &maxId); err != nil {
+		return nil, err
+	}
+	if !minId.Valid {
+		return nil, nil
+	}
+
+	span := maxId.Int64 - minId.Int64 + 1
+	if span <= int64(number)*4 {
+		// Small range: sampling from the id list is cheaper than rejection
+		return sampleFromAllIds(db, number, rng)
+	}
+
+	var recipes []ShortRecipe
+	tried := make(map[int64]bool)
+	for round := 0; round < maxSampleRounds && len(recipes) < number; round++ {
+		var batch []int64
+		for len(batch) < (number-len(recipes))*2 && int64(len(tried)) < span {
+			id := minId.Int64 + rng.Int63n(span)
+			if !tried[id] {
+				tried[id] = true
+				batch = append(batch, id)
+			}
+		}
+
+		found, err := fetchShortRecipes(db, batch)
+		if err != nil {
+			return nil, err
+		}
+		for _, id := range batch {
+			if recipe, ok := found[id]; ok && len(recipes) < number {
+				recipes = append(recipes, recipe)
+			}
+		}
+	}
+
+	if len(recipes) < number {
+		return sampleFromAllIds(db, number, rng)
+	}
+	return recipes, nil
+}
+
+// sampleFromAllIds loads every recipe id and draws number of them with a partial Fisher-Yates shuffle
+func sampleFromAllIds(db *sql.DB, number int, rng *rand.Rand) ([]ShortRecipe, error) {
+	rows, err := db.Query("SELECT id FROM Recipe ORDER BY id")
+	if err != nil {
+		return nil, err
+	}
+	var ids []int64
+	for rows.Next() {
+		var id int64
+		if err := rows.Scan(&id); err != nil {
+			rows.Close()
+			return nil, err
+		}
+		ids = append(ids, id)
+	}
+	rows.Close()
+	if err := rows.Err(); err != nil {
+		return nil, err
+	}
+
+	if number > len(ids) {
+		number = len(ids)
+	}
+	for i := 0; i < number; i++ {
+		j := i + rng.Intn(len(ids)-i)
+		ids[i], ids[j] = ids[j], ids[i]
+	}
+
+	found, err := fetchShortRecipes(db, ids[:number])
+	if err != nil {
+		return nil, err
+	}
+	var recipes []ShortRecipe
+	for _, id := range ids[:number] {
+		if recipe, ok := found[id]; ok {
+			recipes = append(recipes, recipe)
+		}
+	}
+	return recipes, nil
+}
+
+// fetchShortRecipes looks recipes up by primary key; ids that do not exist are absent from the result
+func fetchShortRecipes(db *sql.DB, ids []int64) (map[int64]ShortRecipe, error) {
+	recipes := make(map[int64]ShortRecipe, len(ids))
+	for start := 0; start < len(ids); start += sampleChunkSize {
+		end := start + sampleChunkSize
+		if end > len(ids) {
+			end = len(ids)
+		}
+		if err := fetchShortRecipesChunk(db, ids[start:end], recipes); err != nil {
+			return nil, err
+		}
+	}
+	return recipes, nil
+}
+
+func fetchShortRecipesChunk(db *sql.DB, ids []int64, recipes map[int64]ShortRecipe) error {
+	args := make([]interface{}, len(ids))
+	for i, id := range ids {
+		args[i] = id
+	}
+	query := fmt.Sprintf(`
+		SELECT id, name, total_time, images
+		FROM Recipe
+		WHERE id IN (%s)`, strings.TrimSuffix(strings.Repeat("?,", len(ids)), ","))
+
+	rows, err := db.Query(query, args...)
+	if err != nil {
+		return err
+	}
+	defer rows.Close()
+
+	for rows.Next() {
+		var recipe ShortRecipe
+		var images *string
+		var totalTime sql.NullInt64
+		if err := rows.Scan(&recipe.Id, &recipe.Name, &totalTime, &images); err != nil {
+			return err
+		}
+		if images != nil {
+			recipe.ImageURL = *images
+		}
+		if totalTime.Valid {
+			recipe.TotalTime = int(totalTime.Int64)
+		} else {
+			recipe.TotalTime = -1
+		}
+		recipes[int64(recipe.Id)] = recipe
+	}
+	return rows.Err()
+}
@@ -1,12 +1,9 @@
 package main
 
 import (
-	"database/sql"
 	"encoding/json"
 	"fmt"
 	"net/http"
-	"os/exec"
-	"strconv"
 
 	_ "github.com/mattn/go-sqlite3"
 )
@@ -32,45 +29,12 @@ func (h *Handler) handleRecommendations(w http.ResponseWriter, r *http.Request)
 
 	switch recoType {
 	case RANDOM:
-		// Get random recipes from database
-		query := `
-			SELECT id, name, total_time, images
-			FROM Recipe
-			ORDER BY RANDOM()
-			LIMIT ?`
-
-		rows, err := h.db.Query(query, number)
+		// Draw random recipes through the primary key instead of sorting the whole table
+		recipes, err := sampleRecipes(h.db, number, newSampleRand(data))
 		if err != nil {
 			http.Error(w, fmt.Sprintf("Database query error: %v", err), http.StatusInternalServerError)
 			return
 		}
-		defer rows.Close()
-
-		var recipes []ShortRecipe
-		for rows.Next() {
-			var recipe ShortRecipe
-			var images *string
-			var totalTime sql.NullInt64
-			err := rows.Scan(&recipe.Id, &recipe.Name, &totalTime, &images)
-			if err != nil {
-				http.Error(w, fmt.Sprintf("Row scan error: %v", err), http.StatusInternalServerError)
-				return
-			}
-			if images != nil {
-				recipe.ImageURL = *images
-			}
-			if totalTime.Valid {
-				recipe.TotalTime = int(totalTime.Int64)
-			} else {
-				recipe.TotalTime = -1
-			}
-			recipes = append(recipes, recipe)
-		}
-
-		if err = rows.Err(); err != nil {
-			http.Error(w, fmt.Sprintf("Rows iteration error: %v", err), http.StatusInternalServerError)
-			return
-		}
 
 		w.Header().Set("Content-Type", "application/json")
 		if err := json.NewEncoder(w).Encode(recipes); err != nil {
@@ -83,9 +47,7 @@ func (h *Handler) handleRecommendations(w http.ResponseWriter, r *http.Request)
 		return
 
 	case NUTRIMENTS:
-		cmd := exec.Command("python3", "recommendations/src/recommendation_api.py", "nutriments", data, strconv.Itoa(number))
-		cmd.Dir = "." // Set working directory to server root
-		output, err := cmd.Output()
+		output, err := runRecommendation("nutriments", data, number)
 		if err != nil {
 			http.Error(w, fmt.Sprintf("Nutriments recommendation error: %v", err), http.StatusInternalServerError)
 			return
@@ -0,0 +1,83 @@
+package main
+
+import (
+	"bufio"
+	"encoding/json"
+	"fmt"
+	"net"
+	"os"
+	"os/exec"
+	"strconv"
+	"time"
+)
+
+// Unix socket of a long-lived recommendation_worker.py. When unset, each
+// request falls back to spawning recommendation_api.py.
+const recommendationSocketEnv = "RECOMMENDATION_WORKER_SOCKET"
+
+type workerRequest struct {
+	Id     int             `json:"id"`
+	Method string          `json:"method"`
+	Type   string          `json:"type"`
+	Data   json.RawMessage `json:"data"`
+	Number int             `json:"number"`
+}
+
+type workerResponse struct {
+	Id     int             `json:"id"`
+	Result json.RawMessage `json:"result"`
+	Error  string          `json:"error"`
+}
+
+// runRecommendation returns the raw JSON produced by the Python recommendation API
+func runRecommendation(recoType string, data string, number int) ([]byte, error) {
+	if socketPath := os.Getenv(recommendationSocketEnv); socketPath != "" {
+		return callRecommendationWorker(socketPath, recoType, data, number)
+	}
+
+	cmd := exec.Command("python3", "recommendations/src/recommendation_api.py", recoType, data, strconv.Itoa(number))
+	cmd.Dir = "." // Set working directory to server root
+	return cmd.Output()
+}
+
+func callRecommendationWorker(socketPath string, recoType string, data string, number int) ([]byte, error) {
+	if !json.Valid([]byte(data)) {
+		return nil, fmt.Errorf("invalid JSON data")
+	}
+
+	conn, err := net.DialTimeout("unix", socketPath, time.Second)
+	if err != nil {
+		return nil, fmt.Errorf("worker connection error: %v", err)
+	}
+	defer conn.Close()
+	conn.SetDeadline(time.Now().Add(30 * time.Second))
+
+	request, err := json.Marshal(workerRequest{
+		Id:     1,
+		Method: "recommend",
+		Type:   recoType,
+		Data:   json.RawMessage(data),
+		Number: number,
+	})
+	if err != nil {
+		return nil, err
+	}
+	if _, err := conn.Write(append(request, '\n')); err != nil {
+		return nil, fmt.Errorf("worker write error: %v", err)
+	}
+
+	reader := bufio.NewReader(conn)
+	line, err := reader.ReadBytes('\n')
+	if err != nil {
+		return nil, fmt.Errorf("worker read error: %v", err)
+	}
+
+	var response workerResponse
+	if err := json.Unmarshal(line, &response); err != nil {
+		return nil, fmt.Errorf("worker response error: %v", err)
+	}
+	if response.Error != "" {
+		return nil, fmt.Errorf("worker error: %s", response.Error)
+	}
+	return response.Result, nil
+}
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the recommendation API.
+Spawns a fresh interpreter per run, the way recommendation.go does, and reports
+process wall time, import time and first-request time for each recommendation type.
+
+Usage: python cold_start_benchmark.py [--db PATH] [--runs N] [--types t1,t2,...]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List
+
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+DEFAULT_DB = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'homeal.db'))
+
+EXAMPLE_DATA = {
+    "random": {},
+    "nutriments": {
+        "age": 30,
+        "gender": "male",
+        "weight": 75.0,
+        "height": 180.0,
+        "activity_level": "moderately_active",
+        "meal_type": "lunch"
+    },
+    "ingredients": {
+        "ingredients": [
+            {"name": "tomato", "quantity": 2, "unit": "pieces", "expiration_date": "2024-01-15"},
+            {"name": "cheese", "quantity": 200, "unit": "g", "expiration_date": "2024-01-20"}
+        ]
+    },
+    "preferences": {
+        "user_id": 90001,
+        "ratings": [
+            {"recipe_id": 117, "rating": 5.0},
+            {"recipe_id": 374, "rating": 4.5},
+            {"recipe_id": 479, "rating": 4.0}
+        ]
+    }
+}
+
+# Runs inside the child interpreter; timings are relative to the child's own start
+CHILD_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {src_dir!r})
+from recommendation_api import RecommendationAPI
+imported = time.perf_counter()
+api = RecommendationAPI({db_path!r}, cache_size=0)
+result = api.get_recommendations({reco_type!r}, {data!r}, 5)
+done = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "request_ms": (done - imported) * 1000,
+    "error": result.get("error"),
+    "pandas_loaded": "pandas" in sys.modules,
+    "numpy_loaded": "numpy" in sys.modules
+}}))
+"""
+
+
+def run_once(reco_type: str, db_path: str) -> Dict[str, Any]:
+    """Run one cold request in a new interpreter and return its timings."""
+    script = CHILD_SCRIPT.format(
+        src_dir=SRC_DIR,
+        db_path=db_path,
+        reco_type=reco_type,
+        data=json.dumps(EXAMPLE_DATA[reco_type])
+    )
+
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    measurement = json.loads(output.stdout.strip().splitlines()[-1])
+    measurement["wall_ms"] = wall_ms
+    return measurement
+
+
+def summarize(values: List[float]) -> str:
+    ordered = sorted(values)
+    p90 = ordered[min(len(ordered) - 1, int(round(0.9 * (len(ordered) - 1))))]
+    return f"{statistics.median(ordered):8.1f} {p90:8.1f}"
+
+
+def main():
+    args = sys.argv[1:]
+    db_path = DEFAULT_DB
+    runs = 10
+    types = list(EXAMPLE_DATA)
+
+    while args:
+        arg = args.pop(0)
+        if arg == "--db" and args:
+            db_path = os.path.abspath(args.pop(0))
+        elif arg == "--runs" and args:
+            runs = int(args.pop(0))
+        elif arg == "--types" and args:
+            types = args.pop(0).split(",")
+        else:
+            print(__doc__.strip().splitlines()[-1])
+            sys.exit(1)
+
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}")
+        sys.exit(1)
+
+    print(f"Cold start over {runs} runs (median / p90, ms)")
+    print(f"{'type':<12} {'wall':>17} {'import':>17} {'request':>17}  heavy modules")
+    for reco_type in types:
+        measurements = [run_once(reco_type, db_path) for _ in range(runs)]
+        heavy = [name for name in ("numpy", "pandas") if measurements[-1][f"{name}_loaded"]]
+        errors = {m["error"] for m in measurements if m["error"]}
+        print(
+            f"{reco_type:<12} "
+            f"{summarize([m['wall_ms'] for m in measurements])} "
+            f"{summarize([m['import_ms'] for m in measurements])} "
+            f"{summarize([m['request_ms'] for m in measurements])}  "
+            f"{', '.join(heavy) or '-'}"
+            + (f"  errors: {'; '.join(errors)}" if errors else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
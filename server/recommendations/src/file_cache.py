@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Caches of data derived from a file, usually the SQLite database, one entry per file version.
+
+A version is the file's (absolute path, mtime, size). Caching a new version of a file drops
+the entries of its older versions, so a long-lived worker holds one copy of each structure per
+database. Caches are locked, so the threads of a socket server can share them.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def file_version(path: str) -> tuple:
+    """(absolute path, mtime, size) of a file. Raises FileNotFoundError if it does not exist."""
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+class VersionedCache:
+    """
+    Values built from files, keyed by file version and an optional extra key.
+    With max_entries, the least recently used entries are dropped first.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, build: Callable[[], Any], key: Hashable = None) -> Any:
+        """
+        The value for the current version of `path` and `key`, calling `build()` on a miss.
+        The lock is not held while building: threads missing together may both build, and
+        the first value stored is kept.
+        """
+        version = file_version(path)
+        entry = (version, key)
+        with self._lock:
+            if entry in self._entries:
+                self._entries.move_to_end(entry)
+                return self._entries[entry]
+
+        value = build()
+        with self._lock:
+            if entry in self._entries:
+                return self._entries[entry]
+            # Older versions of the same file are never used again
+            for stale in [cached for cached in self._entries if cached[0][0] == version[0] and cached[0] != version]:
+                del self._entries[stale]
+            self._entries[entry] = value
+            while self.max_entries is not None and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
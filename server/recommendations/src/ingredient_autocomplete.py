@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Ingredient autocomplete for the app's search bar.
+Ingredient names are loaded once per database version into a compressed prefix trie
+(radix tree), keyed by every word start so "oil" also completes "olive oil". Each node
+stores its best completions, ranked by how many recipes use the ingredient, so a
+keystroke costs one walk down the prefix whatever the vocabulary size.
+"""
+
+import sqlite3
+from typing import Dict, Any, List, Optional, Tuple
+
+from file_cache import VersionedCache
+
+# Completions stored per node, the largest limit a lookup can ask for
+MAX_COMPLETIONS = 20
+
+# Database version -> trie
+_trie_cache = VersionedCache()
+
+
+def normalize_prefix(text: str) -> str:
+    """Lowercase text with single spaces; a trailing space is kept since it ends a word."""
+    normalized = " ".join(text.lower().split())
+    if normalized and text[-1:].isspace():
+        normalized += " "
+    return normalized
+
+
+class _Node:
+    __slots__ = ("edges", "entries", "top")
+
+    def __init__(self):
+        self.edges: Dict[str, Tuple[str, '_Node']] = {}  # first character -> (label, child)
+        self.entries: List[int] = []  # Entries whose key ends here
+        self.top: List[int] = []
+
+
+class AutocompleteTrie:
+    """
+    Radix tree over ingredient names. `entries` holds (id, name, recipe count) sorted by
+    rank, so entries are referred to by their rank and a node's best completions are
+    simply its smallest entry numbers.
+    """
+
+    def __init__(self, entries: List[Tuple[int, str, int]]):
+        self.entries = sorted(entries, key=lambda entry: (-entry[2], entry[1], entry[0]))
+        self.root = _Node()
+        for rank, (_, name, _) in enumerate(self.entries):
+            words = name.split(" ")
+            for start in range(len(words)):
+                self._insert(" ".join(words[start:]), rank)
+        self._collect(self.root)
+
+    def _insert(self, key: str, rank: int) -> None:
+        node = self.root
+        while key:
+            edge = node.edges.get(key[0])
+            if edge is None:
+                child = _Node()
+                node.edges[key[0]] = (key, child)
+                node = child
+                break
+
+            label, child = edge
+            common = 0
+            while common < min(len(label), len(key)) and label[common] == key[common]:
+                common += 1
+            if common < len(label):
+                # Split the edge at the end of the common part
+                middle = _Node()
+                middle.edges[label[common]] = (label[common:], child)
+                node.edges[key[0]] = (label[:common], middle)
+                child = middle
+            node = child
+            key = key[common:]
+        node.entries.append(rank)
+
+    def _collect(self, root: '_Node') -> None:
+        """Fill every node's best completions bottom-up, without recursion."""
+        stack = [(root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if not children_done:
+                stack.append((node, True))
+                stack.extend((child, False) for _, child in node.edges.values())
+                continue
+            ranks = set(node.entries)
+            for _, child in node.edges.values():
+                ranks.update(child.top)
+            node.top = sorted(ranks)[:MAX_COMPLETIONS]
+
+    def _find(self, prefix: str) -> Optional['_Node']:
+        node = self.root
+        while prefix:
+            edge = node.edges.get(prefix[0])
+            if edge is None:
+                return None
+            label, child = edge
+            if prefix.startswith(label):
+                prefix = prefix[len(label):]
+                node = child
+            elif label.startswith(prefix):
+                return child
+            else:
+                return None
+        return node
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Most used ingredients with a word starting with prefix.
+
+        Args:
+            prefix: Text typed so far (case and extra spaces are ignored)
+            limit: Number of completions, at most MAX_COMPLETIONS
+
+        Returns:
+            [{"id", "name", "recipe_count"}], most used first
+        """
+        if limit < 1 or limit > MAX_COMPLETIONS:
+            raise ValueError(f"limit must be between 1 and {MAX_COMPLETIONS}")
+
+        node = self._find(normalize_prefix(prefix))
+        if node is None:
+            return []
+        return [
+            {"id": ingredient_id, "name": name, "recipe_count": count}
+            for ingredient_id, name, count in (self.entries[rank] for rank in node.top[:limit])
+        ]
+
+
+def build_autocomplete_trie(db_path: str) -> AutocompleteTrie:
+    """
+    Read the ingredient names and their recipe counts into a new trie. Names differing
+    only in case or spacing are merged under the lowest ingredient id.
+    """
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("""
+        SELECT i.id, i.name, COUNT(ri.recipe_id)
+        FROM Ingredient i
+        LEFT JOIN RecipeIngredient ri ON ri.ingredient_id = i.id
+        GROUP BY i.id
+        ORDER BY i.id
+    """).fetchall()
+    conn.close()
+
+    merged: Dict[str, List[int]] = {}
+    for ingredient_id, name, count in rows:
+        normalized = " ".join(name.lower().split())
+        if not normalized:
+            continue
+        if normalized in merged:
+            merged[normalized][1] += count
+        else:
+            merged[normalized] = [ingredient_id, count]
+    return AutocompleteTrie([(ingredient_id, name, count) for name, (ingredient_id, count) in merged.items()])
+
+
+def load_autocomplete_trie(db_path: str) -> AutocompleteTrie:
+    """The trie of a database, built on first use and cached per database version."""
+    return _trie_cache.get(db_path, lambda: build_autocomplete_trie(db_path))
+
+
+def autocomplete_ingredients(db_path: str, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Completions of prefix from the ingredients of a database."""
+    return load_autocomplete_trie(db_path).complete(prefix, limit)
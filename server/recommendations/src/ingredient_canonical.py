@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Canonical ingredient vocabulary.
+
+Ingredient names are normalized (case, punctuation, whitespace, plurals) and mapped
+through a synonym table, then dictionary-encoded: each canonical ingredient gets a
+stable integer id. An offline pass stores the encoding in the CanonicalIngredient and
+IngredientCanonical side tables; fridge names are resolved to ids through in-memory
+token and trigram indexes, so matching is done with integer sets instead of string comparisons.
+
+Usage: python ingredient_canonical.py [--db PATH]
+"""
+
+import os
+import re
+import sqlite3
+import sys
+from typing import Dict, List, Set, Tuple
+
+from file_cache import VersionedCache
+from ingredient_trigram import TrigramIndex
+
+CANONICAL_TABLE = "CanonicalIngredient"
+MAPPING_TABLE = "IngredientCanonical"
+
+# Normalized name -> canonical name; single words also apply inside longer names
+SYNONYMS = {
+    "aubergine": "eggplant",
+    "courgette": "zucchini",
+    "capsicum": "bell pepper",
+    "scallion": "green onion",
+    "spring onion": "green onion",
+    "garbanzo bean": "chickpea",
+    "garbanzo": "chickpea",
+    "cilantro": "coriander",
+    "prawn": "shrimp",
+    "rocket": "arugula",
+    "minced beef": "ground beef",
+    "beef mince": "ground beef",
+    "icing sugar": "powdered sugar",
+    "confectioner sugar": "powdered sugar",
+    "caster sugar": "superfine sugar",
+    "plain flour": "all purpose flour",
+    "bicarbonate of soda": "baking soda",
+    "double cream": "heavy cream",
+    "maize": "corn",
+}
+
+# Plurals that the suffix rules get wrong
+IRREGULAR_SINGULARS = {
+    "leaves": "leaf",
+    "loaves": "loaf",
+    "halves": "half",
+    "knives": "knife",
+    "geese": "goose",
+    "mice": "mouse",
+}
+
+# Words ending in s that are not plurals
+INVARIANT_WORDS = {"asparagus", "couscous", "hummus", "molasses", "swiss", "citrus", "octopus", "series"}
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+# Database version -> vocabulary
+_vocabulary_cache = VersionedCache()
+
+
+def singularize(word: str) -> str:
+    """Singular form of one lowercase word."""
+    if word in IRREGULAR_SINGULARS:
+        return IRREGULAR_SINGULARS[word]
+    if len(word) <= 3 or word in INVARIANT_WORDS or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes", "sses")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def canonical_name(name: str) -> str:
+    """
+    Canonical form of an ingredient name: lowercase singular words separated by single
+    spaces, with synonyms replaced. "Cherry  Tomatoes" -> "cherry tomato".
+    """
+    # Apostrophes join their word ("confectioners'" -> "confectioners"), other symbols split words
+    words = _NON_WORD.sub(" ", name.lower().replace("'", "")).split()
+    phrase = " ".join(singularize(word) for word in words)
+    if phrase in SYNONYMS:
+        return SYNONYMS[phrase]
+    return " ".join(SYNONYMS.get(word, word) for word in phrase.split())
+
+
+def name_matches(term: str, ingredient_name: str) -> bool:
+    """Whether a fridge term matches an ingredient: all its canonical words appear in the ingredient's."""
+    term_words = set(canonical_name(term).split())
+    return bool(term_words) and term_words <= set(canonical_name(ingredient_name).split())
+
+
+class CanonicalVocabulary:
+    """
+    Dictionary encoding of the ingredient vocabulary.
+
+    `names` maps canonical id -> canonical name and `ingredient_canonical` maps
+    Ingredient.id -> canonical id. Token and trigram indexes resolve fridge names to ids.
+    """
+
+    def __init__(self, names: Dict[int, str], ingredient_canonical: Dict[int, int]):
+        self.names = names
+        self.ingredient_canonical = ingredient_canonical
+        self.ids_by_name = {name: canonical_id for canonical_id, name in names.items()}
+        self.size = max(names, default=-1) + 1  # Ids are dense enough to index arrays
+
+        ids_by_token: Dict[str, Set[int]] = {}
+        for canonical_id, name in names.items():
+            for token in set(name.split()):
+                ids_by_token.setdefault(token, set()).add(canonical_id)
+        self.ids_by_token = {token: frozenset(ids) for token, ids in ids_by_token.items()}
+
+        self.tokens = sorted(self.ids_by_token)
+        self.trigram_index = TrigramIndex(names)
+        self.token_trigram_index = TrigramIndex(dict(enumerate(self.tokens)))
+
+    def lookup(self, name: str) -> Set[int]:
+        """
+        Ids of the canonical ingredients a user-supplied name refers to: those containing
+        all its canonical words. "chicken" finds "chicken breast", "egg" does not find "eggplant".
+        Names without such a match (typos, scanned product names) resolve by trigram
+        similarity: to the most similar canonical names, else to the ingredients containing
+        the most words similar to the name's words.
+        """
+        canonical = canonical_name(name)
+        tokens = canonical.split()
+        if not tokens:
+            return set()
+        postings = sorted((self.ids_by_token.get(token, frozenset()) for token in set(tokens)), key=len)
+        ids = set(postings[0]).intersection(*postings[1:])
+        if ids:
+            return ids
+
+        matches = self.trigram_index.search(canonical)
+        if matches:
+            return {canonical_id for canonical_id, score in matches if score == matches[0][1]}
+
+        # Scanned names carry brands, sizes and typos: correct each word on its own
+        word_counts: Dict[int, int] = {}
+        for token in set(tokens):
+            corrections = self.token_trigram_index.search(token)
+            for token_id, score in corrections:
+                if score == corrections[0][1]:
+                    for canonical_id in self.ids_by_token[self.tokens[token_id]]:
+                        word_counts[canonical_id] = word_counts.get(canonical_id, 0) + 1
+        if not word_counts:
+            return set()
+        most = max(word_counts.values())
+        return {canonical_id for canonical_id, count in word_counts.items() if count == most}
+
+    def search(self, name: str, limit: int = 5) -> List[Tuple[int, float]]:
+        """Canonical ingredients most similar to a name, as (id, similarity) pairs."""
+        return self.trigram_index.search(canonical_name(name), limit)
+
+    def lookup_all(self, names: List[str]) -> Set[int]:
+        """Union of the ids of several names."""
+        ids: Set[int] = set()
+        for name in names:
+            ids |= self.lookup(name)
+        return ids
+
+
+def _encode(ingredients: List[Tuple[int, str]], names: Dict[int, str]) -> Dict[int, int]:
+    """
+    Map ingredients to canonical ids, keeping the ids already in `names` and appending
+    new canonical names (in sorted order, so the result is deterministic).
+    """
+    ids_by_name = {name: canonical_id for canonical_id, name in names.items()}
+    canonical = {ingredient_id: canonical_name(name) for ingredient_id, name in ingredients}
+
+    next_id = max(names, default=0) + 1
+    for name in sorted(set(canonical.values()) - set(ids_by_name)):
+        names[next_id] = name
+        ids_by_name[name] = next_id
+        next_id += 1
+
+    return {ingredient_id: ids_by_name[name] for ingredient_id, name in canonical.items()}
+
+
+def _read_canonical_names(conn: sqlite3.Connection) -> Dict[int, str]:
+    try:
+        return dict(conn.execute(f"SELECT id, name FROM {CANONICAL_TABLE}").fetchall())
+    except sqlite3.Error:
+        return {}  # Not built
+
+
+def build_canonical_tables(db_path: str) -> int:
+    """
+    Offline pass: canonicalize every Ingredient into the side tables. Canonical ids
+    already stored are kept, so they stay stable across rebuilds.
+
+    Returns:
+        Number of canonical ingredients
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    names = _read_canonical_names(conn)
+    ingredients = cursor.execute("SELECT id, name FROM Ingredient").fetchall()
+    mapping = _encode(ingredients, names)
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CANONICAL_TABLE} (
+            id INTEGER PRIMARY KEY NOT NULL,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute(f"DROP TABLE IF EXISTS {MAPPING_TABLE}")
+    cursor.execute(f"""
+        CREATE TABLE {MAPPING_TABLE} (
+            ingredient_id INTEGER PRIMARY KEY NOT NULL,
+            canonical_id INTEGER NOT NULL
+        )
+    """)
+    cursor.executemany(f"INSERT OR IGNORE INTO {CANONICAL_TABLE} (id, name) VALUES (?, ?)", names.items())
+    cursor.executemany(
+        f"INSERT INTO {MAPPING_TABLE} (ingredient_id, canonical_id) VALUES (?, ?)", mapping.items()
+    )
+
+    conn.commit()
+    conn.close()
+
+    # The database file changed, older cache entries are unreachable anyway
+    _vocabulary_cache.clear()
+    return len(names)
+
+
+def read_canonical_vocabulary(db_path: str) -> CanonicalVocabulary:
+    """Read the stored encoding, encoding in memory the ingredients it lacks."""
+    conn = sqlite3.connect(db_path)
+    names = _read_canonical_names(conn)
+    try:
+        mapping = dict(conn.execute(f"SELECT ingredient_id, canonical_id FROM {MAPPING_TABLE}").fetchall())
+    except sqlite3.Error:
+        mapping = {}
+    ingredients = conn.execute("SELECT id, name FROM Ingredient").fetchall()
+    conn.close()
+
+    unmapped = [(ingredient_id, name) for ingredient_id, name in ingredients if ingredient_id not in mapping]
+    mapping.update(_encode(unmapped, names))
+    return CanonicalVocabulary(names, mapping)
+
+
+def load_canonical_vocabulary(db_path: str) -> CanonicalVocabulary:
+    """
+    The vocabulary of a database, cached per database version. Uses the stored encoding
+    when built; ingredients added since (or every ingredient, if never built) are encoded
+    in memory with ids after the stored ones.
+    """
+    return _vocabulary_cache.get(db_path, lambda: read_canonical_vocabulary(db_path))
+
+
+def main():
+    args = sys.argv[1:]
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../homeal.db")
+    if len(args) == 2 and args[0] == "--db":
+        db_path = args[1]
+    elif args:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    count = build_canonical_tables(db_path)
+    print(f"Encoded {count} canonical ingredients into {CANONICAL_TABLE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+In-memory recipe x ingredient matrix for leftover scoring.
+Built once per database version as CSR numpy arrays over canonical ingredient ids, so
+coverage, expiry bonus and missing-ingredient counts of a fridge are computed for every
+recipe in the catalogue with one sparse matrix-vector product. A CSC copy gives the
+posting list of each ingredient for top-k traversal.
+"""
+
+import sqlite3
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+from file_cache import VersionedCache
+from ingredient_canonical import CanonicalVocabulary, load_canonical_vocabulary
+from ingredient_units import UNKNOWN, to_base_amount
+
+# Relative slack when comparing amounts, so rounding in unit conversions never flips a comparison
+AMOUNT_TOLERANCE = 1e-6
+
+# Database version -> index
+_index_cache = VersionedCache()
+
+
+class IngredientIndex:
+    """
+    CSR matrix with one row per recipe and one column per canonical ingredient id.
+
+    Row i holds recipe `recipe_ids[i]`; its canonical ingredient ids are
+    `indices[indptr[i]:indptr[i + 1]]`, ascending, one entry per RecipeIngredient row, so
+    row sums count matched ingredients exactly like scanning the recipe's ingredient list.
+    Each entry also carries the recipe's quantity normalized to base units
+    (`entry_dimensions`, `entry_amounts`, see ingredient_units).
+    """
+
+    def __init__(self, vocabulary: CanonicalVocabulary, recipe_ids: 'np.ndarray',
+                 indptr: 'np.ndarray', indices: 'np.ndarray',
+                 entry_dimensions: Optional['np.ndarray'] = None, entry_amounts: Optional['np.ndarray'] = None):
+        self.vocabulary = vocabulary
+        self.recipe_ids = recipe_ids
+        self.indptr = indptr
+        self.recipe_sizes = indptr[1:] - indptr[:-1]
+        if entry_dimensions is None:
+            entry_dimensions = np.zeros(len(indices), dtype=np.int8)
+        if entry_amounts is None:
+            entry_amounts = np.zeros(len(indices))
+
+        # Sort each row's entries by canonical id
+        entry_rows = np.repeat(np.arange(len(recipe_ids), dtype=np.int64), self.recipe_sizes)
+        order = np.lexsort((indices, entry_rows))
+        self.indices = indices[order]
+        self.entry_dimensions = entry_dimensions[order]
+        self.entry_amounts = entry_amounts[order]
+        self._build_columns()
+
+    def _build_columns(self) -> None:
+        """
+        Column (CSC) view for posting-list traversal: the rows of canonical id c are
+        `column_rows[column_indptr[c]:column_indptr[c + 1]]`, ascending, with the number of
+        the row's ingredients mapping to c in `column_counts`. Per column, `column_max_share`
+        is the largest count / recipe size and `column_max_count` the largest count, the
+        upper bounds of the column's contribution to a leftover score.
+        """
+        columns = self.vocabulary.size
+        entry_rows = np.repeat(np.arange(len(self.recipe_ids), dtype=np.int64), self.recipe_sizes)
+        order = np.lexsort((entry_rows, self.indices))
+        sorted_columns = self.indices[order].astype(np.int64)
+        sorted_rows = entry_rows[order]
+
+        # Collapse repeated (column, row) pairs into counts
+        starts = np.flatnonzero(np.concatenate((
+            [True], (np.diff(sorted_columns) != 0) | (np.diff(sorted_rows) != 0)
+        ))) if len(order) else np.zeros(0, dtype=np.int64)
+        unique_columns = sorted_columns[starts]
+        self.column_rows = sorted_rows[starts]
+        self.column_counts = np.diff(np.append(starts, len(order)))
+        self.column_indptr = np.searchsorted(unique_columns, np.arange(columns + 1))
+
+        shares = self.column_counts / self.recipe_sizes[self.column_rows]
+        self.column_max_share = np.zeros(columns)
+        self.column_max_count = np.zeros(columns, dtype=np.int64)
+        np.maximum.at(self.column_max_share, unique_columns, shares)
+        np.maximum.at(self.column_max_count, unique_columns, self.column_counts)
+
+    def _entry_positions(self, rows: 'np.ndarray') -> tuple:
+        """Positions of the entries of rows, row after row, and where each row starts among them."""
+        lengths = self.recipe_sizes[rows]
+        row_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+        positions = np.arange(lengths.sum()) + np.repeat(self.indptr[rows] - row_starts, lengths)
+        return positions, row_starts
+
+    def column(self, canonical_id: int) -> tuple:
+        """(rows, counts) of the recipes using a canonical ingredient, rows ascending."""
+        start, end = self.column_indptr[canonical_id], self.column_indptr[canonical_id + 1]
+        return self.column_rows[start:end], self.column_counts[start:end]
+
+    def indicator(self, terms: Iterable[str]) -> 'np.ndarray':
+        """0/1 vector over canonical ids, set for every ingredient matched by one of the terms."""
+        vector = np.zeros(self.vocabulary.size, dtype=np.int32)
+        vector[list(self.vocabulary.lookup_all(list(terms)))] = 1
+        return vector
+
+    def multiply(self, vectors: 'np.ndarray') -> 'np.ndarray':
+        """
+        Sparse product of the matrix with one or more ingredient vectors.
+
+        Args:
+            vectors: (ingredients,) or (ingredients, k) array
+
+        Returns:
+            (recipes,) or (recipes, k) array
+        """
+        if not len(self.recipe_ids):
+            return np.zeros((0,) + vectors.shape[1:], dtype=vectors.dtype)
+        # Every row has at least one entry, so reduceat sums exactly each row's slice
+        return np.add.reduceat(vectors[self.indices], self.indptr[:-1], axis=0)
+
+    def count_matches(self, terms: Iterable[str]) -> 'np.ndarray':
+        """Per recipe row, the number of its ingredients matched by any of the terms."""
+        return self.multiply(self.indicator(terms))
+
+    def quantity_coverage(self, rows: 'np.ndarray', items: Sequence[Tuple[str, Any, str]]) -> 'np.ndarray':
+        """
+        Share of the ingredients of each row that the fridge covers in sufficient quantity.
+
+        An ingredient counts when a fridge item matches it and the items matching it hold
+        at least the recipe's amount. Amounts in different dimensions or unknown units
+        cannot be compared and count as covered.
+
+        Args:
+            rows: Recipe rows
+            items: Fridge items as (name, quantity, unit)
+        """
+        available = np.zeros(self.vocabulary.size, dtype=bool)
+        have_dimensions = np.zeros(self.vocabulary.size, dtype=np.int8)
+        have_amounts = np.zeros(self.vocabulary.size)
+        for name, quantity, unit in items:
+            dimension, amount = to_base_amount(quantity, unit, name)
+            for term in self.vocabulary.lookup(name):
+                if not available[term]:
+                    available[term] = True
+                    have_dimensions[term] = dimension
+                    have_amounts[term] = amount
+                elif have_dimensions[term] == dimension:
+                    have_amounts[term] += amount
+                else:
+                    have_dimensions[term] = UNKNOWN
+
+        if not len(rows):
+            return np.zeros(0)
+
+        positions, row_starts = self._entry_positions(rows)
+        columns = self.indices[positions]
+        need_dimensions = self.entry_dimensions[positions]
+        comparable = (need_dimensions != UNKNOWN) & (need_dimensions == have_dimensions[columns])
+        enough = have_amounts[columns] >= self.entry_amounts[positions] * (1 - AMOUNT_TOLERANCE)
+        covered = available[columns] & (~comparable | enough)
+        return np.add.reduceat(covered.astype(np.int64), row_starts) / self.recipe_sizes[rows]
+
+    def missing_ingredients(self, rows: 'np.ndarray', available: Iterable[str]) -> List[List[str]]:
+        """
+        Canonical names of the ingredients of each row that no available term matches,
+        computed for all rows at once as one difference of their sorted id arrays against
+        the fridge's indicator vector.
+        """
+        if not len(rows):
+            return []
+
+        positions, row_starts = self._entry_positions(rows)
+        columns = self.indices[positions]
+        # Rows are sorted, so an ingredient listed twice by a recipe is kept once
+        first = np.ones(len(columns), dtype=bool)
+        first[1:] = columns[1:] != columns[:-1]
+        first[row_starts] = True
+        missing = first & (self.indicator(available)[columns] == 0)
+
+        ends = np.cumsum(np.add.reduceat(missing.astype(np.int64), row_starts)).tolist()
+        names = [self.vocabulary.names[term] for term in columns[missing].tolist()]
+        return [names[start:end] for start, end in zip([0] + ends[:-1], ends)]
+
+    def fridge_counts(self, available: Sequence[str], priority: Sequence[str]) -> tuple:
+        """
+        Matched, priority-matched and missing ingredient counts of every recipe row
+        for one fridge, from a single product with the stacked indicator vectors.
+        """
+        counts = self.multiply(np.stack([self.indicator(available), self.indicator(priority)], axis=1))
+        matched = counts[:, 0]
+        return matched, counts[:, 1], self.recipe_sizes - matched
+
+
+def build_ingredient_index(db_path: str) -> IngredientIndex:
+    """Read every recipe ingredient into a new index, with quantities converted to base units."""
+    vocabulary = load_canonical_vocabulary(db_path)
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("""
+        SELECT recipe_id, ingredient_id, quantity, unit
+        FROM RecipeIngredient
+        WHERE ingredient_id IN (SELECT id FROM Ingredient)
+        ORDER BY recipe_id
+    """).fetchall()
+    conn.close()
+
+    canonical = vocabulary.ingredient_canonical
+    recipe_ids = []
+    indptr = [0]
+    indices = np.fromiter((canonical[ingredient_id] for _, ingredient_id, _, _ in rows), dtype=np.int32, count=len(rows))
+    for position, (recipe_id, _, _, _) in enumerate(rows):
+        if not recipe_ids or recipe_ids[-1] != recipe_id:
+            if recipe_ids:
+                indptr.append(position)
+            recipe_ids.append(recipe_id)
+    if recipe_ids:
+        indptr.append(len(rows))
+
+    # Quantities normalized once here, so coverage checks are plain array comparisons
+    conversions = [
+        to_base_amount(quantity, unit or "", vocabulary.names[canonical[ingredient_id]])
+        for _, ingredient_id, quantity, unit in rows
+    ]
+    entry_dimensions = np.fromiter((dimension for dimension, _ in conversions), dtype=np.int8, count=len(rows))
+    entry_amounts = np.fromiter((amount for _, amount in conversions), dtype=np.float64, count=len(rows))
+
+    return IngredientIndex(
+        vocabulary,
+        np.array(recipe_ids, dtype=np.int64),
+        np.array(indptr, dtype=np.int64),
+        indices,
+        entry_dimensions,
+        entry_amounts
+    )
+
+
+def load_ingredient_index(db_path: str) -> IngredientIndex:
+    """The index of a database, built on first use and cached per database version."""
+    return _index_cache.get(db_path, lambda: build_ingredient_index(db_path))
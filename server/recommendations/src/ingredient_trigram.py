@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Trigram index for fuzzy ingredient name resolution.
+Typed fridge items and scanned product names ("Barilla Spaghetti n.5", "chiken") rarely
+match an ingredient word for word. Names are split into character trigrams and ranked by
+trigram similarity, reading only the posting lists of the query's trigrams instead of
+comparing the query with every ingredient.
+"""
+
+import heapq
+from array import array
+from typing import Dict, List, Set, Tuple
+
+# Minimum similarity for a name to be considered a match
+SIMILARITY_THRESHOLD = 0.3
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Character trigrams of the words of a lowercase text. Words are padded with two
+    leading spaces and one trailing space, so short words and word starts get weight.
+    """
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(first: str, second: str) -> float:
+    """Trigram similarity of two texts: shared trigrams over distinct trigrams of both."""
+    first_grams, second_grams = trigrams(first), trigrams(second)
+    if not first_grams or not second_grams:
+        return 0.0
+    shared = len(first_grams & second_grams)
+    return shared / (len(first_grams) + len(second_grams) - shared)
+
+
+class TrigramIndex:
+    """Posting list of name ids per trigram, with the trigram count of every name."""
+
+    def __init__(self, names: Dict[int, str]):
+        postings: Dict[str, array] = {}
+        self.sizes: Dict[int, int] = {}
+        for name_id, name in names.items():
+            grams = trigrams(name)
+            self.sizes[name_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, array('q')).append(name_id)
+        self.postings = postings
+
+    def search(self, query: str, limit: int = 5,
+               threshold: float = SIMILARITY_THRESHOLD) -> List[Tuple[int, float]]:
+        """
+        Names most similar to the query.
+
+        Args:
+            query: Normalized lowercase text
+            limit: Maximum number of results
+            threshold: Minimum similarity
+
+        Returns:
+            (name id, similarity) pairs, most similar first, ties by id
+        """
+        query_grams = trigrams(query)
+        shared: Dict[int, int] = {}
+        for gram in query_grams:
+            for name_id in self.postings.get(gram, ()):
+                shared[name_id] = shared.get(name_id, 0) + 1
+
+        scored = []
+        for name_id, count in shared.items():
+            score = count / (len(query_grams) + self.sizes[name_id] - count)
+            if score >= threshold:
+                scored.append((score, -name_id))
+        return [(-negated_id, score) for score, negated_id in heapq.nlargest(limit, scored)]
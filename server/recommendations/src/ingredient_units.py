@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Unit conversion for ingredient quantities.
+Quantities are normalized to one base unit per dimension: grams for mass, milliliters for
+volume, and the count itself for countable units. Volumes of ingredients with a known
+density are converted to grams, so "1 cup flour" and "120 g flour" compare directly.
+"""
+
+from functools import lru_cache
+from typing import Any, Tuple
+
+from ingredient_canonical import canonical_name, singularize
+
+# Dimensions; quantities are only comparable within the same dimension
+UNKNOWN = 0
+MASS = 1  # grams
+VOLUME = 2  # milliliters
+PIECE = 3
+SLICE = 4
+CLOVE = 5
+BUNCH = 6
+HEAD = 7
+CAN = 8
+
+# Unit (lowercase, singular) -> (dimension, factor to the base unit)
+UNITS = {
+    "g": (MASS, 1.0), "gram": (MASS, 1.0), "gr": (MASS, 1.0),
+    "kg": (MASS, 1000.0), "kilogram": (MASS, 1000.0),
+    "mg": (MASS, 0.001), "milligram": (MASS, 0.001),
+    "lb": (MASS, 453.592), "lbs": (MASS, 453.592), "pound": (MASS, 453.592),
+    "oz": (MASS, 28.3495), "ounce": (MASS, 28.3495),
+    "ml": (VOLUME, 1.0), "milliliter": (VOLUME, 1.0), "millilitre": (VOLUME, 1.0),
+    "cl": (VOLUME, 10.0), "dl": (VOLUME, 100.0),
+    "l": (VOLUME, 1000.0), "liter": (VOLUME, 1000.0), "litre": (VOLUME, 1000.0),
+    "cup": (VOLUME, 236.588),
+    "tbsp": (VOLUME, 14.7868), "tablespoon": (VOLUME, 14.7868),
+    "tsp": (VOLUME, 4.92892), "teaspoon": (VOLUME, 4.92892),
+    "fl oz": (VOLUME, 29.5735), "fluid ounce": (VOLUME, 29.5735),
+    "pint": (VOLUME, 473.176), "quart": (VOLUME, 946.353), "gallon": (VOLUME, 3785.41),
+    "piece": (PIECE, 1.0), "pc": (PIECE, 1.0), "pcs": (PIECE, 1.0), "whole": (PIECE, 1.0),
+    "slice": (SLICE, 1.0),
+    "clove": (CLOVE, 1.0),
+    "bunch": (BUNCH, 1.0),
+    "head": (HEAD, 1.0),
+    "can": (CAN, 1.0), "tin": (CAN, 1.0),
+}
+
+# Canonical ingredient name (or its last word) -> density in g/ml
+DENSITIES = {
+    "water": 1.0,
+    "milk": 1.03,
+    "cream": 1.01,
+    "heavy cream": 0.99,
+    "sour cream": 1.05,
+    "yogurt": 1.03,
+    "butter": 0.911,
+    "oil": 0.92,
+    "olive oil": 0.91,
+    "flour": 0.53,
+    "sugar": 0.85,
+    "brown sugar": 0.93,
+    "powdered sugar": 0.56,
+    "honey": 1.42,
+    "maple syrup": 1.32,
+    "salt": 1.2,
+    "rice": 0.85,
+    "oat": 0.41,
+    "cocoa": 0.52,
+    "cheese": 0.45,
+    "pasta": 0.42,
+    "vinegar": 1.01,
+    "soy sauce": 1.15,
+    "broth": 1.0,
+    "stock": 1.0,
+}
+
+
+def density(name: str) -> float:
+    """Density in g/ml of a canonical ingredient name, or 0.0 when unknown."""
+    if name in DENSITIES:
+        return DENSITIES[name]
+    words = name.split()
+    return DENSITIES.get(words[-1], 0.0) if words else 0.0
+
+
+@lru_cache(maxsize=65536)
+def unit_conversion(unit: str, name: str) -> Tuple[int, float]:
+    """
+    (dimension, factor) turning a quantity of `name` in `unit` into base units.
+    Unknown units give (UNKNOWN, 0.0).
+    """
+    key = " ".join(str(unit).lower().replace(".", " ").split())
+    conversion = UNITS.get(key) or UNITS.get(singularize(key))
+    if conversion is None:
+        return UNKNOWN, 0.0
+
+    dimension, factor = conversion
+    if dimension == VOLUME:
+        grams_per_ml = density(canonical_name(name))
+        if grams_per_ml:
+            return MASS, factor * grams_per_ml
+    return dimension, factor
+
+
+def to_base_amount(quantity: Any, unit: str, name: str) -> Tuple[int, float]:
+    """(dimension, amount in base units) of a quantity, UNKNOWN for unusable quantities or units."""
+    if isinstance(quantity, bool) or not isinstance(quantity, (int, float)) or quantity < 0:
+        return UNKNOWN, 0.0
+    dimension, factor = unit_conversion(unit, name)
+    return dimension, quantity * factor
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+"Use it all up" meal planner for leftovers.
+Picks several recipes that together use as many soon-expiring fridge items as possible,
+by greedy set cover over the whole catalogue. Marginal gains only shrink as items get
+covered, so they are evaluated lazily: a recipe is re-scored only when its previous gain
+still ranks first.
+"""
+
+import heapq
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import numpy as np
+
+from ingredient_index import IngredientIndex, load_ingredient_index
+from leftover_recommendation import (
+    LeftoverIngredient, get_priority_ingredients, leftover_quantity_coverage, leftover_shopping_lists, PRIORITY_BONUS
+)
+from recipe_filtering import RecipeFilter, DietaryFilter, fetch_first_matching
+
+# Candidates checked against the dietary filter per query
+FILTER_BATCH_SIZE = 64
+
+
+def _item_masks(index: IngredientIndex, leftovers: List[LeftoverIngredient]) -> 'np.ndarray':
+    """(recipes, words) uint64 bitsets: bit i of a row is set when the recipe uses fridge item i."""
+    masks = np.zeros((len(index.recipe_ids), max(1, (len(leftovers) + 63) // 64)), dtype=np.uint64)
+    for item, leftover in enumerate(leftovers):
+        word, bit = divmod(item, 64)
+        for term in index.vocabulary.lookup(leftover.name.lower()):
+            rows, _ = index.column(term)
+            masks[rows, word] |= np.uint64(1 << bit)
+    return masks
+
+
+def plan_leftover_meals(db_path: str, leftovers: List[LeftoverIngredient], number: int = 3,
+                        dietary_filter: Optional[DietaryFilter] = None, today: datetime = None) -> Dict[str, Any]:
+    """
+    Choose `number` recipes covering as many soon-expiring fridge items as possible.
+
+    Each step takes the recipe using the most soon-expiring items not used yet (same
+    expiry rule as the leftover recommendations), then the most other unused items,
+    then the best leftover match score, then the lowest id.
+
+    Args:
+        db_path: Path to SQLite database
+        leftovers: Fridge contents
+        number: Number of recipes to plan
+        dietary_filter: Constraints the planned recipes must satisfy
+        today: Reference date of the expiry rule (default now)
+
+    Returns:
+        {"recipes": [...], "covered": [...], "uncovered": [...], "uncovered_expiring": [...]}
+        with fridge item names; each recipe lists the items it uses and those it is the first to use
+    """
+    index = load_ingredient_index(db_path)
+    names = [leftover.name for leftover in leftovers]
+    priority_bits = 0
+    for item, leftover in enumerate(leftovers):
+        if get_priority_ingredients([leftover], today):
+            priority_bits |= 1 << item
+
+    masks = _item_masks(index, leftovers)
+    rows = np.flatnonzero(masks.any(axis=1))
+
+    def row_bits(row: int) -> int:
+        bits = 0
+        for word, value in enumerate(masks[row].tolist()):
+            bits |= value << (64 * word)
+        return bits
+
+    # Tie-break by the leftover score of the whole fridge
+    matched, priority_matched, _ = index.fridge_counts(
+        [leftover.name.lower() for leftover in leftovers], get_priority_ingredients(leftovers, today)
+    )
+    scores = (matched / index.recipe_sizes + priority_matched * PRIORITY_BONUS)[rows]
+
+    # Initial gains, when nothing is covered yet
+    priority_gains = np.zeros(len(rows), dtype=np.int64)
+    other_gains = np.zeros(len(rows), dtype=np.int64)
+    for item in range(len(leftovers)):
+        word, bit = divmod(item, 64)
+        uses = (masks[rows, word] >> np.uint64(bit)) & np.uint64(1)
+        if priority_bits >> item & 1:
+            priority_gains += uses.astype(np.int64)
+        else:
+            other_gains += uses.astype(np.int64)
+
+    recipe_ids = index.recipe_ids[rows]
+    order = np.lexsort((recipe_ids, -scores, -other_gains, -priority_gains))
+    # Candidates by initial gain; re-evaluated ones move to a heap keyed by (negated) current gain
+    candidates = [
+        (-int(priority_gains[position]), -int(other_gains[position]), -float(scores[position]),
+         int(recipe_ids[position]), int(rows[position]))
+        for position in order.tolist()
+    ]
+
+    conditions, params = RecipeFilter(db_path).build_sql_conditions(dietary_filter)
+    recipe_rows: Dict[int, Optional[tuple]] = {}  # id -> Recipe row, None when the filter rejects it
+    checked = 0  # candidates[:checked] were checked against the filter
+
+    covered = 0
+    heap: List[tuple] = []
+    evaluated_at: Dict[int, int] = {}  # recipe id -> number of recipes picked when its heap key was computed
+    next_candidate = 0
+    plan = []
+
+    while len(plan) < number and (heap or next_candidate < len(candidates)):
+        if heap and (next_candidate >= len(candidates) or heap[0][:4] <= candidates[next_candidate][:4]):
+            key = heapq.heappop(heap)
+            from_heap = True
+        else:
+            key = candidates[next_candidate]
+            next_candidate += 1
+            from_heap = False
+        recipe_id, row = key[3], key[4]
+
+        if not from_heap or evaluated_at[recipe_id] != len(plan):
+            # Stale gain: recompute it and let it compete again
+            bits = row_bits(row) & ~covered
+            fresh = (-bin(bits & priority_bits).count("1"), -bin(bits & ~priority_bits).count("1"),
+                     key[2], recipe_id, row)
+            if fresh[:2] != key[:2] or not from_heap and heap and heap[0][:4] < fresh[:4]:
+                evaluated_at[recipe_id] = len(plan)
+                heapq.heappush(heap, fresh)
+                continue
+            key = fresh
+
+        if recipe_id not in recipe_rows:
+            # Check this candidate and the next unchecked ones against the dietary filter at once
+            batch = [recipe_id] + [
+                candidate[3] for candidate in candidates[checked:checked + FILTER_BATCH_SIZE]
+                if candidate[3] not in recipe_rows
+            ]
+            checked += FILTER_BATCH_SIZE
+            recipe_rows.update((batch_id, None) for batch_id in batch)
+            for found in fetch_first_matching(db_path, batch, len(batch), "id, name, total_time, images",
+                                              conditions, params):
+                recipe_rows[found[0]] = found
+        if recipe_rows[recipe_id] is None:
+            continue
+
+        bits = row_bits(row)
+        newly = bits & ~covered
+        covered |= bits
+        plan.append((recipe_id, -key[2], bits, newly))
+
+    uncovered = [item for item in range(len(leftovers)) if not covered >> item & 1]
+    planned_ids = [recipe_id for recipe_id, _, _, _ in plan]
+    coverage = leftover_quantity_coverage(index, leftovers, planned_ids)
+    shopping_lists = leftover_shopping_lists(index, leftovers, planned_ids)
+    return {
+        "recipes": [
+            {
+                "id": recipe_id,
+                "name": recipe_rows[recipe_id][1],
+                "total_time": recipe_rows[recipe_id][2] or 0,
+                "image_url": recipe_rows[recipe_id][3] or "",
+                "match_score": round(score, 2),
+                "quantity_coverage": round(quantity_coverage, 2),
+                "shopping_list": shopping_list,
+                "uses": [names[item] for item in range(len(leftovers)) if bits >> item & 1],
+                "uses_first": [names[item] for item in range(len(leftovers)) if newly >> item & 1]
+            }
+            for (recipe_id, score, bits, newly), quantity_coverage, shopping_list in zip(plan, coverage, shopping_lists)
+        ],
+        "covered": [names[item] for item in range(len(leftovers)) if covered >> item & 1],
+        "uncovered": [names[item] for item in uncovered],
+        "uncovered_expiring": [names[item] for item in uncovered if priority_bits >> item & 1]
+    }
@@ -5,10 +5,26 @@ Minimizes waste by using available ingredients and minimizing shopping needs.
 """
 
 import json
-import sqlite3
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+import numpy as np
+
+from ingredient_canonical import name_matches
+from ingredient_index import IngredientIndex, load_ingredient_index
+from recipe_filtering import RecipeFilter, DietaryFilter, fetch_first_matching
+
+# Score bonus per matched ingredient expiring within 3 days
+PRIORITY_BONUS = 0.2
+
+# Recipes must score above this to be recommended
+MIN_MATCH_SCORE = 0.1
+
+# Tolerance on summed upper bounds, covering floating point rounding
+BOUND_SLACK = 1e-9
+
+# Ranking objectives: best match score first, or fewest ingredients left to buy first
+LEFTOVER_OBJECTIVES = ("match", "shopping")
 
 
 @dataclass
@@ -29,40 +45,50 @@ class ShortRecipe:
 
 
 def calculate_ingredient_match_score(recipe_ingredients: List[str], available_ingredients: List[str]) -> float:
-    """Calculate how well available ingredients match recipe requirements."""
+    """
+    Calculate how well available ingredients match recipe requirements.
+    An ingredient matches when it contains all canonical words of an available ingredient
+    (see ingredient_canonical.name_matches).
+    """
     if not recipe_ingredients:
         return 0.0
     
-    matched = sum(1 for ingredient in recipe_ingredients if any(avail.lower() in ingredient.lower() for avail in available_ingredients))
+    matched = sum(1 for ingredient in recipe_ingredients if any(name_matches(avail, ingredient) for avail in available_ingredients))
     return matched / len(recipe_ingredients)
 
 
-def get_leftover_recommendations(db_path: str, leftover_data: str, number: int = 5) -> List[Dict[str, Any]]:
-    """
-    Get recipe recommendations based on leftover ingredients.
-    
-    Args:
-        db_path: Path to SQLite database
-        leftover_data: JSON string containing leftover ingredients
-        number: Number of recommendations to return
-    
-    Returns:
-        List of recommended recipes sorted by ingredient match score
-    """
+def parse_leftover_data(leftover_data: str) -> List[LeftoverIngredient]:
+    """Parse the leftover request JSON into LeftoverIngredient objects."""
     try:
         leftovers_json = json.loads(leftover_data)
-        leftovers = [LeftoverIngredient(**item) for item in leftovers_json.get('ingredients', [])]
-    except (json.JSONDecodeError, TypeError) as e:
+        return parse_leftover_items(leftovers_json.get('ingredients', []))
+    except (json.JSONDecodeError, AttributeError) as e:
         raise ValueError(f"Invalid leftover data format: {e}")
-    
-    if not leftovers:
-        return []
-    
-    # Extract ingredient names for matching
-    available_ingredient_names = [leftover.name.lower() for leftover in leftovers]
-    
+
+
+def parse_leftover_items(items: List[Dict[str, Any]]) -> List[LeftoverIngredient]:
+    """Parse decoded ingredient objects into LeftoverIngredient objects."""
+    try:
+        return [LeftoverIngredient(**item) for item in items]
+    except TypeError as e:
+        raise ValueError(f"Invalid leftover data format: {e}")
+
+
+def parse_leftover_objective(leftover_data: str) -> str:
+    """The ranking objective of a leftover request ("match" unless given)."""
+    try:
+        objective = json.loads(leftover_data).get('objective', "match")
+    except (json.JSONDecodeError, AttributeError) as e:
+        raise ValueError(f"Invalid leftover data format: {e}")
+    if objective not in LEFTOVER_OBJECTIVES:
+        raise ValueError(f"objective must be one of {', '.join(LEFTOVER_OBJECTIVES)}")
+    return objective
+
+
+def get_priority_ingredients(leftovers: List[LeftoverIngredient], today: datetime = None) -> List[str]:
+    """Return the lowercase names of leftovers expiring within 3 days."""
     # Sort by expiration date (use soonest expiring first)
-    today = datetime.now()
+    today = today or datetime.now()
     priority_ingredients = []
     for leftover in leftovers:
         try:
@@ -73,68 +99,251 @@ def get_leftover_recommendations(db_path: str, leftover_data: str, number: int =
         except ValueError:
             # Invalid date format, treat as medium priority
             pass
+    return priority_ingredients
+
+
+def _score_rows(index: IngredientIndex, leftovers: List[LeftoverIngredient],
+                today: datetime = None) -> tuple:
+    """
+    Recipe ids, scores and missing ingredient counts of the recipes above the minimum match score.
+    Same scoring as calculate_ingredient_match_score plus the expiry bonus, computed for
+    every recipe at once from one product of the ingredient matrix with the fridge.
+    """
+    available_ingredient_names = [leftover.name.lower() for leftover in leftovers]
+    priority_ingredients = get_priority_ingredients(leftovers, today)
+    
+    matched, priority_matched, missing = index.fridge_counts(available_ingredient_names, priority_ingredients)
     
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    # Bonus for using priority (soon-expiring) ingredients
+    scores = matched / index.recipe_sizes + priority_matched * PRIORITY_BONUS
     
-    # Get recipes with their ingredients (using proper schema with ingredient names)
-    query = """
-    SELECT DISTINCT r.id, r.name, r.total_time, r.images,
-           GROUP_CONCAT(i.name) as ingredients
-    FROM Recipe r
-    LEFT JOIN RecipeIngredient ri ON r.id = ri.recipe_id
-    LEFT JOIN Ingredient i ON ri.ingredient_id = i.id
-    GROUP BY r.id, r.name, r.total_time, r.images
-    LIMIT ?
+    # Only include recipes with some ingredient match
+    selected = scores > MIN_MATCH_SCORE
+    return index.recipe_ids[selected], scores[selected], missing[selected]
+
+
+def score_leftover_recipes(index: IngredientIndex, leftovers: List[LeftoverIngredient],
+                           today: datetime = None) -> Dict[int, float]:
     """
+    Score every recipe of the index against the leftovers.
     
-    cursor.execute(query, (number * 3,))  # Get more recipes to filter
-    recipes = cursor.fetchall()
-    conn.close()
+    Returns:
+        {recipe_id: score} for the recipes above the minimum match score
+    """
+    recipe_ids, scores, _ = _score_rows(index, leftovers, today)
+    return dict(zip(recipe_ids.tolist(), scores.tolist()))
+
+
+def top_leftover_recipes(index: IngredientIndex, leftovers: List[LeftoverIngredient], k: int,
+                         today: datetime = None) -> tuple:
+    """
+    The k best recipes for the leftovers, identical to sorting the exhaustive scores
+    (score descending, then recipe id) but found with MaxScore pruning.
     
-    recommendations = []
-    for recipe_row in recipes:
-        recipe_id, name, total_time, images, ingredients_str = recipe_row
-        
-        # Parse ingredients (assuming comma-separated)
-        recipe_ingredients = ingredients_str.split(',') if ingredients_str else []
-        recipe_ingredients = [ing.strip().lower() for ing in recipe_ingredients]
+    Each fridge ingredient contributes at most its upper bound (largest share of a recipe,
+    plus the expiry bonus times its largest count) to any recipe. Ingredients are merged
+    by decreasing bound while tracking partial scores; the k-th best partial score is a
+    lower bound of the final k-th score, so once the bounds of the ingredients left cannot
+    reach it, recipes not seen yet are skipped, and seen recipes whose partial score plus
+    those bounds falls below it are dropped. Remaining ingredients are only probed for
+    the surviving recipes.
+    
+    Returns:
+        (recipe ids, scores, missing ingredient counts) arrays in rank order
+    """
+    if k < 1:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, np.zeros(0), empty
+    
+    available = index.vocabulary.lookup_all([leftover.name.lower() for leftover in leftovers])
+    priority = index.vocabulary.lookup_all(get_priority_ingredients(leftovers, today))
+    
+    def bound(term):
+        share = index.column_max_share[term] if term in available else 0.0
+        bonus = PRIORITY_BONUS * index.column_max_count[term] if term in priority else 0.0
+        return share + bonus
+    
+    terms = sorted(available | priority, key=lambda term: (-bound(term), term))
+    remaining_bounds = [0.0] * (len(terms) + 1)
+    for position in range(len(terms) - 1, -1, -1):
+        remaining_bounds[position] = remaining_bounds[position + 1] + bound(terms[position])
+    
+    # Counts are accumulated per row in dense arrays; `rows` lists the surviving candidates
+    matched = np.zeros(len(index.recipe_ids), dtype=np.int64)
+    priority_matched = np.zeros(len(index.recipe_ids), dtype=np.int64)
+    seen = np.zeros(len(index.recipe_ids), dtype=bool)
+    rows = np.zeros(0, dtype=np.int64)
+    threshold = MIN_MATCH_SCORE
+    
+    for position, term in enumerate(terms):
+        term_rows, term_counts = index.column(term)
         
-        # Calculate match score
-        match_score = calculate_ingredient_match_score(recipe_ingredients, available_ingredient_names)
+        if remaining_bounds[position] + BOUND_SLACK >= threshold:
+            # Recipes seen only from here on can still make it: merge the posting list
+            new_rows = term_rows[~seen[term_rows]]
+            seen[new_rows] = True
+            rows = np.concatenate((rows, new_rows))
+            hit_rows, hit_counts = term_rows, term_counts
+        else:
+            # Only probe the surviving candidates
+            hits = np.minimum(np.searchsorted(term_rows, rows), max(len(term_rows) - 1, 0))
+            found = term_rows[hits] == rows if len(term_rows) else np.zeros(len(rows), dtype=bool)
+            hit_rows, hit_counts = rows[found], term_counts[hits[found]]
         
-        # Bonus for using priority (soon-expiring) ingredients
-        priority_bonus = 0.0
-        if priority_ingredients:
-            priority_matches = sum(1 for ing in recipe_ingredients if any(p in ing for p in priority_ingredients))
-            priority_bonus = priority_matches * 0.2  # 20% bonus per priority ingredient
+        # Posting lists hold each row once, so plain fancy-index addition is exact
+        if term in available:
+            matched[hit_rows] += hit_counts
+        if term in priority:
+            priority_matched[hit_rows] += hit_counts
         
-        final_score = match_score + priority_bonus
+        partial = matched[rows] / index.recipe_sizes[rows] + priority_matched[rows] * PRIORITY_BONUS
+        if len(partial) >= k:
+            threshold = max(threshold, float(np.partition(partial, len(partial) - k)[len(partial) - k]))
         
-        if final_score > 0.1:  # Only include recipes with some ingredient match
-            recipe = ShortRecipe(
-                id=recipe_id,
-                name=name,
-                total_time=total_time or 0,
-                image_url=images or "",
-                match_score=final_score
-            )
-            recommendations.append(recipe)
-    
-    # Sort by match score (highest first) and limit results
-    recommendations.sort(key=lambda x: x.match_score, reverse=True)
+        best_case = partial + remaining_bounds[position + 1] + BOUND_SLACK
+        rows = rows[(best_case >= threshold) & (best_case > MIN_MATCH_SCORE)]
+    
+    scores = matched[rows] / index.recipe_sizes[rows] + priority_matched[rows] * PRIORITY_BONUS
+    selected = scores > MIN_MATCH_SCORE
+    rows, scores = rows[selected], scores[selected]
+    
+    recipe_ids = index.recipe_ids[rows]
+    order = np.lexsort((recipe_ids, -scores))[:k]
+    return recipe_ids[order], scores[order], (index.recipe_sizes[rows] - matched[rows])[order]
+
+
+def top_shopping_recipes(index: IngredientIndex, leftovers: List[LeftoverIngredient], k: int,
+                         today: datetime = None) -> tuple:
+    """
+    The k recipes above the minimum match score needing the fewest ingredients the
+    fridge lacks, then by score descending, then recipe id.
+    
+    Returns:
+        (recipe ids, scores, missing ingredient counts) arrays in rank order
+    """
+    recipe_ids, scores, missing = _score_rows(index, leftovers, today)
+    order = np.lexsort((recipe_ids, -scores, missing))[:max(k, 0)]
+    return recipe_ids[order], scores[order], missing[order]
+
+
+def rank_leftover_recipes(db_path: str, leftovers: List[LeftoverIngredient], number: int = 5,
+                          dietary_filter: Optional[DietaryFilter] = None,
+                          objective: str = "match") -> List[Dict[str, Any]]:
+    """
+    Rank the whole catalogue against one fridge.
+    
+    Args:
+        db_path: Path to SQLite database
+        leftovers: Parsed leftover ingredients
+        number: Number of recommendations to return
+        dietary_filter: Constraints the returned recipes must satisfy
+        objective: "match" (best match score first) or "shopping" (fewest missing ingredients first)
+    
+    Returns:
+        List of recommended recipes sorted by the objective
+    """
+    index = load_ingredient_index(db_path)
+    top = top_shopping_recipes if objective == "shopping" else top_leftover_recipes
+    return fetch_ranked_recipes(
+        db_path, lambda k: top(index, leftovers, k), number, dietary_filter,
+        lambda recipe_ids: leftover_quantity_coverage(index, leftovers, recipe_ids),
+        lambda recipe_ids: leftover_shopping_lists(index, leftovers, recipe_ids)
+    )
+
+
+def leftover_quantity_coverage(index: IngredientIndex, leftovers: List[LeftoverIngredient],
+                               recipe_ids: List[int]) -> List[float]:
+    """Share of each recipe's ingredients the leftovers cover in sufficient quantity."""
+    rows = np.searchsorted(index.recipe_ids, np.asarray(recipe_ids, dtype=np.int64))
+    items = [(leftover.name.lower(), leftover.quantity, leftover.unit) for leftover in leftovers]
+    return index.quantity_coverage(rows, items).tolist()
+
+
+def leftover_shopping_lists(index: IngredientIndex, leftovers: List[LeftoverIngredient],
+                            recipe_ids: List[int]) -> List[List[str]]:
+    """Ingredients of each recipe that the leftovers do not provide."""
+    rows = np.searchsorted(index.recipe_ids, np.asarray(recipe_ids, dtype=np.int64))
+    return index.missing_ingredients(rows, [leftover.name.lower() for leftover in leftovers])
+
+
+def fetch_ranked_recipes(db_path: str, top: Callable[[int], tuple], number: int,
+                         dietary_filter: Optional[DietaryFilter] = None,
+                         coverage: Optional[Callable[[List[int]], List[float]]] = None,
+                         shopping: Optional[Callable[[List[int]], List[List[str]]]] = None) -> List[Dict[str, Any]]:
+    """
+    Recommendations from a top-k ranking, skipping recipes rejected by the dietary filter.
+    
+    Args:
+        db_path: Path to SQLite database
+        top: Function returning the (recipe ids, scores, missing counts) of the k best recipes
+        number: Number of recommendations to return
+        dietary_filter: Constraints the returned recipes must satisfy
+        coverage: Function returning the quantity coverage of recipes, reported when given
+        shopping: Function returning the missing ingredient names of recipes, reported when given
+    """
+    scores: Dict[int, float] = {}
+    missing: Dict[int, int] = {}
+    
+    def ranked_ids():
+        # Filtered out recipes are replaced by the next ones: widen k until the ranking is exhausted
+        k = max(number * 2, 16)
+        while True:
+            recipe_ids, top_scores, top_missing = top(k)
+            recipe_ids = recipe_ids.tolist()
+            for recipe_id, score, missing_count in zip(recipe_ids[len(scores):], top_scores.tolist()[len(scores):],
+                                                       top_missing.tolist()[len(scores):]):
+                scores[recipe_id] = score
+                missing[recipe_id] = missing_count
+                yield recipe_id
+            if len(recipe_ids) < k:
+                return
+            k *= 4
+    
+    conditions, params = RecipeFilter(db_path).build_sql_conditions(dietary_filter)
+    rows = fetch_first_matching(db_path, ranked_ids(), number, "id, name, total_time, images", conditions, params)
     
     # Convert to dict format
-    return [
+    recommendations = [
         {
-            "id": recipe.id,
-            "name": recipe.name,
-            "total_time": recipe.total_time,
-            "image_url": recipe.image_url,
-            "match_score": round(recipe.match_score, 2)
+            "id": recipe_id,
+            "name": name,
+            "total_time": total_time or 0,
+            "image_url": images or "",
+            "match_score": round(scores[recipe_id], 2),
+            "missing_ingredients": missing[recipe_id]
         }
-        for recipe in recommendations[:number]
+        for recipe_id, name, total_time, images in rows
     ]
+    if coverage is not None and recommendations:
+        for recommendation, value in zip(recommendations, coverage([row[0] for row in rows])):
+            recommendation["quantity_coverage"] = round(value, 2)
+    if shopping is not None and recommendations:
+        for recommendation, names in zip(recommendations, shopping([row[0] for row in rows])):
+            recommendation["shopping_list"] = names
+    return recommendations
+
+
+def get_leftover_recommendations(db_path: str, leftover_data: str, number: int = 5,
+                                 dietary_filter: Optional[DietaryFilter] = None) -> List[Dict[str, Any]]:
+    """
+    Get recipe recommendations based on leftover ingredients.
+    
+    Args:
+        db_path: Path to SQLite database
+        leftover_data: JSON string containing leftover ingredients
+        number: Number of recommendations to return
+        dietary_filter: Constraints the returned recipes must satisfy
+    
+    Returns:
+        List of recommended recipes sorted by ingredient match score
+    """
+    leftovers = parse_leftover_data(leftover_data)
+    objective = parse_leftover_objective(leftover_data)
+    
+    if not leftovers:
+        return []
+    
+    return rank_leftover_recipes(db_path, leftovers, number, dietary_filter, objective)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Stateful leftover sessions, one per household.
+The app asks for new suggestions after every fridge change. A session keeps the match
+counts of the recipes its fridge touches, so adding or removing one leftover only updates
+the recipes in that ingredient's posting lists before the top-k is emitted again.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, List, Optional
+import numpy as np
+
+from ingredient_index import IngredientIndex, load_ingredient_index
+from leftover_recommendation import (
+    LeftoverIngredient, get_priority_ingredients, MIN_MATCH_SCORE, PRIORITY_BONUS
+)
+
+
+def fridge_key(name: str) -> str:
+    """Key of a leftover in a fridge: its lowercase name with single spaces."""
+    return " ".join(name.lower().split())
+
+
+class LeftoverSession:
+    """
+    Fridge of one household with per-recipe counts of matched and soon-expiring
+    ingredients, kept equal to what scoring the whole fridge from scratch would give.
+    Counts are sparse, index row -> count, holding only the recipes the fridge matches.
+    """
+
+    def __init__(self, index: IngredientIndex, today: datetime = None):
+        self.index = index
+        self.today = today
+        self.day = (today or datetime.now()).date()
+        self.leftovers: Dict[str, LeftoverIngredient] = {}
+        self._leftover_terms: Dict[str, tuple] = {}  # fridge key -> (canonical ids, priority)
+
+        # Canonical id -> number of leftovers matching it, as fridge item / as priority item
+        self._references: Dict[int, int] = {}
+        self._priority_references: Dict[int, int] = {}
+        self.matched: Dict[int, int] = {}
+        self.priority_matched: Dict[int, int] = {}
+
+    def _update(self, terms, references: Dict[int, int], counts: Dict[int, int], delta: int) -> None:
+        """Count terms in or out; rows only change when a term gains its first or loses its last reference."""
+        for term in terms:
+            before = references.get(term, 0)
+            after = before + delta
+            if after:
+                references[term] = after
+            else:
+                references.pop(term, None)
+            if (before == 0) != (after == 0):
+                rows, term_counts = self.index.column(term)
+                for row, term_count in zip(rows.tolist(), term_counts.tolist()):
+                    count = counts.get(row, 0) + delta * term_count
+                    if count:
+                        counts[row] = count
+                    else:
+                        del counts[row]
+
+    def add(self, leftover: LeftoverIngredient) -> None:
+        """Add a leftover, replacing the one with the same name."""
+        key = fridge_key(leftover.name)
+        self.remove(key)
+
+        terms = self.index.vocabulary.lookup(leftover.name.lower())
+        priority = bool(get_priority_ingredients([leftover], self.today))
+        self._update(terms, self._references, self.matched, 1)
+        if priority:
+            self._update(terms, self._priority_references, self.priority_matched, 1)
+
+        self.leftovers[key] = leftover
+        self._leftover_terms[key] = (terms, priority)
+
+    def remove(self, name: str) -> bool:
+        """Remove a leftover by name. Returns whether it was in the fridge."""
+        key = fridge_key(name)
+        if key not in self.leftovers:
+            return False
+
+        terms, priority = self._leftover_terms.pop(key)
+        del self.leftovers[key]
+        self._update(terms, self._references, self.matched, -1)
+        if priority:
+            self._update(terms, self._priority_references, self.priority_matched, -1)
+        return True
+
+    def top(self, k: int) -> tuple:
+        """
+        The k best recipes for the current fridge, ranked like top_leftover_recipes.
+
+        Returns:
+            (recipe ids, scores, missing ingredient counts) arrays in rank order
+        """
+        # Every priority match is also a match, so the matched rows are all the candidates
+        rows = np.fromiter(self.matched, dtype=np.int64, count=len(self.matched))
+        matched = np.fromiter(self.matched.values(), dtype=np.int64, count=len(self.matched))
+        priority_matched = np.fromiter(
+            (self.priority_matched.get(row, 0) for row in self.matched), dtype=np.int64, count=len(self.matched)
+        )
+        scores = matched / self.index.recipe_sizes[rows] + priority_matched * PRIORITY_BONUS
+        selected = scores > MIN_MATCH_SCORE
+        rows, scores, matched = rows[selected], scores[selected], matched[selected]
+
+        if 0 < k < len(rows):
+            # Keep everything scoring at least the k-th score, so ties are ordered by id below
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            head = scores >= kth
+            rows, scores, matched = rows[head], scores[head], matched[head]
+
+        recipe_ids = self.index.recipe_ids[rows]
+        order = np.lexsort((recipe_ids, -scores))[:max(k, 0)]
+        missing = self.index.recipe_sizes[rows] - matched
+        return recipe_ids[order], scores[order], missing[order]
+
+
+class LeftoverSessionStore:
+    """
+    Thread-safe LRU of household sessions. Sessions idle for `ttl_seconds` expire.
+    A session is rebuilt from its leftovers when the ingredient index is reloaded
+    (the database changed) or the day changes (expiry priorities move).
+    """
+
+    def __init__(self, db_path: str, max_sessions: int = 10000, ttl_seconds: float = 1800.0):
+        self.db_path = db_path
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()  # household -> (expires_at, session)
+        self.lock = threading.RLock()
+
+    def get(self, household: str) -> Optional[LeftoverSession]:
+        """The live session of a household, or None. Callers hold `lock` while using it."""
+        with self.lock:
+            entry = self._sessions.get(household)
+            if entry is None:
+                return None
+
+            expires_at, session = entry
+            if expires_at < time.monotonic():
+                del self._sessions[household]
+                return None
+
+            index = load_ingredient_index(self.db_path)
+            if session.index is not index or session.day != date.today():
+                session = self._new_session(session.leftovers.values(), index)
+            self._store(household, session)
+            return session
+
+    def create(self, household: str, leftovers: List[LeftoverIngredient]) -> LeftoverSession:
+        """Start (or restart) the session of a household with a whole fridge."""
+        with self.lock:
+            session = self._new_session(leftovers, load_ingredient_index(self.db_path))
+            self._store(household, session)
+            return session
+
+    def close(self, household: str) -> bool:
+        with self.lock:
+            return self._sessions.pop(household, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _new_session(self, leftovers, index: IngredientIndex) -> LeftoverSession:
+        session = LeftoverSession(index)
+        for leftover in list(leftovers):
+            session.add(leftover)
+        return session
+
+    def _store(self, household: str, session: LeftoverSession) -> None:
+        self._sessions[household] = (time.monotonic() + self.ttl_seconds, session)
+        self._sessions.move_to_end(household)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
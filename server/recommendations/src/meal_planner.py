@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Daily meal planner: one recipe for each of breakfast, lunch, dinner and snack, chosen so
+the day adds up to the user's daily calorie, macro and fiber targets.
+
+Each meal draws from a shortlist of the recipes nearest to its share of the targets (the
+nutrient KD-tree), and a branch-and-bound search finds the combination of shortlisted
+recipes with the smallest total deviation. A partial plan is bounded by the deviation of
+the closest day its remaining meals could still reach, given the nutrient ranges of their
+shortlists, and the last meals are scored together as one array of all their combinations.
+"""
+
+from dataclasses import replace
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+from file_cache import VersionedCache
+from nutriment_recommendation import (
+    MealType, UserProfile, NutritionCatalogue, NutritionalTargets, DISTANCE_WEIGHTS, RECOMMENDATION_COLUMNS,
+    calculate_nutritional_targets, calculate_nutrition_score_matrix, load_nutrition_catalogue,
+    nearest_nutrition_rows, format_recommendation
+)
+from recipe_filtering import RecipeFilter, DietaryFilter, fetch_first_matching, dietary_filter_key
+
+# Meals of a day, in plan order
+DAY_MEALS = (MealType.BREAKFAST, MealType.LUNCH, MealType.DINNER, MealType.SNACK)
+
+# Summed nutrients of a day, the first five NutritionCatalogue columns
+DAY_NUTRIENTS = ("calories", "protein", "carbs", "fat", "fiber")
+
+# Weights of the relative deviations of DAY_NUTRIENTS, those of calculate_nutrition_score;
+# fiber only counts when short of its target, like the fiber bonus
+DEVIATION_WEIGHTS = DISTANCE_WEIGHTS + (0.1,)
+
+# Candidate recipes per meal
+SHORTLIST_SIZE = 40
+
+# Last meals of a day scored together as one array of their combinations, in chunks of
+# TAIL_CHUNK candidates of the first of them (TAIL_CHUNK * SHORTLIST_SIZE ** (TAIL_MEALS - 1) entries)
+TAIL_MEALS = 2
+TAIL_CHUNK = 16
+
+# Candidate pools kept across requests, least recently used dropped first
+POOL_CACHE_SIZE = 256
+
+# (database version, daily targets, filter key, size) -> {meal type: catalogue rows}
+_pool_cache = VersionedCache(POOL_CACHE_SIZE)
+
+
+def daily_target_vector(user: UserProfile) -> 'np.ndarray':
+    """The user's daily targets, whatever its meal_type, in DAY_NUTRIENTS order."""
+    targets = calculate_nutritional_targets(replace(user, meal_type=None))
+    return np.array([targets.calories, targets.protein, targets.carbs, targets.fat, targets.fiber])
+
+
+def meal_targets(user: UserProfile) -> Dict[MealType, NutritionalTargets]:
+    """The user's targets for each meal of the day."""
+    return {meal: calculate_nutritional_targets(replace(user, meal_type=meal)) for meal in DAY_MEALS}
+
+
+def deviation_bound(low: 'np.ndarray', high: 'np.ndarray', daily: 'np.ndarray') -> 'np.ndarray':
+    """
+    Smallest day deviation reachable with totals anywhere between low and high.
+
+    Args:
+        low, high: (..., 5) bounds of the day totals, in DAY_NUTRIENTS order
+        daily: Daily targets, in DAY_NUTRIENTS order
+
+    Returns:
+        (...) weighted sum of relative distances from each target to its range;
+        deviation_bound(totals, totals, daily) is the deviation of the totals
+    """
+    scale = np.where(daily > 0, daily, 1.0)
+    gap = np.maximum(np.maximum(low - daily, daily - high), 0)
+    # Fiber above the target is no deviation
+    gap[..., 4] = np.maximum(daily[4] - high[..., 4], 0)
+    return (gap / scale) @ np.array(DEVIATION_WEIGHTS)
+
+
+def meal_shortlist(db_path: str, catalogue: NutritionCatalogue, targets: NutritionalTargets, size: int,
+                   conditions: str, params: List[Any], exclude: Iterable[int] = ()) -> 'np.ndarray':
+    """
+    Catalogue rows of the `size` recipes nearest to a meal's targets that pass the filter
+    conditions, nearest first, leaving out the excluded recipe ids.
+    """
+    excluded = set(exclude)
+
+    def ranked_ids() -> Iterator[int]:
+        # Widen k until enough recipes pass the filter or the catalogue is exhausted
+        k, emitted = max(size * 2, 16), 0
+        while True:
+            rows, _ = nearest_nutrition_rows(catalogue, targets, k)
+            for recipe_id in catalogue.recipe_ids[rows[emitted:]].tolist():
+                if recipe_id not in excluded:
+                    yield recipe_id
+            emitted = len(rows)
+            if len(rows) < k:
+                return
+            k *= 4
+
+    found = fetch_first_matching(db_path, ranked_ids(), size, "id", conditions, params)
+    return catalogue.recipe_ids.searchsorted(np.array([row[0] for row in found], dtype=np.int64))
+
+
+def load_meal_pools(db_path: str, catalogue: NutritionCatalogue, user: UserProfile,
+                    dietary_filter: Optional[DietaryFilter], size: int) -> Dict[MealType, 'np.ndarray']:
+    """
+    Per meal type, the meal_shortlist of `size` recipes for the user's targets, cached per
+    database version, so repeated and multi-day plans for the same targets reuse them.
+    """
+    def build_pools() -> Dict[MealType, 'np.ndarray']:
+        conditions, params = RecipeFilter(db_path).build_sql_conditions(dietary_filter)
+        targets = meal_targets(user)
+        return {
+            meal: meal_shortlist(db_path, catalogue, targets[meal], size, conditions, params) for meal in DAY_MEALS
+        }
+
+    key = (tuple(daily_target_vector(user).tolist()), dietary_filter_key(dietary_filter or DietaryFilter()), size)
+    return _pool_cache.get(db_path, build_pools, key)
+
+
+def search_day(shortlists: List['np.ndarray'], recipe_ids: List['np.ndarray'], daily: 'np.ndarray',
+               costs: Optional[List['np.ndarray']] = None, keys: Optional[List['np.ndarray']] = None,
+               conflicts: Optional['np.ndarray'] = None) -> Tuple[List[int], float]:
+    """
+    Branch-and-bound search for one candidate per meal, all different recipes, with the
+    smallest day deviation plus candidate costs.
+
+    Args:
+        shortlists: Per meal, (candidates, 5) nutrients in DAY_NUTRIENTS order
+        recipe_ids: Per meal, the candidates' recipe ids
+        daily: Daily targets, in DAY_NUTRIENTS order
+        costs: Per meal, a cost added for each candidate (default 0)
+        keys: Per meal, each candidate's row and column in conflicts
+        conflicts: Boolean matrix, True where two candidates may not be planned the same day
+
+    Returns:
+        (candidate position per meal, objective); ([], inf) when no plan exists
+    """
+    meals = len(shortlists)
+    if meals == 0 or any(not len(shortlist) for shortlist in shortlists):
+        return [], float("inf")
+    if costs is None:
+        costs = [np.zeros(len(shortlist)) for shortlist in shortlists]
+
+    # Nutrient ranges and lowest cost reachable by the meals from each level on
+    rest_low = [np.zeros(5) for _ in range(meals + 1)]
+    rest_high = [np.zeros(5) for _ in range(meals + 1)]
+    rest_cost = [0.0] * (meals + 1)
+    for level in range(meals - 1, -1, -1):
+        rest_low[level] = rest_low[level + 1] + shortlists[level].min(axis=0)
+        rest_high[level] = rest_high[level + 1] + shortlists[level].max(axis=0)
+        rest_cost[level] = rest_cost[level + 1] + float(costs[level].min())
+
+    # Clashes between the candidates of every two of the last meals, which never change
+    tail_clashes = {}
+    for level in range(max(meals - TAIL_MEALS, 0), meals):
+        for other_level in range(max(meals - TAIL_MEALS, 0), level):
+            clash = recipe_ids[other_level][:, None] == recipe_ids[level][None, :]
+            if conflicts is not None:
+                clash |= conflicts[np.ix_(keys[other_level], keys[level])]
+            tail_clashes[other_level, level] = clash
+
+    best_positions: List[int] = []
+    best_objective = float("inf")
+
+    def chosen_clashes(masks: List['np.ndarray'], level: int, position: int) -> List['np.ndarray']:
+        """Masks of the candidates clashing with the chosen ones, after choosing `position` of `level`."""
+        recipe_id = recipe_ids[level][position]
+        updated = list(masks)
+        for later in range(level + 1, meals):
+            updated[later] = masks[later] | (recipe_ids[later] == recipe_id)
+            if conflicts is not None:
+                updated[later] |= conflicts[keys[later], keys[level][position]]
+        return updated
+
+    def score_tail(level: int, partial: 'np.ndarray', partial_cost: float, positions: List[int],
+                   masks: List['np.ndarray'], first: 'np.ndarray') -> None:
+        """Score every combination of the last meals at once, the first of them limited to `first` candidates."""
+        nonlocal best_positions, best_objective
+        tail = list(range(level, meals))
+        selections = [first] + [np.arange(len(shortlists[tail_level])) for tail_level in tail[1:]]
+
+        def along(values: 'np.ndarray', axis: int) -> 'np.ndarray':
+            # Selected candidate values of one meal, broadcast along its axis of the combination array
+            values = values[selections[axis]]
+            shape = [1] * len(tail)
+            shape[axis] = len(values)
+            return values.reshape(shape + list(values.shape[1:]))
+
+        totals = partial + sum(along(shortlists[tail_level], axis) for axis, tail_level in enumerate(tail))
+        objectives = (deviation_bound(totals, totals, daily) + partial_cost
+                      + sum(along(costs[tail_level], axis) for axis, tail_level in enumerate(tail)))
+        invalid = np.zeros(objectives.shape, dtype=bool)
+        for axis, tail_level in enumerate(tail):
+            invalid |= along(masks[tail_level], axis)
+            for other_axis, other_level in enumerate(tail[:axis]):
+                clash = tail_clashes[other_level, tail_level][selections[other_axis]][:, selections[axis]]
+                shape = [1] * len(tail)
+                shape[other_axis], shape[axis] = clash.shape
+                invalid |= clash.reshape(shape)
+        objectives[invalid] = np.inf
+
+        pick = np.unravel_index(int(np.argmin(objectives)), objectives.shape)
+        if objectives[pick] < best_objective:
+            best_positions = positions + [int(selections[axis][position]) for axis, position in enumerate(pick)]
+            best_objective = float(objectives[pick])
+
+    def descend(level: int, partial: 'np.ndarray', partial_cost: float, positions: List[int],
+                masks: List['np.ndarray']) -> None:
+        totals = partial + shortlists[level]
+        bounds = (deviation_bound(totals + rest_low[level + 1], totals + rest_high[level + 1], daily)
+                  + partial_cost + costs[level] + rest_cost[level + 1])
+        order = np.argsort(bounds, kind="stable")
+        # Most promising candidates first, so good plans are found early and prune the rest
+        order = order[~masks[level][order]]
+
+        if meals - level <= TAIL_MEALS:
+            for start in range(0, len(order), TAIL_CHUNK):
+                chunk = order[start:start + TAIL_CHUNK]
+                chunk = chunk[bounds[chunk] < best_objective]
+                if not len(chunk):
+                    break
+                score_tail(level, partial, partial_cost, positions, masks, chunk)
+            return
+
+        for position in order.tolist():
+            if bounds[position] >= best_objective:
+                break
+            descend(level + 1, totals[position], partial_cost + float(costs[level][position]), positions + [position],
+                    chosen_clashes(masks, level, position))
+
+    descend(0, np.zeros(5), 0.0, [], [np.zeros(len(shortlist), dtype=bool) for shortlist in shortlists])
+    return best_positions, best_objective
+
+
+def plan_day(catalogue: NutritionCatalogue, shortlists: Dict[MealType, 'np.ndarray'], daily: 'np.ndarray',
+             costs: Optional[Dict[MealType, 'np.ndarray']] = None, keys: Optional[Dict[MealType, 'np.ndarray']] = None,
+             conflicts: Optional['np.ndarray'] = None) -> List[Tuple[MealType, int]]:
+    """
+    Best day over per-meal shortlists of catalogue rows (see search_day for costs and conflicts).
+    Meals without candidates are left out, and so are the last meals of the day while the
+    candidates are too few to plan different recipes.
+
+    Returns:
+        [(meal type, catalogue row)] in DAY_MEALS order
+    """
+    planned = [meal for meal in DAY_MEALS if len(shortlists[meal])]
+    while planned:
+        positions, _ = search_day(
+            [catalogue.nutrition[shortlists[meal], :5] for meal in planned],
+            [catalogue.recipe_ids[shortlists[meal]] for meal in planned],
+            daily,
+            None if costs is None else [costs[meal] for meal in planned],
+            None if keys is None else [keys[meal] for meal in planned],
+            conflicts
+        )
+        if positions:
+            return [(meal, int(shortlists[meal][position])) for meal, position in zip(planned, positions)]
+        planned = planned[:-1]
+    return []
+
+
+def format_day(catalogue: NutritionCatalogue, day: List[Tuple[MealType, int]], recipe_rows: Dict[int, tuple],
+               targets: Dict[MealType, NutritionalTargets], daily: 'np.ndarray') -> Dict[str, Any]:
+    """
+    Response of a planned day: {"meals", "unplanned", "totals", "deviation"}; each meal is a
+    nutriment recommendation scored against the meal's targets, with its "meal_type".
+
+    Args:
+        catalogue: Catalogue the day's rows index
+        day: [(meal type, catalogue row)] as returned by plan_day
+        recipe_rows: Recipe id -> row of RECOMMENDATION_COLUMNS, for every planned recipe
+        targets: Per-meal targets, as returned by meal_targets
+        daily: Daily targets, in DAY_NUTRIENTS order
+    """
+    meals = []
+    for meal, row in day:
+        nutrition_scores, combined_scores = calculate_nutrition_score_matrix(
+            catalogue.nutrition[[row]], catalogue.ratings[[row]], [targets[meal]]
+        )
+        recommendation = format_recommendation(
+            recipe_rows[int(catalogue.recipe_ids[row])], float(nutrition_scores[0, 0]), float(combined_scores[0, 0])
+        )
+        recommendation["meal_type"] = meal.value
+        meals.append(recommendation)
+
+    planned = [meal for meal, _ in day]
+    totals = catalogue.nutrition[[row for _, row in day], :5].sum(axis=0) if day else np.zeros(5)
+    return {
+        "meals": meals,
+        "unplanned": [meal.value for meal in DAY_MEALS if meal not in planned],
+        "totals": nutrient_totals(totals),
+        "deviation": round(float(deviation_bound(totals, totals, daily)), 4)
+    }
+
+
+def nutrient_totals(values: 'np.ndarray') -> Dict[str, float]:
+    """{nutrient: value} of a DAY_NUTRIENTS vector, rounded for responses."""
+    return {name: round(float(value), 1) for name, value in zip(DAY_NUTRIENTS, values)}
+
+
+def fetch_recipe_rows(db_path: str, recipe_ids: Iterable[int]) -> Dict[int, tuple]:
+    """Recipe id -> row of RECOMMENDATION_COLUMNS, in one query per chunk of ids."""
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    return {
+        recipe_row[0]: recipe_row
+        for recipe_row in fetch_first_matching(db_path, recipe_ids, len(recipe_ids), RECOMMENDATION_COLUMNS)
+    }
+
+
+def plan_daily_meals(db_path: str, user: UserProfile, dietary_filter: Optional[DietaryFilter] = None,
+                     shortlist_size: int = SHORTLIST_SIZE, exclude: Iterable[int] = ()) -> Dict[str, Any]:
+    """
+    Plan one recipe per meal type whose sum best matches the user's daily targets.
+
+    Args:
+        db_path: Path to SQLite database
+        user: User profile; its meal_type, tolerance and objective are ignored
+        dietary_filter: Constraints every planned recipe must satisfy
+        shortlist_size: Candidate recipes per meal
+        exclude: Recipe ids not to plan
+
+    Returns:
+        {"meals": [...], "unplanned": [...], "totals": {...}, "targets": {...}, "deviation": float};
+        each meal is a nutriment recommendation scored against the meal's targets, with its
+        "meal_type". Meal types left without a recipe (none allowed, or fewer allowed
+        recipes than meals, the last meals of the day going first) are listed in "unplanned".
+    """
+    catalogue = load_nutrition_catalogue(db_path)
+    daily = daily_target_vector(user)
+    targets = meal_targets(user)
+
+    excluded = np.array(sorted(set(exclude)), dtype=np.int64)
+    pools = load_meal_pools(db_path, catalogue, user, dietary_filter, shortlist_size + len(excluded))
+    shortlists = {
+        meal: rows[~np.isin(catalogue.recipe_ids[rows], excluded)][:shortlist_size] for meal, rows in pools.items()
+    }
+
+    day = plan_day(catalogue, shortlists, daily)
+    recipe_rows = fetch_recipe_rows(db_path, catalogue.recipe_ids[[row for _, row in day]].tolist())
+    plan = format_day(catalogue, day, recipe_rows, targets, daily)
+    plan["targets"] = nutrient_totals(daily)
+    return plan
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+KD-tree over per-serving nutrient vectors, in numpy.
+Vectors are standardized (divided by each dimension's standard deviation) so splits
+are balanced across dimensions. Queries measure a weighted Euclidean distance, with
+one weight per dimension chosen per query: a box's distance bound stays exact under
+diagonal weights, so one tree serves every user's targets and meal scaling.
+"""
+
+import heapq
+from typing import List, Optional, Tuple
+import numpy as np
+
+# Points per leaf, scanned with one vectorized distance computation
+LEAF_SIZE = 16
+
+
+class NutrientKDTree:
+    """
+    Nodes are stored in flat arrays: node i covers `order[start[i]:end[i]]` with
+    bounding box `low[i]`..`high[i]` (standardized units); internal nodes have children
+    `left[i]` and `right[i]`, leaves have -1.
+    """
+
+    def __init__(self, recipe_ids: 'np.ndarray', vectors: 'np.ndarray'):
+        self.recipe_ids = recipe_ids
+        spread = vectors.std(axis=0) if len(vectors) else np.ones(vectors.shape[1])
+        self.scale = np.where(spread > 0, spread, 1.0)
+        self.points = vectors / self.scale
+        self.order = np.arange(len(vectors))
+
+        starts, ends, lefts, rights, lows, highs = [], [], [], [], [], []
+
+        def add_node(start: int, end: int) -> int:
+            points = self.points[self.order[start:end]]
+            starts.append(start)
+            ends.append(end)
+            lefts.append(-1)
+            rights.append(-1)
+            lows.append(points.min(axis=0) if end > start else np.zeros(self.points.shape[1]))
+            highs.append(points.max(axis=0) if end > start else np.zeros(self.points.shape[1]))
+            return len(starts) - 1
+
+        stack = [add_node(0, len(vectors))]
+        while stack:
+            node = stack.pop()
+            start, end = starts[node], ends[node]
+            if end - start <= LEAF_SIZE:
+                continue
+
+            # Split the widest dimension at the median
+            dimension = int(np.argmax(highs[node] - lows[node]))
+            middle = (start + end) // 2
+            segment = self.order[start:end]
+            self.order[start:end] = segment[np.argpartition(self.points[segment, dimension], middle - start)]
+            lefts[node] = add_node(start, middle)
+            rights[node] = add_node(middle, end)
+            stack.extend((lefts[node], rights[node]))
+
+        self.start = np.array(starts, dtype=np.int64)
+        self.end = np.array(ends, dtype=np.int64)
+        self.left = np.array(lefts, dtype=np.int64)
+        self.right = np.array(rights, dtype=np.int64)
+        self.low = np.array(lows).reshape(len(starts), self.points.shape[1])
+        self.high = np.array(highs).reshape(len(starts), self.points.shape[1])
+
+    def nearest(self, target: 'np.ndarray', k: int,
+                weights: Optional['np.ndarray'] = None) -> List[Tuple[int, float]]:
+        """
+        The k recipes closest to target, nearest first (ties by recipe id).
+
+        Args:
+            target: Nutrient vector in the units of the indexed vectors
+            k: Number of recipes
+            weights: Per-dimension factor on differences (default 1); distance is
+                sqrt(sum((weights * (vector - target)) ** 2))
+
+        Returns:
+            [(recipe id, distance)]
+        """
+        if k < 1 or not len(self.order):
+            return []
+
+        weights = np.ones(len(self.scale)) if weights is None else np.asarray(weights, dtype=float)
+        # Same distance in standardized units
+        query = np.asarray(target, dtype=float) / self.scale
+        squared_weights = (weights * self.scale) ** 2
+
+        def bound(node: int) -> float:
+            gap = np.maximum(np.maximum(self.low[node] - query, query - self.high[node]), 0)
+            return float(np.dot(squared_weights, gap * gap))
+
+        best: List[Tuple[float, int]] = []  # max-heap of (-distance, -recipe id), the k best so far
+        frontier = [(bound(0), 0)]
+        while frontier:
+            node_bound, node = heapq.heappop(frontier)
+            if len(best) == k and node_bound > -best[0][0]:
+                break
+
+            if self.left[node] < 0:
+                rows = self.order[self.start[node]:self.end[node]]
+                differences = self.points[rows] - query
+                distances = (differences * differences) @ squared_weights
+                for distance, recipe_id in zip(distances.tolist(), self.recipe_ids[rows].tolist()):
+                    entry = (-distance, -recipe_id)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+                continue
+
+            for child in (self.left[node], self.right[node]):
+                child_bound = bound(child)
+                if len(best) < k or child_bound <= -best[0][0]:
+                    heapq.heappush(frontier, (child_bound, int(child)))
+
+        return [(-recipe_id, float(np.sqrt(-distance))) for distance, recipe_id in sorted(best, reverse=True)]
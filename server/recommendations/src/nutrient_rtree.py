@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+R*Tree index over the per-serving nutrients of every recipe.
+
+An offline build step stores each recipe with calories as a point of the
+RecipeNutrientRTree virtual table over (calories, protein, carbohydrate, fat). Finding
+the recipes within a box around a user's per-meal targets is then an R*Tree search,
+whose cost grows with the number of recipes in the box rather than the catalogue size.
+
+Usage: python nutrient_rtree.py [--db PATH]
+"""
+
+import os
+import sqlite3
+import sys
+from typing import List, NamedTuple, Optional, TYPE_CHECKING
+
+from file_cache import VersionedCache
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+RTREE_TABLE = "RecipeNutrientRTree"
+
+# Indexed dimensions, in table column order, and the Recipe columns they come from
+DIMENSIONS = ("calories", "protein", "carbs", "fat")
+RECIPE_COLUMNS = ("calories", "protein_content", "carbohydrate_content", "fat_content")
+
+# Database version -> availability
+_table_cache = VersionedCache()
+
+
+class NutrientBox(NamedTuple):
+    """Inclusive (low, high) bounds per dimension, in DIMENSIONS order."""
+    low: tuple
+    high: tuple
+
+    def contains(self, values: 'np.ndarray') -> 'np.ndarray':
+        """Boolean array telling which (recipes, 4) nutrient rows lie in the box."""
+        import numpy as np
+
+        return np.all((values >= np.array(self.low)) & (values <= np.array(self.high)), axis=1)
+
+
+def target_box(targets: tuple, tolerance: float) -> NutrientBox:
+    """Box of ±tolerance (a fraction) around (calories, protein, carbs, fat) targets."""
+    return NutrientBox(
+        tuple(target * (1 - tolerance) for target in targets),
+        tuple(target * (1 + tolerance) for target in targets)
+    )
+
+
+def build_nutrient_rtree(db_path: str) -> int:
+    """
+    Offline build step: (re)create the RecipeNutrientRTree table for every recipe with calories.
+    Missing nutrients are stored as 0, like the nutrition scoring treats them.
+
+    Returns:
+        Number of recipes indexed
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute(f"""
+        SELECT id, {", ".join(f"COALESCE({column}, 0)" for column in RECIPE_COLUMNS)}
+        FROM Recipe
+        WHERE calories IS NOT NULL AND calories > 0
+    """)
+    rows = [
+        (recipe_id,) + tuple(bound for value in values for bound in (value, value))
+        for recipe_id, *values in cursor.fetchall()
+    ]
+
+    bounds = ", ".join(f"min_{dimension}, max_{dimension}" for dimension in DIMENSIONS)
+    cursor.execute(f"DROP TABLE IF EXISTS {RTREE_TABLE}")
+    cursor.execute(f"CREATE VIRTUAL TABLE {RTREE_TABLE} USING rtree(recipe_id, {bounds})")
+    cursor.executemany(f"INSERT INTO {RTREE_TABLE} VALUES ({', '.join('?' * (1 + 2 * len(DIMENSIONS)))})", rows)
+
+    conn.commit()
+    conn.close()
+
+    # The database file changed, older cache entries are unreachable anyway
+    _table_cache.clear()
+    return len(rows)
+
+
+def nutrient_rtree_available(db_path: str) -> bool:
+    """Whether the database has the nutrient R*Tree (and SQLite supports it)."""
+    def read_availability() -> bool:
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute(f"SELECT recipe_id FROM {RTREE_TABLE} LIMIT 1").fetchall()
+            return True
+        except sqlite3.Error:
+            return False  # Not built, or SQLite compiled without R*Tree
+        finally:
+            conn.close()
+
+    try:
+        return _table_cache.get(db_path, read_availability)
+    except FileNotFoundError:
+        return False
+
+
+def query_nutrient_box(db_path: str, box: NutrientBox) -> Optional[List[int]]:
+    """
+    Ids of the recipes in the box, from the R*Tree, or None if it was not built.
+
+    The R*Tree stores 32-bit floats rounded outwards, so the result may include
+    recipes just outside the box; callers needing exact bounds check the values.
+    """
+    if not nutrient_rtree_available(db_path):
+        return None
+
+    conditions = " AND ".join(
+        f"max_{dimension} >= ? AND min_{dimension} <= ?" for dimension in DIMENSIONS
+    )
+    params = [bound for low, high in zip(box.low, box.high) for bound in (low, high)]
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(f"SELECT recipe_id FROM {RTREE_TABLE} WHERE {conditions}", params).fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+def main():
+    args = sys.argv[1:]
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../homeal.db")
+    if len(args) == 2 and args[0] == "--db":
+        db_path = args[1]
+    elif args:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    count = build_nutrient_rtree(db_path)
+    print(f"Indexed {count} recipes into {RTREE_TABLE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,32 @@ Uses TDEE calculations and nutritional targets to recommend balanced meals.
 import json
 import sqlite3
 import math
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from dataclasses import dataclass
 from enum import Enum
+import numpy as np
+
+from file_cache import VersionedCache
+from nutrient_kdtree import NutrientKDTree
+from nutrient_rtree import query_nutrient_box, target_box
+from recipe_filtering import RecipeFilter, DietaryFilter, fetch_first_matching
+
+# Ranking objectives: best combined score first, or nearest nutrients to the targets first
+NUTRIMENT_OBJECTIVES = ("score", "nearest")
+
+# Weights of the calorie, protein, carb and fat deviations in the weighted Euclidean
+# nearest-neighbour distance, those of calculate_nutrition_score
+DISTANCE_WEIGHTS = (0.4, 0.4 / 3, 0.4 / 3, 0.4 / 3)
+
+# Users scored together in batch requests, bounding the size of the (users, recipes) score matrices
+USER_CHUNK_SIZE = 64
+
+# Recipe columns of a recommendation row, as formatted by format_recommendation
+RECOMMENDATION_COLUMNS = """id, name, total_time, images, calories, protein_content, carbohydrate_content,
+    fat_content, fiber_content, sodium_content, aggregated_rating"""
+
+# Database version -> catalogue
+_catalogue_cache = VersionedCache()
 
 
 class ActivityLevel(Enum):
@@ -42,6 +65,8 @@ class UserProfile:
     height: float  # cm
     activity_level: ActivityLevel
     meal_type: Optional[MealType] = None
+    tolerance: Optional[float] = None  # Only recipes within ±tolerance of the calorie and macro targets
+    objective: str = "score"
 
 
 @dataclass
@@ -157,87 +182,332 @@ def calculate_nutrition_score(recipe_nutrition: Dict, targets: NutritionalTarget
     return min(nutrition_score, 1.0)
 
 
-def get_nutriment_recommendations(db_path: str, user_data: str, number: int = 5) -> List[Dict[str, Any]]:
-    """
-    Get recipe recommendations based on nutritional needs.
-    
-    Args:
-        db_path: Path to SQLite database
-        user_data: JSON string containing user profile
-        number: Number of recommendations to return
-    
-    Returns:
-        List of recommended recipes sorted by nutritional fit
-    """
+def parse_user_profile(user_data: str) -> UserProfile:
+    """Parse the nutriment request JSON into a UserProfile."""
     try:
         user_json = json.loads(user_data)
-        user = UserProfile(
+        if not isinstance(user_json, dict):
+            raise ValueError("user data must be an object")
+        for field in ('age', 'weight', 'height'):
+            value = user_json[field]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                raise ValueError(f"{field} must be a positive number")
+        tolerance = user_json.get('tolerance')
+        if tolerance is not None and (isinstance(tolerance, bool) or not isinstance(tolerance, (int, float))
+                                      or tolerance <= 0):
+            raise ValueError("tolerance must be a positive number")
+        objective = user_json.get('objective', "score")
+        if objective not in NUTRIMENT_OBJECTIVES:
+            raise ValueError(f"objective must be one of {', '.join(NUTRIMENT_OBJECTIVES)}")
+        return UserProfile(
             age=user_json['age'],
             gender=Gender(user_json['gender']),
             weight=user_json['weight'],
             height=user_json['height'],
             activity_level=ActivityLevel(user_json['activity_level']),
-            meal_type=MealType(user_json.get('meal_type')) if user_json.get('meal_type') else None
+            meal_type=MealType(user_json.get('meal_type')) if user_json.get('meal_type') else None,
+            tolerance=tolerance,
+            objective=objective
         )
     except (json.JSONDecodeError, KeyError, ValueError) as e:
         raise ValueError(f"Invalid user data format: {e}")
+
+
+class NutritionCatalogue:
+    """
+    Nutrition columns of every recipe with calories, as numpy arrays sorted by recipe id,
+    so a user's targets are scored against the whole catalogue in one vectorized pass.
+    `nutrition` columns are calories, protein, carbs, fat, fiber and sodium, missing values as 0.
+    """
+    
+    def __init__(self, recipe_ids: 'np.ndarray', nutrition: 'np.ndarray', ratings: 'np.ndarray'):
+        self.recipe_ids = recipe_ids
+        self.nutrition = nutrition
+        self.ratings = ratings
+        self._kdtree: Optional[NutrientKDTree] = None
     
-    targets = calculate_nutritional_targets(user)
+    @property
+    def kdtree(self) -> NutrientKDTree:
+        """KD-tree over the calorie, protein, carb and fat columns, keyed by row; built on first use."""
+        if self._kdtree is None:
+            self._kdtree = NutrientKDTree(np.arange(len(self.recipe_ids)), self.nutrition[:, :4])
+        return self._kdtree
     
+    def subset(self, rows: 'np.ndarray') -> 'NutritionCatalogue':
+        """Catalogue of the given rows (ascending)."""
+        return NutritionCatalogue(self.recipe_ids[rows], self.nutrition[rows], self.ratings[rows])
+
+
+def build_nutrition_catalogue(db_path: str) -> NutritionCatalogue:
+    """Read the nutrition columns of every recipe with nutritional information."""
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Get recipes with nutritional information
-    query = """
-    SELECT id, name, total_time, images, calories, protein_content, 
-           carbohydrate_content, fat_content, fiber_content, sodium_content,
-           aggregated_rating
-    FROM Recipe 
-    WHERE calories IS NOT NULL AND calories > 0
-    ORDER BY aggregated_rating DESC
-    LIMIT ?
+    rows = conn.execute("""
+        SELECT id, calories, protein_content, carbohydrate_content, fat_content, fiber_content,
+               sodium_content, aggregated_rating
+        FROM Recipe
+        WHERE calories IS NOT NULL AND calories > 0
+        ORDER BY id
+    """).fetchall()
+    conn.close()
+    
+    return NutritionCatalogue(
+        np.array([row[0] for row in rows], dtype=np.int64),
+        np.array([[value or 0 for value in row[1:7]] for row in rows], dtype=float).reshape(len(rows), 6),
+        np.array([row[7] or 0 for row in rows], dtype=float)
+    )
+
+
+def load_nutrition_catalogue(db_path: str) -> NutritionCatalogue:
+    """The catalogue of a database, built on first use and cached per database version."""
+    return _catalogue_cache.get(db_path, lambda: build_nutrition_catalogue(db_path))
+
+
+def nutrient_box_rows(db_path: str, catalogue: NutritionCatalogue, targets: NutritionalTargets,
+                      tolerance: float) -> 'np.ndarray':
+    """
+    Catalogue rows within ±tolerance of the calorie, protein, carb and fat targets.
+    Candidates come from the nutrient R*Tree when it was built, else from a scan.
+    """
+    box = target_box((targets.calories, targets.protein, targets.carbs, targets.fat), tolerance)
+    recipe_ids = query_nutrient_box(db_path, box)
+    if recipe_ids is None:
+        rows = np.arange(len(catalogue.recipe_ids))
+    else:
+        wanted = np.sort(np.asarray(recipe_ids, dtype=np.int64))
+        rows = np.minimum(np.searchsorted(catalogue.recipe_ids, wanted), max(len(catalogue.recipe_ids) - 1, 0))
+        rows = rows[catalogue.recipe_ids[rows] == wanted] if len(catalogue.recipe_ids) else rows[:0]
+    # Exact bounds: the R*Tree rounds its stored values outwards
+    return rows[box.contains(catalogue.nutrition[rows, :4])]
+
+
+def top_nutrition_rows(catalogue: NutritionCatalogue, combined_scores: 'np.ndarray', k: int) -> 'np.ndarray':
+    """
+    Catalogue rows of the k best combined scores (score descending, then recipe id),
+    selected with argpartition so only the head of the ranking is sorted.
     """
+    rows = np.arange(len(combined_scores))
+    if 0 < k < len(rows):
+        # Keep everything scoring at least the k-th score, so ties are ordered by id below
+        kth = combined_scores[np.argpartition(-combined_scores, k - 1)[k - 1]]
+        rows = np.flatnonzero(combined_scores >= kth)
+    order = np.lexsort((catalogue.recipe_ids[rows], -combined_scores[rows]))[:max(k, 0)]
+    return rows[order]
+
+
+def _fetch_nutrition_recommendations(db_path: str, catalogue: NutritionCatalogue, nutrition_scores: 'np.ndarray',
+                                     combined_scores: 'np.ndarray', number: int, conditions: str,
+                                     params: List[Any]) -> List[Dict[str, Any]]:
+    """The `number` best scored recipes passing the filter conditions, formatted."""
+    def ranked_ids() -> Iterator[int]:
+        # Recipes rejected by the filter are replaced by the next ones: widen k until the catalogue is exhausted
+        k, emitted = max(number * 2, 16), 0
+        while True:
+            rows = top_nutrition_rows(catalogue, combined_scores, k)
+            yield from catalogue.recipe_ids[rows[emitted:]].tolist()
+            emitted = len(rows)
+            if len(rows) < k:
+                return
+            k *= 4
     
-    cursor.execute(query, (number * 4,))  # Get more to filter and rank
-    recipes = cursor.fetchall()
-    conn.close()
+    recipe_rows = fetch_first_matching(db_path, ranked_ids(), number, RECOMMENDATION_COLUMNS, conditions, params)
+    positions = catalogue.recipe_ids.searchsorted([recipe_row[0] for recipe_row in recipe_rows]).tolist()
+    return [
+        format_recommendation(recipe_row, float(nutrition_scores[position]), float(combined_scores[position]))
+        for recipe_row, position in zip(recipe_rows, positions)
+    ]
+
+
+def nearest_nutrition_rows(catalogue: NutritionCatalogue, targets: NutritionalTargets, k: int) -> tuple:
+    """
+    Catalogue rows of the k recipes nearest to the calorie, protein, carb and fat targets.
+    The distance is the Euclidean (L2) norm of the relative deviations from each target,
+    with calculate_nutrition_score's weights, so meal-type scaled targets move both the
+    center and the scale. The score sums the weighted deviations instead (L1, capped per
+    nutrient), so this order only approximates the score order.
+    
+    Returns:
+        (rows, distances) lists, nearest first (ties by recipe id)
+    """
+    target = np.array([targets.calories, targets.protein, targets.carbs, targets.fat])
+    weights = np.array(DISTANCE_WEIGHTS) / np.where(target > 0, target, 1.0)
+    nearest = catalogue.kdtree.nearest(target, k, weights)
+    return [row for row, _ in nearest], [distance for _, distance in nearest]
+
+
+def _fetch_nearest_recommendations(db_path: str, catalogue: NutritionCatalogue, targets: NutritionalTargets,
+                                   tolerance: Optional[float], number: int, conditions: str,
+                                   params: List[Any]) -> List[Dict[str, Any]]:
+    """The `number` recipes nearest to the targets passing the filter conditions (and tolerance), formatted."""
+    box = target_box((targets.calories, targets.protein, targets.carbs, targets.fat), tolerance) if tolerance else None
+    # No recipe of the box is farther than its corners
+    box_radius = tolerance * math.sqrt(sum(weight * weight for weight in DISTANCE_WEIGHTS)) if tolerance else math.inf
+    distances: Dict[int, float] = {}
     
+    def ranked_ids() -> Iterator[int]:
+        # Widen k until enough recipes pass the filter or the catalogue is exhausted
+        k, emitted = max(number * 2, 16), 0
+        while True:
+            rows, row_distances = nearest_nutrition_rows(catalogue, targets, k)
+            for row, distance in zip(rows[emitted:], row_distances[emitted:]):
+                if distance > box_radius * (1 + 1e-9):
+                    return
+                if box is None or box.contains(catalogue.nutrition[row:row + 1, :4])[0]:
+                    recipe_id = int(catalogue.recipe_ids[row])
+                    distances[recipe_id] = distance
+                    yield recipe_id
+            emitted = len(rows)
+            if len(rows) < k:
+                return
+            k *= 4
+    
+    recipe_rows = fetch_first_matching(db_path, ranked_ids(), number, RECOMMENDATION_COLUMNS, conditions, params)
+    positions = catalogue.recipe_ids.searchsorted([recipe_row[0] for recipe_row in recipe_rows])
+    nutrition_scores, combined_scores = calculate_nutrition_score_matrix(
+        catalogue.nutrition[positions], catalogue.ratings[positions], [targets]
+    )
     recommendations = []
-    for recipe_row in recipes:
-        (recipe_id, name, total_time, images, calories, protein, carbs, 
-         fat, fiber, sodium, rating) = recipe_row
-        
-        recipe_nutrition = {
-            'calories': calories or 0,
-            'protein_content': protein or 0,
-            'carbohydrate_content': carbs or 0,
-            'fat_content': fat or 0,
-            'fiber_content': fiber or 0,
-            'sodium_content': sodium or 0
-        }
+    for recipe_row, nutrition_score, combined_score in zip(recipe_rows, nutrition_scores[0].tolist(),
+                                                           combined_scores[0].tolist()):
+        recommendation = format_recommendation(recipe_row, nutrition_score, combined_score)
+        recommendation["nutrient_distance"] = round(distances[recipe_row[0]], 3)
+        recommendations.append(recommendation)
+    return recommendations
+
+
+def format_recommendation(recipe_row: tuple, nutrition_score: float, combined_score: float) -> Dict[str, Any]:
+    """Recommendation dict of a RECOMMENDATION_COLUMNS row and its scores."""
+    (recipe_id, name, total_time, images, calories, protein, carbs,
+     fat, fiber, sodium, rating) = recipe_row
+    return {
+        "id": recipe_id,
+        "name": name,
+        "total_time": total_time or 0,
+        "image_url": images or "",
+        "nutrient_score": round(nutrition_score, 2),  # Changed from nutrition_score
+        "combined_score": round(combined_score, 2),
+        "calories": calories,
+        "protein_content": protein,  # Changed from protein
+        "carbohydrate_content": carbs,  # Changed from carbs  
+        "fat_content": fat  # Changed from fat
+    }
+
+
+def get_nutriment_recommendations(db_path: str, user_data: str, number: int = 5,
+                                  dietary_filter: Optional[DietaryFilter] = None) -> List[Dict[str, Any]]:
+    """
+    Get recipe recommendations based on nutritional needs.
+    
+    Args:
+        db_path: Path to SQLite database
+        user_data: JSON string containing user profile
+        number: Number of recommendations to return
+        dietary_filter: Constraints the returned recipes must satisfy
+    
+    Returns:
+        List of recommended recipes sorted by nutritional fit, from the whole catalogue
+    """
+    user = parse_user_profile(user_data)
+    return rank_nutriment_recommendations_batch(db_path, [user], number, dietary_filter)[0]
+
+
+def calculate_nutrition_score_matrix(nutrition: 'np.ndarray', ratings: 'np.ndarray',
+                                     targets_list: List[NutritionalTargets]):
+    """
+    Vectorized calculate_nutrition_score for many users at once.
+    
+    Args:
+        nutrition: (recipes, 6) calories, protein, carbs, fat, fiber and sodium, as in NutritionCatalogue
+        ratings: Aggregated rating of each recipe
+        targets_list: One NutritionalTargets per user
+    
+    Returns:
+        (nutrition_scores, combined_scores) numpy arrays of shape (users, recipes)
+    """
+    cals, protein, carbs, fat, fiber, sodium = (nutrition[:, i] for i in range(6))
+    targets = np.array(
+        [[t.calories, t.protein, t.carbs, t.fat, t.fiber, t.sodium_limit] for t in targets_list],
+        dtype=float
+    ).reshape(len(targets_list), 6)
+    target_cals, target_protein, target_carbs, target_fat, target_fiber, target_sodium = (
+        targets[:, i:i + 1] for i in range(6)
+    )
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        calorie_score = np.maximum(0, 1 - np.abs(cals - target_cals) / target_cals)
         
-        nutrition_score = calculate_nutrition_score(recipe_nutrition, targets)
+        protein_score = np.where(target_protein > 0, np.maximum(0, 1 - np.abs(protein - target_protein) / target_protein), 0)
+        carb_score = np.where(target_carbs > 0, np.maximum(0, 1 - np.abs(carbs - target_carbs) / target_carbs), 0)
+        fat_score = np.where(target_fat > 0, np.maximum(0, 1 - np.abs(fat - target_fat) / target_fat), 0)
+        macro_score = (protein_score + carb_score + fat_score) / 3
         
-        # Combine nutrition score with rating (if available)
-        rating_score = (rating or 0) / 5.0  # Normalize to 0-1
-        combined_score = (nutrition_score * 0.7) + (rating_score * 0.3)
+        fiber_bonus = np.where(target_fiber > 0, np.minimum(fiber / target_fiber, 1), 0)
+        sodium_penalty = np.where(target_sodium > 0, np.maximum(0, 1 - (sodium / target_sodium)), 1)
+        health_score = (fiber_bonus + sodium_penalty) / 2
         
-        recommendations.append({
-            "id": recipe_id,
-            "name": name,
-            "total_time": total_time or 0,
-            "image_url": images or "",
-            "nutrient_score": round(nutrition_score, 2),  # Changed from nutrition_score
-            "combined_score": round(combined_score, 2),
-            "calories": calories,
-            "protein_content": protein,  # Changed from protein
-            "carbohydrate_content": carbs,  # Changed from carbs  
-            "fat_content": fat  # Changed from fat
-        })
-    
-    # Sort by combined score and return top results
-    recommendations.sort(key=lambda x: x['combined_score'], reverse=True)
-    return recommendations[:number]
+        nutrition_scores = (calorie_score * 0.4) + (macro_score * 0.4) + (health_score * 0.2)
+        nutrition_scores = np.where(target_cals == 0, 0.0, np.minimum(nutrition_scores, 1.0))
+    
+    combined_scores = (nutrition_scores * 0.7) + ((ratings / 5.0) * 0.3)
+    return nutrition_scores, combined_scores
+
+
+def rank_nutriment_recommendations_batch(db_path: str, users: List[UserProfile], number: int = 5,
+                                         dietary_filter: Optional[DietaryFilter] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Get nutriment recommendations for many users, scoring every (user, recipe) pair of
+    the whole catalogue as one matrix per chunk of users.
+    
+    Args:
+        db_path: Path to SQLite database
+        users: Parsed user profiles
+        number: Number of recommendations per user
+        dietary_filter: Constraints shared by all users
+    
+    Returns:
+        One recommendation list per user, best combined score (or nearest) first
+    """
+    if not users:
+        return []
+    
+    catalogue = load_nutrition_catalogue(db_path)
+    if not len(catalogue.recipe_ids):
+        return [[] for _ in users]
+    
+    conditions, params = RecipeFilter(db_path).build_sql_conditions(dietary_filter)
+    targets_list = [calculate_nutritional_targets(user) for user in users]
+    results: List[List[Dict[str, Any]]] = [[] for _ in users]
+    
+    # Nearest-neighbour users search the KD-tree; users with a tolerance only score the
+    # recipes in the box around their targets
+    for user_index, user in enumerate(users):
+        if user.objective == "nearest":
+            results[user_index] = _fetch_nearest_recommendations(
+                db_path, catalogue, targets_list[user_index], user.tolerance, number, conditions, params
+            )
+        elif user.tolerance is not None:
+            targets = targets_list[user_index]
+            candidates = catalogue.subset(nutrient_box_rows(db_path, catalogue, targets, user.tolerance))
+            nutrition_scores, combined_scores = calculate_nutrition_score_matrix(
+                candidates.nutrition, candidates.ratings, [targets]
+            )
+            results[user_index] = _fetch_nutrition_recommendations(
+                db_path, candidates, nutrition_scores[0], combined_scores[0], number, conditions, params
+            )
+    
+    whole = [
+        user_index for user_index, user in enumerate(users) if user.objective == "score" and user.tolerance is None
+    ]
+    for chunk_start in range(0, len(whole), USER_CHUNK_SIZE):
+        chunk = whole[chunk_start:chunk_start + USER_CHUNK_SIZE]
+        nutrition_scores, combined_scores = calculate_nutrition_score_matrix(
+            catalogue.nutrition, catalogue.ratings, [targets_list[user_index] for user_index in chunk]
+        )
+        for user_index, nutrition_row, combined_row in zip(chunk, nutrition_scores, combined_scores):
+            results[user_index] = _fetch_nutrition_recommendations(
+                db_path, catalogue, nutrition_row, combined_row, number, conditions, params
+            )
+    
+    return results
 
 
 if __name__ == "__main__":
@@ -6,13 +6,18 @@ Uses review_light.parquet to find similar users and recommend 5-star recipes.
 
 import json
 import sqlite3
-import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 from dataclasses import dataclass
 from datetime import datetime
 import os
 
+from file_cache import VersionedCache
+from recipe_filtering import RecipeFilter, DietaryFilter, fetch_first_matching
+
+if TYPE_CHECKING:
+    import pandas as pd  # Imported lazily in load_review_data, only the parquet path needs it
+
 
 @dataclass
 class UserRating:
@@ -26,9 +31,13 @@ class SimilarUser:
     user_id: int
     similarity_score: float
 
+# Read-only review data shared by every request served from this process
+# (and copy-on-write by pre-forked workers). Keyed by source file version and kind of data.
+_review_data_cache = VersionedCache()
+
 
-def load_review_data(parquet_path: str) -> pd.DataFrame:
-    """Load review data from parquet file."""
+def load_review_data(parquet_path: str) -> 'pd.DataFrame':
+    """Load review data from parquet file, reusing the copy already in memory."""
     if not os.path.exists(parquet_path):
         # Try alternative paths
         alternative_paths = [
@@ -43,10 +52,38 @@ def load_review_data(parquet_path: str) -> pd.DataFrame:
         else:
             raise FileNotFoundError(f"Could not find review_light.parquet in expected locations")
     
-    return pd.read_parquet(parquet_path)
+    def read_parquet() -> 'pd.DataFrame':
+        import pandas as pd
+        return pd.read_parquet(parquet_path)
+
+    return _review_data_cache.get(parquet_path, read_parquet, "parquet")
+
+
+def read_review_profiles(db_path: str) -> Dict[int, Dict[int, float]]:
+    """Read every reviewer's ratings from the Review table as {author_id: {recipe_id: rating}}."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT author_id, recipe_id, rating FROM Review")
+    
+    profiles = {}
+    for author_id, recipe_id, rating in cursor.fetchall():
+        if author_id not in profiles:
+            profiles[author_id] = {}
+        profiles[author_id][recipe_id] = rating
+    
+    conn.close()
+    return profiles
+
+
+def load_review_profiles(db_path: str) -> Dict[int, Dict[int, float]]:
+    """
+    Load every reviewer's ratings from the Review table as {author_id: {recipe_id: rating}}.
+    The result is cached per database version and must be treated as read-only.
+    """
+    return _review_data_cache.get(db_path, lambda: read_review_profiles(db_path), "profiles")
 
 
-def create_intelligent_mock_ratings(review_df: pd.DataFrame, num_users: int = 5) -> List[Dict[str, Any]]:
+def create_intelligent_mock_ratings(review_df: 'pd.DataFrame', num_users: int = 5) -> List[Dict[str, Any]]:
     """
     Create intelligent mock user rating data based on real review patterns.
     
@@ -129,7 +166,7 @@ def calculate_user_similarity_enhanced(user1_ratings: Dict[int, float],
 
 
 def find_similar_users_enhanced(target_ratings: Dict[int, float], 
-                               review_df: pd.DataFrame, 
+                               review_df: 'pd.DataFrame', 
                                min_common_recipes: int = 2, 
                                top_k: int = 10) -> List[SimilarUser]:
     """
@@ -167,7 +204,7 @@ def find_similar_users_enhanced(target_ratings: Dict[int, float],
 
 
 def get_recommendation_candidates_enhanced(similar_users: List[SimilarUser], 
-                                         review_df: pd.DataFrame,
+                                         review_df: 'pd.DataFrame',
                                          target_user_ratings: Dict[int, float],
                                          min_rating: float = 4.5) -> Dict[int, float]:
     """
@@ -313,7 +350,8 @@ def get_enhanced_preference_recommendations(db_path: str,
 
 def get_preference_recommendations(db_path: str, 
                                   user_data: str, 
-                                  number: int = 5) -> List[Dict[str, Any]]:
+                                  number: int = 5,
+                                  dietary_filter: Optional[DietaryFilter] = None) -> List[Dict[str, Any]]:
     """
     Get preference-based recommendations using the unified database.
     
@@ -321,6 +359,7 @@ def get_preference_recommendations(db_path: str,
         db_path: Path to SQLite database
         user_data: JSON string with user ratings
         number: Number of recommendations to return
+        dietary_filter: Constraints applied to the candidate recipes before ranking
         
     Returns:
         List of recommended recipes with preference scores
@@ -335,29 +374,15 @@ def get_preference_recommendations(db_path: str,
         if not user_ratings:
             return []  # No ratings provided
         
-        # Connect to database
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Get all user ratings from database
-        cursor.execute("""
-            SELECT author_id, recipe_id, rating 
-            FROM Review 
-            WHERE author_id != ? OR author_id IS NULL
-        """, (user_id,))
-        
-        all_ratings = cursor.fetchall()
-        
-        # Organize ratings by user
-        user_rating_dict = {}
-        for author_id, recipe_id, rating in all_ratings:
-            if author_id not in user_rating_dict:
-                user_rating_dict[author_id] = {}
-            user_rating_dict[author_id][recipe_id] = rating
+        # Get all other users' ratings (shared, read-only)
+        user_rating_dict = load_review_profiles(db_path)
         
         # Find similar users using cosine similarity
         similar_users = []
         for other_user_id, other_ratings in user_rating_dict.items():
+            if other_user_id == user_id:
+                continue
+            
             # Find common recipes
             common_recipes = set(user_ratings.keys()) & set(other_ratings.keys())
             if len(common_recipes) < 2:  # Need at least 2 common recipes
@@ -393,8 +418,20 @@ def get_preference_recommendations(db_path: str,
             return []
         
         # Get recipe details for top candidates
-        top_recipes = sorted(recipe_scores.items(), key=lambda x: x[1], reverse=True)[:number * 2]
-        recipe_ids = [recipe_id for recipe_id, _ in top_recipes]
+        ranked_ids = [recipe_id for recipe_id, _ in sorted(recipe_scores.items(), key=lambda x: x[1], reverse=True)]
+        
+        conditions, filter_params = RecipeFilter(db_path).build_sql_conditions(dietary_filter)
+        if conditions:
+            # Walk down the ranking and keep the best candidates that pass the filter
+            rows = fetch_first_matching(db_path, ranked_ids, number * 2, "id", conditions, filter_params)
+            recipe_ids = [row[0] for row in rows]
+            if not recipe_ids:
+                return []
+        else:
+            recipe_ids = ranked_ids[:number * 2]
+        
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
         
         placeholders = ",".join("?" for _ in recipe_ids)
         query = f"""
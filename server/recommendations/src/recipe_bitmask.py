@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Precomputed dietary bitmask per recipe.
+
+An offline build step stores one integer per recipe in the RecipeFilterMask side table,
+with one bit per allergen, per dietary regime keyword match and per meat/gluten heuristic,
+following the vocabularies of RecipeFilter. Regime and allergen filtering then becomes
+a bitwise test instead of substring scans over ingredient names and keywords.
+
+Usage: python recipe_bitmask.py [--db PATH]
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from typing import Dict, Any, List, Optional, NamedTuple
+
+from file_cache import VersionedCache
+from recipe_filtering import RecipeFilter, DietaryFilter
+
+
+MASK_TABLE = "RecipeFilterMask"
+INFO_TABLE = "RecipeFilterMaskInfo"
+
+# Bit layout: allergens, then regimes, then the two heuristics
+ALLERGEN_BITS = {allergen: 1 << i for i, allergen in enumerate(RecipeFilter.ALLERGEN_INGREDIENTS)}
+REGIME_BITS = {
+    regime: 1 << (len(ALLERGEN_BITS) + i) for i, regime in enumerate(RecipeFilter.REGIME_KEYWORDS)
+}
+MEAT_BIT = 1 << (len(ALLERGEN_BITS) + len(REGIME_BITS))
+GLUTEN_BIT = MEAT_BIT << 1
+
+# Regimes that also accept untagged recipes without the heuristic's ingredients
+REGIME_FALLBACK_BITS = {'vegetarian': MEAT_BIT, 'gluten_free': GLUTEN_BIT}
+
+# Database version -> availability
+_table_cache = VersionedCache()
+
+
+class MaskQuery(NamedTuple):
+    """
+    Bit tests equivalent to the regime and allergen part of a DietaryFilter.
+    A recipe passes when no `forbidden` bit is set and, if `required` is non-zero,
+    it has a `required` bit or none of the `absent` bits.
+    """
+    forbidden: int = 0
+    required: int = 0
+    absent: int = 0
+
+    def is_empty(self) -> bool:
+        return not self.forbidden and not self.required
+
+
+def vocabulary_signature() -> str:
+    """Fingerprint of the vocabularies, so masks built from older vocabularies are ignored."""
+    vocabulary = [
+        RecipeFilter.ALLERGEN_INGREDIENTS,
+        RecipeFilter.REGIME_KEYWORDS,
+        RecipeFilter.MEAT_KEYWORDS,
+        RecipeFilter.GLUTEN_KEYWORDS
+    ]
+    return hashlib.sha1(json.dumps(vocabulary).encode("utf-8")).hexdigest()
+
+
+def compute_recipe_mask(keywords: Optional[str], ingredient_names: List[str]) -> int:
+    """Compute the bitmask of one recipe from its keywords and lowercase ingredient names."""
+    keywords_lower = (keywords or '').lower()
+    mask = 0
+
+    for allergen, items in RecipeFilter.ALLERGEN_INGREDIENTS.items():
+        if any(item in name for name in ingredient_names for item in items):
+            mask |= ALLERGEN_BITS[allergen]
+
+    for regime, regime_keywords in RecipeFilter.REGIME_KEYWORDS.items():
+        if any(keyword in keywords_lower for keyword in regime_keywords):
+            mask |= REGIME_BITS[regime]
+
+    if any(meat in keywords_lower for meat in RecipeFilter.MEAT_KEYWORDS):
+        mask |= MEAT_BIT
+    if any(gluten in keywords_lower for gluten in RecipeFilter.GLUTEN_KEYWORDS):
+        mask |= GLUTEN_BIT
+
+    return mask
+
+
+def mask_query(dietary_filter: Optional[DietaryFilter]) -> MaskQuery:
+    """Translate the regime and allergies of a filter into bit tests."""
+    if dietary_filter is None:
+        return MaskQuery()
+
+    forbidden = 0
+    for allergen in dietary_filter.allergies:
+        forbidden |= ALLERGEN_BITS.get(allergen.lower(), 0)
+
+    regime = (dietary_filter.regime or '').lower()
+    if regime in REGIME_BITS:
+        return MaskQuery(forbidden, REGIME_BITS[regime], REGIME_FALLBACK_BITS.get(regime, 0))
+    return MaskQuery(forbidden)
+
+
+def mask_sql_expression(query: MaskQuery, column: str) -> tuple:
+    """
+    SQL boolean expression applying a MaskQuery to an integer mask column.
+
+    Returns:
+        (expression, parameters)
+    """
+    conditions = []
+    params: List[Any] = []
+
+    if query.forbidden:
+        conditions.append(f"({column} & ?) = 0")
+        params.append(query.forbidden)
+
+    if query.required:
+        if query.absent:
+            conditions.append(f"(({column} & ?) != 0 OR ({column} & ?) = 0)")
+            params.extend([query.required, query.absent])
+        else:
+            conditions.append(f"({column} & ?) != 0")
+            params.append(query.required)
+
+    return " AND ".join(conditions) or "1", params
+
+
+def build_bitmask_table(db_path: str) -> int:
+    """
+    Offline build step: (re)create the RecipeFilterMask side table for every recipe.
+
+    Returns:
+        Number of recipes indexed
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    ingredients_by_recipe: Dict[int, List[str]] = {}
+    cursor.execute("""
+        SELECT ri.recipe_id, i.name
+        FROM RecipeIngredient ri
+        JOIN Ingredient i ON ri.ingredient_id = i.id
+    """)
+    for recipe_id, name in cursor.fetchall():
+        ingredients_by_recipe.setdefault(recipe_id, []).append(name.lower())
+
+    cursor.execute("SELECT id, keywords FROM Recipe")
+    rows = [
+        (recipe_id, compute_recipe_mask(keywords, ingredients_by_recipe.get(recipe_id, [])))
+        for recipe_id, keywords in cursor.fetchall()
+    ]
+
+    cursor.execute(f"DROP TABLE IF EXISTS {MASK_TABLE}")
+    cursor.execute(f"DROP TABLE IF EXISTS {INFO_TABLE}")
+    cursor.execute(f"""
+        CREATE TABLE {MASK_TABLE} (
+            recipe_id INTEGER PRIMARY KEY NOT NULL,
+            mask INTEGER NOT NULL
+        )
+    """)
+    cursor.execute(f"CREATE TABLE {INFO_TABLE} (signature TEXT NOT NULL)")
+    cursor.executemany(f"INSERT INTO {MASK_TABLE} (recipe_id, mask) VALUES (?, ?)", rows)
+    cursor.execute(f"INSERT INTO {INFO_TABLE} (signature) VALUES (?)", (vocabulary_signature(),))
+
+    conn.commit()
+    conn.close()
+
+    # The database file changed, older cache entries are unreachable anyway
+    _table_cache.clear()
+    return len(rows)
+
+
+def bitmask_table_available(db_path: str) -> bool:
+    """Whether the database has a mask table built from the current vocabularies."""
+    def read_availability() -> bool:
+        conn = sqlite3.connect(db_path)
+        try:
+            row = conn.execute(f"SELECT signature FROM {INFO_TABLE}").fetchone()
+            return row is not None and row[0] == vocabulary_signature()
+        except sqlite3.Error:
+            return False  # Not built
+        finally:
+            conn.close()
+
+    try:
+        return _table_cache.get(db_path, read_availability)
+    except FileNotFoundError:
+        return False
+
+
+def main():
+    args = sys.argv[1:]
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../homeal.db")
+    if len(args) == 2 and args[0] == "--db":
+        db_path = args[1]
+    elif args:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    count = build_bitmask_table(db_path)
+    print(f"Indexed {count} recipes into {MASK_TABLE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,61 @@ Ensures all APIs return appropriate recipes based on user constraints.
 
 import sqlite3
 import json
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Tuple, Iterable
 from dataclasses import dataclass
+from itertools import islice
+
+
+# Recipe ids per IN (...) query, below SQLite's default parameter limit
+SQL_CHUNK_SIZE = 500
+
+
+def _escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def fetch_first_matching(db_path: str, ordered_ids: Iterable[int], number: int, columns: str = "id",
+                         conditions: str = "", params: Optional[List[Any]] = None) -> List[tuple]:
+    """
+    Walk down an ordering of recipe ids and return the Recipe rows of the first
+    `number` recipes matching conditions, in that order.
+    The ordering is consumed lazily, in chunks growing while matches are scarce.
+    
+    Args:
+        db_path: Path to SQLite database
+        ordered_ids: Recipe ids, best first (any iterable, e.g. a generator)
+        number: Number of rows to return
+        columns: Column list to select; the first column must be the recipe id
+        conditions: SQL conditions on Recipe (as built by RecipeFilter.build_sql_conditions)
+        params: Parameters of conditions
+    """
+    if number <= 0:
+        return []
+    
+    ordered_ids = iter(ordered_ids)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    rows: List[tuple] = []
+    chunk_size = min(max(number * 2, 16), SQL_CHUNK_SIZE)
+    while len(rows) < number:
+        chunk = list(islice(ordered_ids, chunk_size))
+        if not chunk:
+            break
+        
+        cursor.execute(f"""
+            SELECT {columns}
+            FROM Recipe
+            WHERE id IN ({",".join("?" * len(chunk))}) {"AND " + conditions if conditions else ""}
+        """, chunk + list(params or []))
+        found = {row[0]: row for row in cursor.fetchall()}
+        rows.extend(found[recipe_id] for recipe_id in chunk if recipe_id in found)
+        
+        chunk_size = min(chunk_size * 2, SQL_CHUNK_SIZE)
+    
+    conn.close()
+    return rows[:number]
 
 
 @dataclass
@@ -53,24 +106,43 @@ class RecipeFilter:
         'fish': ['salmon', 'tuna', 'cod', 'fish']
     }
     
+    # Heuristics used when a recipe is not explicitly tagged for a regime
+    MEAT_KEYWORDS = ['chicken', 'beef', 'pork', 'lamb', 'turkey', 'meat', 'bacon', 'sausage']
+    GLUTEN_KEYWORDS = ['flour', 'wheat', 'bread', 'pasta', 'noodle', 'biscuit', 'cake', 'cookie']
+    
     def __init__(self, db_path: str):
         self.db_path = db_path
     
     def get_recipe_ingredients(self, recipe_id: int) -> List[str]:
         """Get all ingredient names for a recipe."""
+        return self.get_recipes_ingredients([recipe_id])[recipe_id]
+    
+    def get_recipes_ingredients(self, recipe_ids: List[int]) -> Dict[int, List[str]]:
+        """
+        Get the ingredient names of many recipes with one connection.
+        Recipes without ingredients map to an empty list.
+        """
+        ingredients_by_recipe: Dict[int, List[str]] = {recipe_id: [] for recipe_id in recipe_ids}
+        if not ingredients_by_recipe:
+            return ingredients_by_recipe
+        
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT i.name 
-            FROM RecipeIngredient ri 
-            JOIN Ingredient i ON ri.ingredient_id = i.id 
-            WHERE ri.recipe_id = ?
-        """, (recipe_id,))
+        ids = list(ingredients_by_recipe)
+        for start in range(0, len(ids), SQL_CHUNK_SIZE):
+            chunk = ids[start:start + SQL_CHUNK_SIZE]
+            cursor.execute(f"""
+                SELECT ri.recipe_id, i.name 
+                FROM RecipeIngredient ri 
+                JOIN Ingredient i ON ri.ingredient_id = i.id 
+                WHERE ri.recipe_id IN ({",".join("?" * len(chunk))})
+            """, chunk)
+            for recipe_id, name in cursor.fetchall():
+                ingredients_by_recipe[recipe_id].append(name.lower())
         
-        ingredients = [row[0].lower() for row in cursor.fetchall()]
         conn.close()
-        return ingredients
+        return ingredients_by_recipe
     
     def matches_dietary_regime(self, recipe: Dict[str, Any], regime: str) -> bool:
         """Check if recipe matches dietary regime."""
@@ -97,8 +169,7 @@ class RecipeFilter:
             if any(keyword in keywords_lower for keyword in required_keywords):
                 return True
             # Also exclude recipes with obvious meat ingredients
-            meat_keywords = ['chicken', 'beef', 'pork', 'lamb', 'turkey', 'meat', 'bacon', 'sausage']
-            return not any(meat in keywords_lower for meat in meat_keywords)
+            return not any(meat in keywords_lower for meat in self.MEAT_KEYWORDS)
         
         elif regime == 'keto':
             # Look for keto or low carb keywords
@@ -109,35 +180,133 @@ class RecipeFilter:
             if any(keyword in keywords_lower for keyword in required_keywords):
                 return True
             # Also check if recipe doesn't contain obvious gluten ingredients
-            gluten_keywords = ['flour', 'wheat', 'bread', 'pasta', 'noodle', 'biscuit', 'cake', 'cookie']
-            return not any(gluten in keywords_lower for gluten in gluten_keywords)
+            return not any(gluten in keywords_lower for gluten in self.GLUTEN_KEYWORDS)
         
         else:
             # For other regimes, just check for presence of keywords
             return any(keyword in keywords_lower for keyword in required_keywords)
     
+    def find_blacklisted_recipes(self, recipe_ids: List[int], blacklisted: List[str],
+                                 allergies: List[str] = None,
+                                 ingredients_by_recipe: Optional[Dict[int, List[str]]] = None) -> Set[int]:
+        """
+        Return the ids of the recipes containing blacklisted ingredients or allergens.
+        
+        Each distinct ingredient name of the candidate set is checked against the
+        blacklist once, then recipes are flagged by lookup.
+        
+        Args:
+            recipe_ids: Candidate recipe ids
+            blacklisted: Ingredients to avoid (substring match)
+            allergies: Allergen names from ALLERGEN_INGREDIENTS
+            ingredients_by_recipe: Already loaded ingredient names; read from the database if None
+        """
+        terms = self.get_blacklist_terms(blacklisted, allergies)
+        if not terms or not recipe_ids:
+            return set()
+        
+        if ingredients_by_recipe is None:
+            ingredients_by_recipe = self.get_recipes_ingredients(recipe_ids)
+        
+        names = {name for recipe_id in recipe_ids for name in ingredients_by_recipe.get(recipe_id, [])}
+        forbidden = {name for name in names if any(term in name for term in terms)}
+        
+        return {
+            recipe_id for recipe_id in recipe_ids
+            if any(name in forbidden for name in ingredients_by_recipe.get(recipe_id, []))
+        }
+    
     def has_blacklisted_ingredients(self, recipe_id: int, blacklisted: List[str], allergies: List[str] = None) -> bool:
         """Check if recipe contains blacklisted ingredients or allergens."""
-        if not blacklisted and not allergies:
-            return False
+        return recipe_id in self.find_blacklisted_recipes([recipe_id], blacklisted, allergies)
+    
+    def get_blacklist_terms(self, blacklisted: List[str], allergies: List[str] = None) -> List[str]:
+        """Lowercase ingredient substrings to avoid: blacklisted items plus the allergens' ingredients."""
+        terms = [item.lower() for item in (blacklisted or [])]
+        for allergen in (allergies or []):
+            terms.extend(self.ALLERGEN_INGREDIENTS.get(allergen.lower(), []))
+        return list(dict.fromkeys(terms))
+    
+    def build_sql_conditions(self, dietary_filter: Optional[DietaryFilter],
+                             recipe_alias: str = "Recipe") -> Tuple[str, List[Any]]:
+        """
+        Translate a dietary filter into SQL conditions on the Recipe table, so recommenders
+        can apply it while generating candidates instead of filtering afterwards.
+        Semantics match filter_recipes(): regime via matches_dietary_regime's keyword rules,
+        blacklisted ingredients and allergens via ingredient name substrings. Regime and
+        allergens are tested against the precomputed recipe bitmasks when they are built.
+        
+        Args:
+            dietary_filter: Dietary filtering preferences (None means no filtering)
+            recipe_alias: Name or alias of the Recipe table in the caller's query
+            
+        Returns:
+            (conditions joined with AND, parameters); conditions is empty when nothing is filtered
+        """
+        if dietary_filter is None:
+            return "", []
+        
+        conditions = []
+        params: List[Any] = []
+        keywords = f"LOWER(COALESCE({recipe_alias}.keywords, ''))"
+        
+        def any_like(column: str, terms: List[str]) -> str:
+            params.extend(f"%{_escape_like(term)}%" for term in terms)
+            return " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for _ in terms)
+        
+        def no_ingredient_like(terms: List[str]) -> str:
+            return f"""NOT EXISTS (
+                SELECT 1 FROM RecipeIngredient ri_filter
+                JOIN Ingredient i_filter ON ri_filter.ingredient_id = i_filter.id
+                WHERE ri_filter.recipe_id = {recipe_alias}.id AND ({any_like('LOWER(i_filter.name)', terms)})
+            )"""
+        
+        def vocabulary_conditions() -> List[str]:
+            # Regime via matches_dietary_regime's keyword rules, allergens via ingredient substrings
+            vocabulary = []
+            regime = (dietary_filter.regime or '').lower()
+            if regime and regime != 'none' and regime in self.REGIME_KEYWORDS:
+                required = any_like(keywords, self.REGIME_KEYWORDS[regime])
+                if regime == 'vegetarian':
+                    excluded = any_like(keywords, self.MEAT_KEYWORDS)
+                    vocabulary.append(f"(({required}) OR NOT ({excluded}))")
+                elif regime == 'gluten_free':
+                    excluded = any_like(keywords, self.GLUTEN_KEYWORDS)
+                    vocabulary.append(f"(({required}) OR NOT ({excluded}))")
+                else:
+                    vocabulary.append(f"({required})")
+            
+            allergen_terms = self.get_blacklist_terms([], dietary_filter.allergies)
+            if allergen_terms:
+                vocabulary.append(no_ingredient_like(allergen_terms))
+            return vocabulary
         
-        recipe_ingredients = self.get_recipe_ingredients(recipe_id)
+        if dietary_filter.max_calories:
+            conditions.append(f"({recipe_alias}.calories IS NULL OR {recipe_alias}.calories <= ?)")
+            params.append(dietary_filter.max_calories)
         
-        # Check direct blacklisted ingredients
-        for blacklisted_item in (blacklisted or []):
-            if any(blacklisted_item.lower() in ingredient for ingredient in recipe_ingredients):
-                return True
+        if dietary_filter.min_rating:
+            conditions.append(f"({recipe_alias}.aggregated_rating IS NULL OR {recipe_alias}.aggregated_rating >= ?)")
+            params.append(dietary_filter.min_rating)
         
-        # Check allergens
-        for allergen in (allergies or []):
-            allergen_lower = allergen.lower()
-            if allergen_lower in self.ALLERGEN_INGREDIENTS:
-                allergen_ingredients = self.ALLERGEN_INGREDIENTS[allergen_lower]
-                for allergen_ingredient in allergen_ingredients:
-                    if any(allergen_ingredient in ingredient for ingredient in recipe_ingredients):
-                        return True
-        
-        return False
+        # Regime and allergens come from fixed vocabularies, precomputed per recipe when the
+        # bitmask table is built; recipes missing from it fall back to the substring scans
+        from recipe_bitmask import mask_query, mask_sql_expression, bitmask_table_available, MASK_TABLE
+        
+        query = mask_query(dietary_filter)
+        if not query.is_empty() and bitmask_table_available(self.db_path):
+            expression, mask_params = mask_sql_expression(query, "m_filter.mask")
+            params.extend(mask_params)
+            mask_lookup = f"SELECT {expression} FROM {MASK_TABLE} m_filter WHERE m_filter.recipe_id = {recipe_alias}.id"
+            conditions.append(f"COALESCE(({mask_lookup}), {' AND '.join(vocabulary_conditions()) or '1'})")
+        else:
+            conditions.extend(vocabulary_conditions())
+        
+        blacklisted = list(dict.fromkeys(item.lower() for item in dietary_filter.blacklisted_ingredients))
+        if blacklisted:
+            conditions.append(no_ingredient_like(blacklisted))
+        
+        return " AND ".join(conditions), params
     
     def filter_recipes(self, recipes: List[Dict[str, Any]], dietary_filter: DietaryFilter) -> List[Dict[str, Any]]:
         """
@@ -152,17 +321,19 @@ class RecipeFilter:
         """
         filtered_recipes = []
         
+        # Check blacklisted ingredients and allergens for the whole set at once
+        excluded_ids = self.find_blacklisted_recipes(
+            [recipe['id'] for recipe in recipes],
+            dietary_filter.blacklisted_ingredients,
+            dietary_filter.allergies
+        )
+        
         for recipe in recipes:
             # Check dietary regime
             if not self.matches_dietary_regime(recipe, dietary_filter.regime):
                 continue
             
-            # Check blacklisted ingredients and allergens
-            if self.has_blacklisted_ingredients(
-                recipe['id'], 
-                dietary_filter.blacklisted_ingredients, 
-                dietary_filter.allergies
-            ):
+            if recipe['id'] in excluded_ids:
                 continue
             
             # Check calorie limit
@@ -179,53 +350,31 @@ class RecipeFilter:
         
         return filtered_recipes
     
-    def get_filtered_recipes(self, dietary_filter: DietaryFilter, limit: int = 50) -> List[Dict[str, Any]]:
+    def get_filtered_recipes(self, dietary_filter: DietaryFilter, limit: int = 50,
+                             seed: Any = None) -> List[Dict[str, Any]]:
         """
-        Get recipes from database with dietary filtering applied.
+        Get random recipes from database with dietary filtering applied.
         
         Args:
             dietary_filter: Dietary filtering preferences
             limit: Maximum number of recipes to return
+            seed: Optional seed making the selection reproducible
             
         Returns:
             List of filtered recipes
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Build base query
-        base_query = """
-            SELECT id, name, total_time, images, keywords, calories, aggregated_rating, review_count
-            FROM Recipe 
-            WHERE 1=1
-        """
-        params = []
-        
-        # Add calorie filter to SQL query for efficiency
-        if dietary_filter.max_calories:
-            base_query += " AND (calories IS NULL OR calories <= ?)"
-            params.append(dietary_filter.max_calories)
-        
-        # Add rating filter to SQL query
-        if dietary_filter.min_rating:
-            base_query += " AND (aggregated_rating IS NULL OR aggregated_rating >= ?)"
-            params.append(dietary_filter.min_rating)
-        
-        # Add dietary regime filter to SQL query for efficiency
-        if dietary_filter.regime and dietary_filter.regime.lower() != 'none':
-            regime_keywords = self.REGIME_KEYWORDS.get(dietary_filter.regime.lower(), [])
-            if regime_keywords:
-                keyword_conditions = " OR ".join(["LOWER(keywords) LIKE ?" for _ in regime_keywords])
-                base_query += f" AND ({keyword_conditions})"
-                params.extend([f"%{keyword}%" for keyword in regime_keywords])
-        
-        base_query += f" ORDER BY RANDOM() LIMIT ?"
-        params.append(limit * 3)  # Get more recipes to filter for blacklisted ingredients
-        
-        cursor.execute(base_query, params)
+        from recipe_sampler import sample_recipes
+        
+        # Every constraint is applied in SQL, but only to the randomly drawn ids
+        conditions, params = self.build_sql_conditions(dietary_filter)
+        rows = sample_recipes(
+            self.db_path,
+            "id, name, total_time, images, keywords, calories, aggregated_rating, review_count",
+            limit, conditions, params, seed
+        )
         
         recipes = []
-        for row in cursor.fetchall():
+        for row in rows:
             recipe = {
                 'id': row[0],
                 'name': row[1],
@@ -238,27 +387,11 @@ class RecipeFilter:
             }
             recipes.append(recipe)
         
-        conn.close()
-        
-        # Apply ingredient blacklist filtering
-        if dietary_filter.blacklisted_ingredients or dietary_filter.allergies:
-            filtered_recipes = []
-            for recipe in recipes:
-                if not self.has_blacklisted_ingredients(
-                    recipe['id'], 
-                    dietary_filter.blacklisted_ingredients, 
-                    dietary_filter.allergies
-                ):
-                    filtered_recipes.append(recipe)
-                    if len(filtered_recipes) >= limit:
-                        break
-            return filtered_recipes
-        
-        return recipes[:limit]
+        return recipes
     
     def ensure_minimum_recipes(self, recipes: List[Dict[str, Any]], 
                              dietary_filter: DietaryFilter, 
-                             minimum: int = 3) -> List[Dict[str, Any]]:
+                             minimum: int = 3, seed: Any = None) -> List[Dict[str, Any]]:
         """
         Ensure we have at least minimum number of recipes.
         If not enough, gradually relax constraints.
@@ -267,6 +400,7 @@ class RecipeFilter:
             recipes: Current filtered recipes
             dietary_filter: Current dietary filter
             minimum: Minimum number of recipes required
+            seed: Optional seed for the random recipes added
             
         Returns:
             List with at least minimum recipes (if available in database)
@@ -283,7 +417,7 @@ class RecipeFilter:
                 max_calories=None,  # Remove calorie limit
                 min_rating=dietary_filter.min_rating
             )
-            additional_recipes = self.get_filtered_recipes(relaxed_filter, minimum * 2)
+            additional_recipes = self.get_filtered_recipes(relaxed_filter, minimum * 2, seed)
             combined = recipes + [r for r in additional_recipes if r['id'] not in [existing['id'] for existing in recipes]]
             if len(combined) >= minimum:
                 return combined[:minimum * 2]
@@ -297,7 +431,7 @@ class RecipeFilter:
                 max_calories=None,
                 min_rating=None  # Remove rating requirement
             )
-            additional_recipes = self.get_filtered_recipes(relaxed_filter, minimum * 2)
+            additional_recipes = self.get_filtered_recipes(relaxed_filter, minimum * 2, seed)
             combined = recipes + [r for r in additional_recipes if r['id'] not in [existing['id'] for existing in recipes]]
             if len(combined) >= minimum:
                 return combined[:minimum * 2]
@@ -310,7 +444,7 @@ class RecipeFilter:
             max_calories=None,
             min_rating=None
         )
-        additional_recipes = self.get_filtered_recipes(essential_filter, minimum * 3)
+        additional_recipes = self.get_filtered_recipes(essential_filter, minimum * 3, seed)
         combined = recipes + [r for r in additional_recipes if r['id'] not in [existing['id'] for existing in recipes]]
         
         return combined[:max(minimum, len(combined))]
@@ -335,6 +469,20 @@ def parse_dietary_filter_from_data(data: Dict[str, Any]) -> DietaryFilter:
     )
 
 
+def dietary_filter_key(dietary_filter: DietaryFilter) -> tuple:
+    """
+    Canonical, hashable form of a DietaryFilter.
+    Filters that only differ in case or list order map to the same key.
+    """
+    return (
+        (dietary_filter.regime or '').lower(),
+        tuple(sorted({item.lower() for item in dietary_filter.blacklisted_ingredients})),
+        tuple(sorted({item.lower() for item in dietary_filter.allergies})),
+        dietary_filter.max_calories,
+        dietary_filter.min_rating
+    )
+
+
 if __name__ == "__main__":
     # Test the filtering system
     filter_system = RecipeFilter("../../homeal.db")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Uniform random sampling of recipes without ORDER BY RANDOM().
+Recipe ids are loaded once per database version; a lazily shuffled walk over them
+draws candidates in small batches and filters are only evaluated for drawn ids.
+"""
+
+import random
+import sqlite3
+from array import array
+from typing import Dict, Any, List, Optional, Iterator
+
+from file_cache import VersionedCache
+from recipe_filtering import fetch_first_matching
+
+# Database version -> recipe ids
+_id_cache = VersionedCache()
+
+
+def read_recipe_ids(db_path: str) -> array:
+    """All recipe ids, in ascending order."""
+    conn = sqlite3.connect(db_path)
+    ids = array('q', (row[0] for row in conn.execute("SELECT id FROM Recipe ORDER BY id")))
+    conn.close()
+    return ids
+
+
+def load_recipe_ids(db_path: str) -> array:
+    """All recipe ids, cached per database version and treated as read-only."""
+    return _id_cache.get(db_path, lambda: read_recipe_ids(db_path))
+
+
+def random_order(count: int, rng: random.Random) -> Iterator[int]:
+    """
+    Yield the positions 0..count-1 in uniformly random order.
+    A sparse Fisher-Yates shuffle: only swapped positions are stored, so drawing
+    k positions costs O(k) time and memory whatever the catalogue size.
+    """
+    swapped: Dict[int, int] = {}
+    for i in range(count):
+        j = rng.randrange(i, count)
+        yield swapped.get(j, j)
+        swapped[j] = swapped.pop(i, i)
+
+
+def sample_recipes(db_path: str, columns: str, number: int, conditions: str = "",
+                   params: Optional[List[Any]] = None, seed: Any = None) -> List[tuple]:
+    """
+    Draw up to `number` distinct Recipe rows uniformly at random among those matching conditions.
+
+    Args:
+        db_path: Path to SQLite database
+        columns: Column list to select; the first column must be the recipe id
+        number: Number of rows to return
+        conditions: SQL conditions on Recipe (as built by RecipeFilter.build_sql_conditions)
+        params: Parameters of conditions
+        seed: Optional seed making the draw reproducible for a given database
+
+    Returns:
+        Rows in draw order
+    """
+    if number <= 0:
+        return []
+
+    ids = load_recipe_ids(db_path)
+    drawn = (ids[position] for position in random_order(len(ids), random.Random(seed)))
+    return fetch_first_matching(db_path, drawn, number, columns, conditions, params)
+
+
+def parse_seed(data: Dict[str, Any]) -> Optional[int]:
+    """Read the optional integer `seed` of a request."""
+    seed = data.get('seed')
+    if seed is None:
+        return None
+    if isinstance(seed, bool) or not isinstance(seed, int):
+        raise ValueError("seed must be an integer")
+    return seed
@@ -4,29 +4,59 @@ Main recommendation API handler.
 Routes requests to appropriate recommendation systems and provides a unified interface.
 """
 
+import functools
 import json
 import sys
 import os
-from typing import Dict, Any, List
+import threading
+from typing import Callable, Dict, Any, List, Optional, TYPE_CHECKING
 
 # Add current directory to path for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
+# The recommendation engines load numpy (and the preference engine pandas), so they are
+# imported by the request types using them: random requests load neither
 try:
-    from leftover_recommendation import get_leftover_recommendations
-    from nutriment_recommendation import get_nutriment_recommendations  
-    from preference_recommendation import get_preference_recommendations, get_intelligent_mock_users
-    from recipe_filtering import RecipeFilter, DietaryFilter, parse_dietary_filter_from_data
+    from recipe_filtering import RecipeFilter, DietaryFilter, parse_dietary_filter_from_data, dietary_filter_key
+    from recommendation_cache import RecommendationCache, recommendation_cache_key
+    from recipe_sampler import parse_seed
 except ImportError as e:
     print(f"Import error: {e}", file=sys.stderr)
     print(f"Current directory: {current_dir}", file=sys.stderr)
     print(f"Python path: {sys.path}", file=sys.stderr)
     sys.exit(1)
 
+if TYPE_CHECKING:
+    from leftover_session import LeftoverSessionStore
+
+
+def _error_response(response_type: str) -> Callable:
+    """
+    Decorator turning the exceptions of an API method into error responses of the given
+    type: ValueError is invalid input, anything else an internal error.
+    """
+    def decorate(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs) -> Dict[str, Any]:
+            try:
+                return method(*args, **kwargs)
+            except ValueError as e:
+                return {
+                    "error": f"Invalid input data: {str(e)}",
+                    "type": response_type
+                }
+            except Exception as e:
+                return {
+                    "error": f"Internal error: {str(e)}",
+                    "type": response_type
+                }
+        return wrapper
+    return decorate
+
 
 class RecommendationAPI:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, cache_size: int = 1024, cache_ttl: float = 300.0):
         if db_path is None:
             # Try to find the database relative to this script's location
             import os
@@ -37,6 +67,49 @@ class RecommendationAPI:
         
         # Initialize the filtering system
         self.filter_system = RecipeFilter(self.db_path)
+        
+        # Result cache, disabled with cache_size=0
+        self.cache = RecommendationCache(self.db_path, cache_size, cache_ttl) if cache_size > 0 else None
+        
+        # Fridges of the households using incremental leftover sessions, created on first use
+        self._sessions: Optional['LeftoverSessionStore'] = None
+        self._sessions_lock = threading.Lock()
+    
+    @property
+    def sessions(self) -> 'LeftoverSessionStore':
+        with self._sessions_lock:
+            if self._sessions is None:
+                from leftover_session import LeftoverSessionStore
+                self._sessions = LeftoverSessionStore(self.db_path)
+            return self._sessions
+    
+    def warm_up(self) -> None:
+        """
+        Load the large read-only data sets up front so a long-lived worker (and any
+        processes forked from it) serves its first request without paying for them.
+        No database connection is left open, so the process is safe to fork afterwards.
+        """
+        from preference_recommendation import load_review_data, load_review_profiles
+        from ingredient_index import load_ingredient_index
+        from ingredient_autocomplete import load_autocomplete_trie
+        from nutriment_recommendation import load_nutrition_catalogue
+        
+        if os.path.exists(self.db_path):
+            load_review_profiles(self.db_path)
+            load_ingredient_index(self.db_path)
+            load_autocomplete_trie(self.db_path)
+            load_nutrition_catalogue(self.db_path)
+        try:
+            load_review_data("review_light.parquet")
+        except FileNotFoundError:
+            pass  # Optional data set, the preference path falls back to the database
+    
+    MESSAGES = {
+        "ingredients": "Recipes optimized for your leftover ingredients",
+        "nutriments": "Recipes tailored to your nutritional needs",
+        "preferences": "Recipes recommended based on similar users' preferences",
+        "random": "Random recipe recommendations"
+    }
     
     def get_recommendations(self, recommendation_type: str, data: str, number: int = 5) -> Dict[str, Any]:
         """
@@ -56,107 +129,39 @@ class RecommendationAPI:
             
             # Extract dietary filtering preferences from request
             dietary_filter = parse_dietary_filter_from_data(data_dict)
+            seed = parse_seed(data_dict)
             
-            # Get base recommendations
-            if recommendation_type == "ingredients":
-                recommendations = get_leftover_recommendations(self.db_path, data, number * 3)  # Get more to filter
-                message = "Recipes optimized for your leftover ingredients"
+            cache_key = self._cache_key(recommendation_type, data_dict, number, dietary_filter)
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
             
+            # Get base recommendations, with the dietary filter applied during candidate generation
+            if recommendation_type == "ingredients":
+                from leftover_recommendation import get_leftover_recommendations
+                recommendations = get_leftover_recommendations(self.db_path, data, number, dietary_filter)
+
             elif recommendation_type == "nutriments":
-                recommendations = get_nutriment_recommendations(self.db_path, data, number * 3)  # Get more to filter
-                message = "Recipes tailored to your nutritional needs"
-            
+                from nutriment_recommendation import get_nutriment_recommendations
+                recommendations = get_nutriment_recommendations(self.db_path, data, number, dietary_filter)
+
             elif recommendation_type == "preferences":
-                recommendations = get_preference_recommendations(self.db_path, data, number * 3)  # Get more to filter
-                message = "Recipes recommended based on similar users' preferences"
+                from preference_recommendation import get_preference_recommendations
+                recommendations = get_preference_recommendations(self.db_path, data, number, dietary_filter)
             
             elif recommendation_type == "random":
                 # Random recommendations don't have algorithm-specific logic, use filter system directly
                 recommendations = []
-                message = "Random recipe recommendations"
             
             else:
-                return {
-                    "error": f"Unknown recommendation type: {recommendation_type}",
-                    "valid_types": ["ingredients", "nutriments", "preferences", "random"]
-                }
+                return self._unknown_type_error(recommendation_type)
             
-            # Apply dietary filtering if we have recommendations
-            if recommendations:
-                # Convert to format expected by filter system
-                recipe_dicts = []
-                for rec in recommendations:
-                    # Get additional recipe data for filtering
-                    recipe_dict = {
-                        'id': rec['id'],
-                        'name': rec['name'],
-                        'total_time': rec.get('total_time', 0),
-                        'image_url': rec.get('image_url', ''),
-                        'keywords': '',  # Will be loaded by filter system
-                        'calories': rec.get('calories'),
-                        'aggregated_rating': rec.get('avg_rating')
-                    }
-                    # Copy all other fields from the recommendation
-                    for key, value in rec.items():
-                        if key not in recipe_dict:
-                            recipe_dict[key] = value
-                    recipe_dicts.append(recipe_dict)
-                
-                # Apply filtering
-                filtered_recommendations = self.filter_system.filter_recipes(recipe_dicts, dietary_filter)
-                
-                # Ensure we have enough recipes
-                if len(filtered_recommendations) < number:
-                    # Get additional filtered recipes from database
-                    additional_recipes = self.filter_system.get_filtered_recipes(dietary_filter, number * 2)
-                    
-                    # Convert additional recipes to recommendation format
-                    existing_ids = {rec['id'] for rec in filtered_recommendations}
-                    for recipe in additional_recipes:
-                        if recipe['id'] not in existing_ids and len(filtered_recommendations) < number:
-                            # Convert to recommendation format
-                            filtered_recommendations.append({
-                                'id': recipe['id'],
-                                'name': recipe['name'],
-                                'total_time': recipe['total_time'],
-                                'image_url': recipe['image_url']
-                            })
-                
-                # Ensure minimum number of recipes
-                final_recommendations = self.filter_system.ensure_minimum_recipes(
-                    filtered_recommendations, dietary_filter, min(number, 3)
-                )[:number]
-                
-            else:
-                # No base recommendations, get filtered recipes directly
-                final_recommendations = self.filter_system.get_filtered_recipes(dietary_filter, number)
-                final_recommendations = self.filter_system.ensure_minimum_recipes(
-                    final_recommendations, dietary_filter, min(number, 3)
-                )
-            
-            # Add filtering info to message
-            filter_info = []
-            if dietary_filter.regime:
-                filter_info.append(f"{dietary_filter.regime}")
-            if dietary_filter.blacklisted_ingredients:
-                filter_info.append(f"avoiding {', '.join(dietary_filter.blacklisted_ingredients)}")
-            if dietary_filter.allergies:
-                filter_info.append(f"allergen-free ({', '.join(dietary_filter.allergies)})")
-            
-            if filter_info:
-                message += f" | Filtered for: {', '.join(filter_info)}"
-            
-            return {
-                "type": recommendation_type,
-                "recommendations": final_recommendations,
-                "message": message,
-                "filters_applied": {
-                    "dietary_regime": dietary_filter.regime,
-                    "blacklisted_ingredients": dietary_filter.blacklisted_ingredients,
-                    "allergies": dietary_filter.allergies,
-                    "max_calories": dietary_filter.max_calories
-                }
-            }
+            final_recommendations = self._complete_recommendations(recommendations, dietary_filter, number, seed=seed)
+            response = self._build_response(recommendation_type, final_recommendations, dietary_filter)
+            if cache_key is not None:
+                self.cache.put(cache_key, response)
+            return response
                 
         except json.JSONDecodeError as e:
             return {
@@ -173,6 +178,413 @@ class RecommendationAPI:
                 "error": f"Internal error: {str(e)}",
                 "type": recommendation_type
             }
+    
+    def get_recommendations_batch(self, recommendation_type: str, data_list: List[str],
+                                  number: int = 5) -> Dict[str, Any]:
+        """
+        Get recommendations for many users of the same type in one call.
+        
+        The candidate catalogue is loaded once for the whole batch, nutriment users are
+        scored as one (users x recipes) matrix, and dietary filters are parsed and applied
+        once per distinct filter rather than once per user.
+        
+        Args:
+            recommendation_type: Type of recommendation ("ingredients", "nutriments", "preferences", "random")
+            data_list: JSON strings with input data, one per user
+            number: Number of recommendations to return per user
+            
+        Returns:
+            Dictionary with one get_recommendations-style result per input, in order
+        """
+        if recommendation_type not in self.MESSAGES:
+            return self._unknown_type_error(recommendation_type)
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(data_list)
+        parsed = {}  # index -> (data, dietary_filter, seed)
+        cache_keys = {}  # index -> cache key of the inputs that still need computing
+        for index, data in enumerate(data_list):
+            try:
+                data_dict = json.loads(data)
+                dietary_filter = parse_dietary_filter_from_data(data_dict)
+                seed = parse_seed(data_dict)
+                cache_key = self._cache_key(recommendation_type, data_dict, number, dietary_filter)
+                if cache_key is not None:
+                    cached = self.cache.get(cache_key)
+                    if cached is not None:
+                        results[index] = cached
+                        continue
+                    cache_keys[index] = cache_key
+                parsed[index] = (data, dietary_filter, seed)
+            except json.JSONDecodeError as e:
+                results[index] = {"error": f"Invalid JSON data: {str(e)}", "type": recommendation_type}
+            except (ValueError, AttributeError) as e:
+                results[index] = {"error": f"Invalid input data: {str(e)}", "type": recommendation_type}
+        
+        # Group users sharing the same dietary filter (and seed): candidates are generated once per filter
+        groups: Dict[tuple, List[int]] = {}
+        for index, (_, dietary_filter, seed) in parsed.items():
+            groups.setdefault((dietary_filter_key(dietary_filter), seed), []).append(index)
+
+        for indexes in groups.values():
+            _, dietary_filter, seed = parsed[indexes[0]]
+            try:
+                base = self._get_base_recommendations_batch(
+                    recommendation_type, {index: parsed[index][0] for index in indexes}, number, dietary_filter
+                )
+
+                shared_fallback = None
+                for index in indexes:
+                    recommendations = base[index]
+                    if isinstance(recommendations, ValueError):
+                        results[index] = {"error": f"Invalid input data: {str(recommendations)}", "type": recommendation_type}
+                        continue
+
+                    if recommendations and len(recommendations) < number and shared_fallback is None:
+                        shared_fallback = self.filter_system.get_filtered_recipes(dietary_filter, number * 2, seed)
+                    final_recommendations = self._complete_recommendations(
+                        recommendations, dietary_filter, number, shared_fallback, seed
+                    )
+                    results[index] = self._build_response(
+                        recommendation_type, final_recommendations, parsed[index][1]
+                    )
+                    if index in cache_keys:
+                        self.cache.put(cache_keys[index], results[index])
+
+            except Exception as e:
+                for index in indexes:
+                    if results[index] is None:
+                        results[index] = {"error": f"Internal error: {str(e)}", "type": recommendation_type}
+        
+        return {
+            "type": recommendation_type,
+            "count": len(results),
+            "results": results
+        }
+    
+    @_error_response("ingredients")
+    def update_leftover_session(self, household: str, action: str, data: Dict[str, Any],
+                                number: int = 5) -> Dict[str, Any]:
+        """
+        Apply one fridge change to a household's leftover session and return its recommendations.
+        Only the recipes using the changed ingredient are re-scored.
+        
+        Args:
+            household: Session key
+            action: "set" (data["ingredients"] is the whole fridge), "add" (data["ingredient"]),
+                "remove" (data["name"]), "get" (no change) or "close"
+            data: Action payload, plus the dietary filter fields of an ingredients request
+            number: Number of recommendations to return
+            
+        Returns:
+            Ingredients response with the household and its fridge, or {"household", "closed"} for close
+        """
+        from leftover_recommendation import (
+            parse_leftover_items, fetch_ranked_recipes, leftover_quantity_coverage, leftover_shopping_lists
+        )
+        
+        if not isinstance(household, str) or not household:
+            raise ValueError("household must be a non-empty string")
+        
+        if action == "close":
+            return {"household": household, "closed": self.sessions.close(household)}
+        
+        dietary_filter = parse_dietary_filter_from_data(data)
+        with self.sessions.lock:
+            if action == "set":
+                session = self.sessions.create(household, parse_leftover_items(data.get('ingredients', [])))
+            elif action in ("add", "remove", "get"):
+                session = self.sessions.get(household)
+                if session is None:
+                    # Expired, evicted or never started
+                    raise ValueError(f"no session for household {household}, start one with 'set'")
+                if action == "add":
+                    leftover, = parse_leftover_items([data.get('ingredient')])
+                    session.add(leftover)
+                elif action == "remove":
+                    name = data.get('name')
+                    if not isinstance(name, str):
+                        raise ValueError("name must be a string")
+                    session.remove(name)
+            else:
+                raise ValueError(f"unknown session action: {action}")
+            
+            leftovers = list(session.leftovers.values())
+            recommendations = fetch_ranked_recipes(
+                self.db_path, session.top, number, dietary_filter,
+                lambda recipe_ids: leftover_quantity_coverage(session.index, leftovers, recipe_ids),
+                lambda recipe_ids: leftover_shopping_lists(session.index, leftovers, recipe_ids)
+            )
+            fridge = sorted(session.leftovers)
+        
+        final_recommendations = self._complete_recommendations(recommendations, dietary_filter, number)
+        response = self._build_response("ingredients", final_recommendations, dietary_filter)
+        response.update(household=household, fridge=fridge)
+        return response
+    
+    @_error_response("leftover_plan")
+    def get_leftover_plan(self, data: Dict[str, Any], number: int = 3) -> Dict[str, Any]:
+        """
+        Plan several meals that together use up as many soon-expiring leftovers as possible.
+        
+        Args:
+            data: Ingredients request data ("ingredients" plus the dietary filter fields)
+            number: Number of meals to plan
+        
+        Returns:
+            {"type": "leftover_plan", "recipes", "covered", "uncovered", "uncovered_expiring",
+            "filters_applied"}; fewer recipes are planned when too few use any leftover
+        """
+        from leftover_recommendation import parse_leftover_items
+        from leftover_planner import plan_leftover_meals
+        
+        leftovers = parse_leftover_items(data.get('ingredients', []))
+        dietary_filter = parse_dietary_filter_from_data(data)
+        plan = plan_leftover_meals(self.db_path, leftovers, number, dietary_filter)
+        
+        response = {"type": "leftover_plan"}
+        response.update(plan)
+        response["filters_applied"] = self._filters_applied(dietary_filter)
+        return response
+    
+    @_error_response("meal_plan")
+    def get_meal_plan(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Plan a day of meals, one recipe per meal type, adding up to the user's daily targets.
+        
+        Args:
+            data: Nutriments request data (the user profile plus the dietary filter fields);
+                meal_type is ignored
+        
+        Returns:
+            {"type": "meal_plan", "meals", "unplanned", "totals", "targets", "deviation",
+            "filters_applied"}
+        """
+        from nutriment_recommendation import parse_user_profile
+        from meal_planner import plan_daily_meals
+        
+        user = parse_user_profile(json.dumps(data))
+        dietary_filter = parse_dietary_filter_from_data(data)
+        plan = plan_daily_meals(self.db_path, user, dietary_filter)
+        
+        response = {"type": "meal_plan"}
+        response.update(plan)
+        response["filters_applied"] = self._filters_applied(dietary_filter)
+        return response
+    
+    @_error_response("weekly_plan")
+    def get_weekly_plan(self, data: Dict[str, Any], days: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Plan several days of meals at once, without repeating recipes and using up the fridge.
+        
+        Args:
+            data: Nutriments request data plus the optional "ingredients" of an ingredients
+                request (the fridge) and "max_shared_ingredients"; meal_type is ignored
+            days: Number of days to plan (default week_planner.DEFAULT_DAYS)
+        
+        Returns:
+            {"type": "weekly_plan", "days", "targets", "leftovers_used", "leftovers_unused",
+            "filters_applied"}
+        """
+        from leftover_recommendation import parse_leftover_items
+        from nutriment_recommendation import parse_user_profile
+        from week_planner import plan_weekly_meals, DEFAULT_DAYS, MAX_SHARED_INGREDIENTS
+        
+        if days is None:
+            days = DEFAULT_DAYS
+        user = parse_user_profile(json.dumps(data))
+        leftovers = parse_leftover_items(data.get('ingredients', []))
+        dietary_filter = parse_dietary_filter_from_data(data)
+        plan = plan_weekly_meals(
+            self.db_path, user, leftovers, dietary_filter, days,
+            data.get('max_shared_ingredients', MAX_SHARED_INGREDIENTS)
+        )
+        
+        response = {"type": "weekly_plan"}
+        response.update(plan)
+        response["filters_applied"] = self._filters_applied(dietary_filter)
+        return response
+    
+    @_error_response("shopping_list")
+    def get_shopping_list(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Aggregated shopping list of planned recipes, minus what the fridge holds.
+        
+        Args:
+            data: {"recipe_ids": [...], "ingredients": [...]} with the optional fridge in
+                the format of an ingredients request
+        
+        Returns:
+            {"type": "shopping_list", "items", "covered", "missing_recipe_ids"}
+        """
+        from leftover_recommendation import parse_leftover_items
+        from shopping_list import build_shopping_list
+        
+        recipe_ids = data.get('recipe_ids')
+        if not isinstance(recipe_ids, list) or any(
+            isinstance(recipe_id, bool) or not isinstance(recipe_id, int) for recipe_id in recipe_ids
+        ):
+            raise ValueError("recipe_ids must be a list of recipe ids")
+        leftovers = parse_leftover_items(data.get('ingredients', []))
+        
+        response = {"type": "shopping_list"}
+        response.update(build_shopping_list(self.db_path, recipe_ids, leftovers))
+        return response
+    
+    def _get_base_recommendations_batch(self, recommendation_type: str, data_by_index: Dict[int, str],
+                                        number: int, dietary_filter: DietaryFilter) -> Dict[int, Any]:
+        """
+        Run the type-specific recommender for inputs sharing one dietary filter, sharing
+        catalogue reads. Inputs that fail validation map to their ValueError.
+        """
+        base: Dict[int, Any] = {}
+
+        if recommendation_type == "ingredients":
+            from leftover_recommendation import parse_leftover_data, parse_leftover_objective, rank_leftover_recipes
+
+            fridges = {}
+            for index, data in data_by_index.items():
+                try:
+                    fridges[index] = (parse_leftover_data(data), parse_leftover_objective(data))
+                except ValueError as e:
+                    base[index] = e
+
+            # Every fridge is ranked against the same in-memory ingredient index
+            for index, (leftovers, objective) in fridges.items():
+                base[index] = rank_leftover_recipes(
+                    self.db_path, leftovers, number, dietary_filter, objective
+                ) if leftovers else []
+
+        elif recommendation_type == "nutriments":
+            from nutriment_recommendation import parse_user_profile, rank_nutriment_recommendations_batch
+
+            users = {}
+            for index, data in data_by_index.items():
+                try:
+                    users[index] = parse_user_profile(data)
+                except ValueError as e:
+                    base[index] = e
+
+            if users:
+                ranked = rank_nutriment_recommendations_batch(
+                    self.db_path, list(users.values()), number, dietary_filter
+                )
+                for index, recommendations in zip(users, ranked):
+                    base[index] = recommendations
+
+        elif recommendation_type == "preferences":
+            from preference_recommendation import get_preference_recommendations
+
+            # Review profiles are loaded once and shared by every call
+            for index, data in data_by_index.items():
+                try:
+                    base[index] = get_preference_recommendations(self.db_path, data, number, dietary_filter)
+                except ValueError as e:
+                    base[index] = e
+        
+        else:
+            for index in data_by_index:
+                base[index] = []
+        
+        return base
+    
+    def _complete_recommendations(self, recommendations: List[Dict[str, Any]],
+                                  dietary_filter: DietaryFilter, number: int,
+                                  additional_recipes: Optional[List[Dict[str, Any]]] = None,
+                                  seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Top up recommendations (already filtered by their recommender) with other
+        filtered recipes until `number` (or at least a minimum) is reached.
+        The random top-up is reproducible when a seed is given.
+        """
+        if not recommendations:
+            # No base recommendations, get filtered recipes directly
+            final_recommendations = self.filter_system.get_filtered_recipes(dietary_filter, number, seed)
+            return self.filter_system.ensure_minimum_recipes(
+                final_recommendations, dietary_filter, min(number, 3), seed
+            )
+        
+        filtered_recommendations = []
+        for rec in recommendations:
+            # Copy all fields from the recommendation, with the filter system defaults first
+            recipe_dict = {
+                'id': rec['id'],
+                'name': rec['name'],
+                'total_time': rec.get('total_time', 0),
+                'image_url': rec.get('image_url', ''),
+                'keywords': '',
+                'calories': rec.get('calories'),
+                'aggregated_rating': rec.get('avg_rating')
+            }
+            for key, value in rec.items():
+                if key not in recipe_dict:
+                    recipe_dict[key] = value
+            filtered_recommendations.append(recipe_dict)
+        
+        # Ensure we have enough recipes
+        if len(filtered_recommendations) < number:
+            # Get additional filtered recipes from database
+            if additional_recipes is None:
+                additional_recipes = self.filter_system.get_filtered_recipes(dietary_filter, number * 2, seed)
+            
+            # Convert additional recipes to recommendation format
+            existing_ids = {rec['id'] for rec in filtered_recommendations}
+            for recipe in additional_recipes:
+                if recipe['id'] not in existing_ids and len(filtered_recommendations) < number:
+                    # Convert to recommendation format
+                    filtered_recommendations.append({
+                        'id': recipe['id'],
+                        'name': recipe['name'],
+                        'total_time': recipe['total_time'],
+                        'image_url': recipe['image_url']
+                    })
+        
+        # Ensure minimum number of recipes
+        return self.filter_system.ensure_minimum_recipes(
+            filtered_recommendations, dietary_filter, min(number, 3), seed
+        )[:number]
+    
+    def _build_response(self, recommendation_type: str, recommendations: List[Dict[str, Any]],
+                        dietary_filter: DietaryFilter) -> Dict[str, Any]:
+        message = self.MESSAGES[recommendation_type]
+        
+        # Add filtering info to message
+        filter_info = []
+        if dietary_filter.regime:
+            filter_info.append(f"{dietary_filter.regime}")
+        if dietary_filter.blacklisted_ingredients:
+            filter_info.append(f"avoiding {', '.join(dietary_filter.blacklisted_ingredients)}")
+        if dietary_filter.allergies:
+            filter_info.append(f"allergen-free ({', '.join(dietary_filter.allergies)})")
+        
+        if filter_info:
+            message += f" | Filtered for: {', '.join(filter_info)}"
+        
+        return {
+            "type": recommendation_type,
+            "recommendations": recommendations,
+            "message": message,
+            "filters_applied": self._filters_applied(dietary_filter)
+        }
+    
+    def _filters_applied(self, dietary_filter: DietaryFilter) -> Dict[str, Any]:
+        return {
+            "dietary_regime": dietary_filter.regime,
+            "blacklisted_ingredients": dietary_filter.blacklisted_ingredients,
+            "allergies": dietary_filter.allergies,
+            "max_calories": dietary_filter.max_calories
+        }
+    
+    def _cache_key(self, recommendation_type: str, data: Dict[str, Any], number: int,
+                   dietary_filter: DietaryFilter) -> Optional[tuple]:
+        if self.cache is None or recommendation_type not in self.MESSAGES:
+            return None
+        return recommendation_cache_key(recommendation_type, data, number, dietary_filter)
+    
+    def _unknown_type_error(self, recommendation_type: str) -> Dict[str, Any]:
+        return {
+            "error": f"Unknown recommendation type: {recommendation_type}",
+            "valid_types": list(self.MESSAGES)
+        }
 
 
 def main():
@@ -222,6 +634,7 @@ def get_example_data():
     
     # Get intelligent mock user data based on real review patterns
     try:
+        from preference_recommendation import get_intelligent_mock_users
         mock_users = get_intelligent_mock_users("../homeal.db")
         preferences_example = mock_users[0] if mock_users else {
             "user_id": 90001,
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+In-process result cache for the recommendation API.
+Bounded LRU with TTL, invalidated whenever the underlying SQLite database changes.
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Any, Optional
+
+from recipe_filtering import DietaryFilter, dietary_filter_key
+
+
+# Request fields that are covered by the DietaryFilter part of the key
+FILTER_FIELDS = {'dietary_regime', 'blacklisted_ingredients', 'allergies', 'max_calories', 'min_rating'}
+
+# One connection per process for PRAGMA data_version (SQLite connections must not cross fork())
+_version_connections: Dict[tuple, sqlite3.Connection] = {}
+_version_lock = threading.Lock()
+
+
+def database_version(db_path: str) -> tuple:
+    """
+    Cheap fingerprint of the database contents.
+    Combines the size and mtime of the database file and its WAL with SQLite's
+    data_version, so commits from other processes are noticed in any journal mode.
+    The data_version part is only comparable within one process.
+    """
+    parts = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            stat = os.stat(path)
+            parts.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            parts.append(None)
+
+    if parts[0] is None:
+        return tuple(parts)
+
+    key = (os.getpid(), os.path.abspath(db_path))
+    with _version_lock:
+        try:
+            conn = _version_connections.get(key)
+            if conn is None:
+                conn = sqlite3.connect(db_path, check_same_thread=False)
+                _version_connections[key] = conn
+            parts.append(conn.execute("PRAGMA data_version").fetchone()[0])
+        except sqlite3.Error:
+            parts.append(None)
+    return tuple(parts)
+
+
+def _canonical_data(recommendation_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop filter fields and order-insensitive lists so equivalent requests compare equal."""
+    canonical = {key: value for key, value in data.items() if key not in FILTER_FIELDS}
+
+    if recommendation_type == "ingredients" and isinstance(canonical.get('ingredients'), list):
+        items = []
+        for item in canonical['ingredients']:
+            if isinstance(item, dict) and isinstance(item.get('name'), str):
+                item = dict(item, name=' '.join(item['name'].lower().split()))
+            items.append(item)
+        canonical['ingredients'] = sorted(items, key=lambda item: json.dumps(item, sort_keys=True))
+
+    elif recommendation_type == "preferences" and isinstance(canonical.get('ratings'), list):
+        canonical['ratings'] = sorted(canonical['ratings'], key=lambda item: json.dumps(item, sort_keys=True))
+
+    return canonical
+
+
+def recommendation_cache_key(recommendation_type: str, data: Dict[str, Any], number: int,
+                             dietary_filter: DietaryFilter) -> Optional[tuple]:
+    """
+    Build the cache key for a request, or None if its result must not be cached.
+
+    Random recommendations are only cacheable when they are seeded. Leftover
+    results depend on today's date through the expiry priority, so it is part of the key.
+    """
+    if recommendation_type == "random" and data.get('seed') is None:
+        return None
+
+    try:
+        data_key = json.dumps(_canonical_data(recommendation_type, data), sort_keys=True, separators=(',', ':'))
+        filter_key = dietary_filter_key(dietary_filter)
+        hash(filter_key)
+    except (TypeError, ValueError, AttributeError):
+        return None  # Unusual payload, just don't cache it
+
+    day = date.today().isoformat() if recommendation_type == "ingredients" else None
+    return (recommendation_type, number, data_key, filter_key, day)
+
+
+class RecommendationCache:
+    """
+    Thread-safe LRU cache of API responses.
+
+    Entries expire after `ttl_seconds` and the whole cache is dropped as soon as
+    database_version() reports a change. Values are deep-copied on the way in and
+    out so callers can freely modify what they receive.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db_version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_database(self) -> None:
+        version = database_version(self.db_path)
+        if version != self._db_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._db_version = version
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached value, or None on a miss."""
+        with self._lock:
+            self._check_database()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key: tuple, value: Dict[str, Any]) -> None:
+        """Store a copy of value, evicting the least recently used entries if needed."""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._check_database()
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Long-lived recommendation worker.
+Serves newline-delimited JSON requests over stdin/stdout or a Unix socket so the
+interpreter, imports and RecommendationAPI state stay warm between requests.
+"""
+
+import gc
+import json
+import os
+import signal
+import socketserver
+import sys
+from typing import Dict, Any, Optional, TextIO
+
+# Add current directory to path for imports
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from ingredient_autocomplete import autocomplete_ingredients
+from recommendation_api import RecommendationAPI
+from week_planner import DEFAULT_DAYS
+
+
+_STOP_SIGNALS = {signal.SIGTERM, signal.SIGINT}
+
+
+def _parse_payload(request: Dict[str, Any]) -> Dict[str, Any]:
+    """The "data" object of a request, embedded or as a JSON string."""
+    data = request.get("data", {})
+    if isinstance(data, str):
+        data = json.loads(data)
+    if not isinstance(data, dict):
+        raise ValueError("'data' must be an object")
+    return data
+
+
+class RecommendationWorker:
+    """
+    Dispatches protocol requests to a single, long-lived RecommendationAPI.
+
+    Each request is one JSON object per line:
+        {"id": 1, "method": "recommend", "type": "nutriments", "data": {...}, "number": 5}
+    Each response is one JSON object per line:
+        {"id": 1, "result": {...}}  or  {"id": 1, "error": "..."}
+    """
+
+    def __init__(self, api: RecommendationAPI):
+        self.api = api
+        # Set in pre-forked pools, whose children cannot share leftover sessions
+        self.prefork = False
+        self.methods = {
+            "ping": self._handle_ping,
+            "recommend": self._handle_recommend,
+            "recommend_batch": self._handle_recommend_batch,
+            "cache_stats": self._handle_cache_stats,
+            "autocomplete": self._handle_autocomplete,
+            "leftover_session": self._handle_leftover_session,
+            "leftover_plan": self._handle_leftover_plan,
+            "meal_plan": self._handle_meal_plan,
+            "weekly_plan": self._handle_weekly_plan,
+            "shopping_list": self._handle_shopping_list,
+        }
+
+    def _handle_ping(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {"status": "ok", "pid": os.getpid()}
+
+    def _handle_recommend(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        recommendation_type = request.get("type")
+        if not recommendation_type:
+            raise ValueError("Missing 'type' in request")
+
+        # Accept the data either as an embedded object or as the raw JSON string the CLI takes
+        data = request.get("data", {})
+        if not isinstance(data, str):
+            data = json.dumps(data)
+
+        number = int(request.get("number", 5))
+        return self.api.get_recommendations(recommendation_type, data, number)
+
+    def _handle_recommend_batch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        recommendation_type = request.get("type")
+        if not recommendation_type:
+            raise ValueError("Missing 'type' in request")
+
+        data_list = request.get("data")
+        if not isinstance(data_list, list):
+            raise ValueError("'data' must be a list for batch requests")
+        data_list = [data if isinstance(data, str) else json.dumps(data) for data in data_list]
+
+        number = int(request.get("number", 5))
+        return self.api.get_recommendations_batch(recommendation_type, data_list, number)
+
+    def _handle_leftover_session(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if self.prefork:
+            # Consecutive requests of a household may reach different children
+            raise ValueError("leftover sessions need a single worker process, run without --workers")
+
+        number = int(request.get("number", 5))
+        return self.api.update_leftover_session(
+            request.get("household"), request.get("action"), _parse_payload(request), number
+        )
+
+    def _handle_leftover_plan(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        number = int(request.get("number", 3))
+        return self.api.get_leftover_plan(_parse_payload(request), number)
+
+    def _handle_meal_plan(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return self.api.get_meal_plan(_parse_payload(request))
+
+    def _handle_weekly_plan(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        days = int(request.get("days", DEFAULT_DAYS))
+        return self.api.get_weekly_plan(_parse_payload(request), days)
+
+    def _handle_shopping_list(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return self.api.get_shopping_list(_parse_payload(request))
+
+    def _handle_autocomplete(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        prefix = request.get("prefix")
+        if not isinstance(prefix, str):
+            raise ValueError("'prefix' must be a string")
+
+        limit = int(request.get("limit", 10))
+        return {"prefix": prefix, "completions": autocomplete_ingredients(self.api.db_path, prefix, limit)}
+
+    def _handle_cache_stats(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if self.api.cache is None:
+            return {"enabled": False}
+        return dict(self.api.cache.stats(), enabled=True)
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle one decoded request and return the response object."""
+        request_id = request.get("id")
+        method = request.get("method", "recommend")
+
+        handler = self.methods.get(method)
+        if handler is None:
+            return {"id": request_id, "error": f"Unknown method: {method}"}
+
+        try:
+            return {"id": request_id, "result": handler(request)}
+        except (ValueError, TypeError) as e:
+            return {"id": request_id, "error": f"Invalid request: {str(e)}"}
+        except Exception as e:
+            return {"id": request_id, "error": f"Internal error: {str(e)}"}
+
+    def handle_line(self, line: str) -> str:
+        """Handle one raw protocol line and return the encoded response line."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            response = {"id": None, "error": f"Invalid JSON request: {str(e)}"}
+        else:
+            response = self.handle_request(request)
+
+        return json.dumps(response) + "\n"
+
+    def serve_stream(self, infile: TextIO, outfile: TextIO) -> None:
+        """Serve requests line by line until the input stream is closed."""
+        for line in infile:
+            if not line.strip():
+                continue
+            outfile.write(self.handle_line(line))
+            outfile.flush()
+
+    def serve_unix_socket(self, socket_path: str) -> None:
+        """Serve requests on a Unix stream socket, one thread per connection."""
+        server = create_unix_server(self, socket_path)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    def serve_prefork(self, socket_path: str, workers: int) -> None:
+        """
+        Bind one Unix socket, warm up the shared data, then fork `workers` children
+        that all accept from that socket. Read-only structures loaded before the fork
+        are shared copy-on-write; gc.freeze() moves them out of the collector's reach
+        so collections in the children do not touch (and duplicate) their pages.
+        Children that exit are replaced until the parent receives SIGTERM or SIGINT.
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        server = create_unix_server(self, socket_path, threaded=False)
+        self.prefork = True
+        self.api.warm_up()
+        gc.collect()
+        gc.freeze()
+
+        children = set()
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+            for pid in list(children):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+        previous_handlers = {
+            sig: signal.signal(sig, stop) for sig in _STOP_SIGNALS
+        }
+
+        try:
+            while not stopping:
+                while len(children) < workers and not stopping:
+                    # Hold back stop signals until the new child is tracked
+                    signal.pthread_sigmask(signal.SIG_BLOCK, _STOP_SIGNALS)
+                    pid = os.fork()
+                    if pid == 0:
+                        self._run_child(server)
+                    children.add(pid)
+                    signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+
+                try:
+                    pid, _ = os.wait()
+                except ChildProcessError:
+                    break
+                except InterruptedError:
+                    continue
+                children.discard(pid)
+
+            while children:
+                try:
+                    pid, _ = os.wait()
+                except ChildProcessError:
+                    break
+                children.discard(pid)
+        finally:
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+            server.server_close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    def _run_child(self, server: socketserver.UnixStreamServer) -> None:
+        """Accept loop of one forked child. Never returns."""
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _STOP_SIGNALS)
+        exit_code = 0
+        try:
+            server.serve_forever()
+        except Exception as e:
+            print(f"Worker {os.getpid()} crashed: {e}", file=sys.stderr)
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+
+class _WorkerRequestHandler(socketserver.StreamRequestHandler):
+    """Reads newline-delimited requests from one client connection."""
+
+    def handle(self):
+        worker = self.server.worker
+        for raw_line in self.rfile:
+            line = raw_line.decode("utf-8")
+            if not line.strip():
+                continue
+            self.wfile.write(worker.handle_line(line).encode("utf-8"))
+            self.wfile.flush()
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_unix_server(worker: RecommendationWorker, socket_path: str,
+                       threaded: bool = True) -> socketserver.UnixStreamServer:
+    """Bind a Unix socket server for the worker, replacing any stale socket file."""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server_class = _ThreadingUnixServer if threaded else socketserver.UnixStreamServer
+    server = server_class(socket_path, _WorkerRequestHandler)
+    server.worker = worker
+    return server
+
+
+def main(argv: Optional[list] = None):
+    """
+    Command line interface for the worker.
+    Usage: python recommendation_worker.py [--socket PATH [--workers N]] [--db PATH]
+    Without --socket, requests are read from stdin and responses written to stdout.
+    With --workers, N pre-forked processes share the socket and the warmed-up data.
+    """
+    usage = "Usage: python recommendation_worker.py [--socket PATH [--workers N]] [--db PATH]"
+    args = list(sys.argv[1:] if argv is None else argv)
+    socket_path = None
+    db_path = None
+    workers = 0
+
+    while args:
+        arg = args.pop(0)
+        if arg == "--socket" and args:
+            socket_path = args.pop(0)
+        elif arg == "--db" and args:
+            db_path = args.pop(0)
+        elif arg == "--workers" and args:
+            workers = int(args.pop(0))
+        else:
+            print(usage, file=sys.stderr)
+            sys.exit(1)
+
+    if workers and not socket_path:
+        print(usage, file=sys.stderr)
+        sys.exit(1)
+
+    worker = RecommendationWorker(RecommendationAPI(db_path))
+
+    if socket_path and workers:
+        worker.serve_prefork(socket_path, workers)
+    elif socket_path:
+        worker.serve_unix_socket(socket_path)
+    else:
+        worker.serve_stream(sys.stdin, sys.stdout)
+
+if __name__ == "__main__":
+    main()
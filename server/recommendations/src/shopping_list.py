@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Shopping list of planned meals.
+
+The ingredients of every planned recipe are read in one RecipeIngredient query (per
+chunk of recipe ids), grouped by canonical ingredient and summed in base units (see
+ingredient_units), so "2 tbsp olive oil" and "50 g olive oil" add up. Fridge stock
+matching an ingredient is subtracted in the same units.
+"""
+
+import sqlite3
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+from ingredient_canonical import load_canonical_vocabulary
+from ingredient_index import AMOUNT_TOLERANCE
+from ingredient_units import to_base_amount, UNKNOWN, MASS, VOLUME, PIECE, SLICE, CLOVE, BUNCH, HEAD, CAN
+from leftover_recommendation import LeftoverIngredient
+from recipe_filtering import SQL_CHUNK_SIZE
+
+# Unit of the shopping list quantities of each dimension
+BASE_UNITS = {
+    MASS: "g", VOLUME: "ml", PIECE: "piece", SLICE: "slice", CLOVE: "clove", BUNCH: "bunch", HEAD: "head", CAN: "can"
+}
+
+
+def read_recipe_ingredients(db_path: str, recipe_ids: List[int]) -> List[tuple]:
+    """(recipe_id, ingredient_id, quantity, unit) rows of the recipes, in one query per SQL_CHUNK_SIZE ids."""
+    conn = sqlite3.connect(db_path)
+    rows: List[tuple] = []
+    for start in range(0, len(recipe_ids), SQL_CHUNK_SIZE):
+        chunk = recipe_ids[start:start + SQL_CHUNK_SIZE]
+        rows.extend(conn.execute(f"""
+            SELECT recipe_id, ingredient_id, quantity, unit
+            FROM RecipeIngredient
+            WHERE recipe_id IN ({",".join("?" * len(chunk))})
+        """, chunk).fetchall())
+    conn.close()
+    return rows
+
+
+def build_shopping_list(db_path: str, recipe_ids: List[int],
+                        leftovers: Optional[List[LeftoverIngredient]] = None) -> Dict[str, Any]:
+    """
+    Aggregated shopping list of planned recipes, minus the fridge.
+
+    Quantities of an ingredient are summed per dimension in base units (g, ml, pieces,
+    ...); quantities with units that cannot be converted are summed per unit as written,
+    and become None when some of them have no usable quantity. Fridge items are matched
+    to ingredients like leftovers are, and their stock is subtracted where the units are
+    comparable.
+
+    Args:
+        db_path: Path to SQLite database
+        recipe_ids: Planned recipes; a recipe planned twice needs its ingredients twice
+        leftovers: Fridge contents (default none)
+
+    Returns:
+        {"items": [...], "covered": [...], "missing_recipe_ids": [...]}: items to buy, by
+        name, as {"name", "quantities": [{"amount", "unit"}], "recipe_ids", "in_fridge"};
+        the ingredients the fridge fully provides; planned recipes without ingredients
+    """
+    vocabulary = load_canonical_vocabulary(db_path)
+    planned = Counter(recipe_ids)
+    rows = read_recipe_ingredients(db_path, list(planned))
+
+    # canonical id -> {dimension, or the unit as written when UNKNOWN: amount or None}
+    needed: Dict[int, Dict[Any, Optional[float]]] = {}
+    used_by: Dict[int, set] = {}
+    for recipe_id, ingredient_id, quantity, unit in rows:
+        canonical = vocabulary.ingredient_canonical.get(ingredient_id)
+        if canonical is None:
+            continue  # Row of a deleted ingredient
+
+        dimension, amount = to_base_amount(quantity, unit or "", vocabulary.names[canonical])
+        if dimension == UNKNOWN:
+            usable = not isinstance(quantity, bool) and isinstance(quantity, (int, float)) and quantity >= 0
+            key, amount = (unit or "").strip().lower(), quantity if usable else None
+        else:
+            key = dimension
+
+        amounts = needed.setdefault(canonical, {})
+        if amount is None or (key in amounts and amounts[key] is None):
+            amounts[key] = None
+        else:
+            amounts[key] = amounts.get(key, 0.0) + amount * planned[recipe_id]
+        used_by.setdefault(canonical, set()).add(recipe_id)
+
+    in_fridge = set()
+    for leftover in leftovers or []:
+        dimension, stock = to_base_amount(leftover.quantity, leftover.unit, leftover.name.lower())
+        # A fridge item matching several ingredients supplies them in turn
+        for canonical in sorted(vocabulary.lookup(leftover.name.lower()) & needed.keys()):
+            in_fridge.add(canonical)
+            amounts = needed[canonical]
+            if dimension != UNKNOWN and dimension in amounts:
+                taken = min(stock, amounts[dimension])
+                amounts[dimension] -= taken
+                stock -= taken
+                if amounts[dimension] <= AMOUNT_TOLERANCE:
+                    del amounts[dimension]
+
+    items, covered = [], []
+    for canonical in sorted(needed, key=lambda canonical: vocabulary.names[canonical]):
+        name, amounts = vocabulary.names[canonical], needed[canonical]
+        if not amounts:
+            covered.append(name)
+            continue
+        items.append({
+            "name": name,
+            "quantities": [
+                {
+                    "amount": None if amount is None else round(amount, 2),
+                    "unit": BASE_UNITS[key] if isinstance(key, int) else key
+                }
+                for key, amount in sorted(amounts.items(), key=lambda entry: (isinstance(entry[0], str), entry[0]))
+            ],
+            "recipe_ids": sorted(used_by[canonical]),
+            "in_fridge": canonical in in_fridge
+        })
+
+    found = {recipe_id for recipe_id, _, _, _ in rows}
+    return {
+        "items": items,
+        "covered": covered,
+        "missing_recipe_ids": [recipe_id for recipe_id in planned if recipe_id not in found]
+    }
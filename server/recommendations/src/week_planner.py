@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Weekly meal planner: several days of breakfast, lunch, dinner and snack in one request.
+
+Days are planned one after another with the daily planner's branch-and-bound search, over
+per-meal candidate pools built once for the whole plan (and cached across requests) with
+the pairwise ingredient overlaps and leftover scores of their recipes: each later day only
+masks the recipes already planned, and leftover scores are only recomputed when planned
+meals used up fridge items.
+
+No recipe is planned twice, two meals of the same day share at most a given number of
+ingredients, and recipes using fridge items still unused get a bonus, soon-expiring items
+counting more, so the first days use the leftovers up.
+"""
+
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import numpy as np
+
+from ingredient_index import load_ingredient_index
+from leftover_recommendation import LeftoverIngredient, get_priority_ingredients, PRIORITY_BONUS
+from meal_planner import (
+    DAY_MEALS, SHORTLIST_SIZE, daily_target_vector, meal_targets, load_meal_pools, plan_day, format_day,
+    nutrient_totals, fetch_recipe_rows
+)
+from nutriment_recommendation import UserProfile, load_nutrition_catalogue
+from recipe_filtering import DietaryFilter
+
+# Days planned when the request does not say
+DEFAULT_DAYS = 7
+
+# Longest plan accepted
+MAX_DAYS = 28
+
+# Ingredients two meals of the same day may have in common
+MAX_SHARED_INGREDIENTS = 2
+
+# Day deviation traded for one leftover match score point: a recipe made only of fridge
+# items may miss the day's targets by 0.05 more
+LEFTOVER_WEIGHT = 0.05
+
+
+def plan_weekly_meals(db_path: str, user: UserProfile, leftovers: Optional[List[LeftoverIngredient]] = None,
+                      dietary_filter: Optional[DietaryFilter] = None, days: int = DEFAULT_DAYS,
+                      max_shared_ingredients: int = MAX_SHARED_INGREDIENTS,
+                      today: datetime = None) -> Dict[str, Any]:
+    """
+    Plan `days` days of one recipe per meal type, each day as close to the daily targets
+    as the constraints allow.
+
+    Args:
+        db_path: Path to SQLite database
+        user: User profile; its meal_type, tolerance and objective are ignored
+        leftovers: Fridge contents to use up (default none)
+        dietary_filter: Constraints every planned recipe must satisfy
+        days: Number of days, 1 to MAX_DAYS
+        max_shared_ingredients: Ingredients two meals of the same day may have in common
+        today: Reference date of the expiry rule (default now)
+
+    Returns:
+        {"days": [...], "targets": {...}, "leftovers_used": [...], "leftovers_unused": [...]};
+        each day is a daily plan with its "day" number (from 1), and each meal lists the
+        fridge items it uses up in "uses"
+    """
+    if isinstance(days, bool) or not isinstance(days, int) or not 1 <= days <= MAX_DAYS:
+        raise ValueError(f"days must be an integer from 1 to {MAX_DAYS}")
+    if isinstance(max_shared_ingredients, bool) or not isinstance(max_shared_ingredients, int) \
+            or max_shared_ingredients < 0:
+        raise ValueError("max_shared_ingredients must be a non-negative integer")
+
+    catalogue = load_nutrition_catalogue(db_path)
+    daily = daily_target_vector(user)
+    targets = meal_targets(user)
+    # Earlier days plan at most len(DAY_MEALS) recipes each, leaving a full shortlist for the last day
+    pools = load_meal_pools(db_path, catalogue, user, dietary_filter, SHORTLIST_SIZE + len(DAY_MEALS) * (days - 1))
+
+    # Every pool recipe once, as `candidates` catalogue rows; keys index them
+    candidates = np.unique(np.concatenate([pools[meal] for meal in DAY_MEALS]))
+    keys = {meal: np.searchsorted(candidates, pools[meal]) for meal in DAY_MEALS}
+    candidate_ids = catalogue.recipe_ids[candidates]
+
+    index = load_ingredient_index(db_path)
+    index_rows = np.minimum(np.searchsorted(index.recipe_ids, candidate_ids), max(len(index.recipe_ids) - 1, 0))
+    indexed = index.recipe_ids[index_rows] == candidate_ids if len(index.recipe_ids) else np.zeros(0, dtype=bool)
+    ingredients = [
+        set(index.indices[index.indptr[row]:index.indptr[row + 1]].tolist()) if found else set()
+        for row, found in zip(index_rows.tolist(), indexed.tolist())
+    ]
+
+    # Ingredients in common of every candidate pair, from one product of their incidence matrix
+    columns = sorted(set().union(*ingredients))
+    column_of = {column: position for position, column in enumerate(columns)}
+    incidence = np.zeros((len(candidates), len(columns)), dtype=np.float32)
+    for candidate, candidate_ingredients in enumerate(ingredients):
+        incidence[candidate, [column_of[column] for column in candidate_ingredients]] = 1
+    conflicts = incidence @ incidence.T > max_shared_ingredients
+
+    fridge = list(leftovers or [])
+    fridge_terms = [set(index.vocabulary.lookup(leftover.name.lower())) for leftover in fridge]
+    remaining = list(range(len(fridge)))
+    leftover_scores = np.zeros(len(candidates))
+    fridge_changed = bool(fridge)
+
+    planned_ids = set()
+    week = []
+    for _ in range(days):
+        if fridge_changed:
+            leftover_scores = np.zeros(len(candidates))
+            if remaining and indexed.any():
+                items = [fridge[item] for item in remaining]
+                matched, priority_matched, _ = index.fridge_counts(
+                    [leftover.name.lower() for leftover in items], get_priority_ingredients(items, today)
+                )
+                scores = matched / index.recipe_sizes + priority_matched * PRIORITY_BONUS
+                leftover_scores[indexed] = scores[index_rows[indexed]]
+            fridge_changed = False
+
+        # Recipes planned on earlier days are masked, the pools stay
+        shortlists, shortlist_keys = {}, {}
+        for meal in DAY_MEALS:
+            unused = np.flatnonzero(~np.isin(catalogue.recipe_ids[pools[meal]], list(planned_ids)))[:SHORTLIST_SIZE]
+            shortlists[meal] = pools[meal][unused]
+            shortlist_keys[meal] = keys[meal][unused]
+        costs = {meal: -LEFTOVER_WEIGHT * leftover_scores[shortlist_keys[meal]] for meal in DAY_MEALS}
+
+        day = plan_day(catalogue, shortlists, daily, costs, shortlist_keys, conflicts)
+
+        uses = []
+        for _, row in day:
+            recipe_ingredients = ingredients[int(np.searchsorted(candidates, row))]
+            used = [item for item in remaining if fridge_terms[item] & recipe_ingredients]
+            uses.append([fridge[item].name for item in used])
+            if used:
+                remaining = [item for item in remaining if item not in used]
+                fridge_changed = True
+            planned_ids.add(int(catalogue.recipe_ids[row]))
+        week.append((day, uses))
+
+    recipe_rows = fetch_recipe_rows(db_path, catalogue.recipe_ids[[row for day, _ in week for _, row in day]].tolist())
+    plan_days = []
+    for number, (day, uses) in enumerate(week, start=1):
+        formatted = format_day(catalogue, day, recipe_rows, targets, daily)
+        for meal, meal_uses in zip(formatted["meals"], uses):
+            meal["uses"] = meal_uses
+        plan_days.append(dict(day=number, **formatted))
+
+    return {
+        "days": plan_days,
+        "targets": nutrient_totals(daily),
+        "leftovers_used": [fridge[item].name for item in range(len(fridge)) if item not in remaining],
+        "leftovers_unused": [fridge[item].name for item in remaining]
+    }
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Shared test database fixture using the full server schema.
+"""
+
+import sqlite3
+
+
+SCHEMA = """
+    CREATE TABLE Ingredient (
+        id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+        name TEXT NOT NULL
+    );
+
+    CREATE TABLE Recipe (
+        id INTEGER PRIMARY KEY NOT NULL,
+        name TEXT NOT NULL,
+        total_time INTEGER,
+        images TEXT,
+        keywords TEXT,
+        aggregated_rating REAL,
+        review_count INTEGER,
+        calories REAL,
+        fat_content REAL,
+        sodium_content REAL,
+        carbohydrate_content REAL,
+        fiber_content REAL,
+        protein_content REAL
+    );
+
+    CREATE TABLE Review (
+        id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+        author_id INTEGER,
+        recipe_id INTEGER NOT NULL,
+        rating REAL
+    );
+
+    CREATE TABLE RecipeIngredient (
+        id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+        recipe_id INTEGER NOT NULL,
+        ingredient_id INTEGER NOT NULL,
+        quantity REAL NOT NULL,
+        unit TEXT NOT NULL,
+        UNIQUE (recipe_id, ingredient_id)
+    );
+"""
+
+INGREDIENTS = [
+    (1, "tomato"),
+    (2, "pasta"),
+    (3, "olive oil"),
+    (4, "cheese"),
+    (5, "bread"),
+    (6, "chicken breast"),
+    (7, "lettuce"),
+    (8, "eggs"),
+    (9, "eggplant"),
+    (10, "butter"),
+    (11, "tofu"),
+    (12, "rice"),
+]
+
+# id, name, total_time, images, keywords, rating, review_count,
+# calories, fat, sodium, carbs, fiber, protein
+RECIPES = [
+    (1, "Tomato Pasta", 30, "pasta.jpg", "Vegetarian, Italian", 4.5, 10, 550, 18, 400, 80, 6, 15),
+    (2, "Cheese Sandwich", 10, "sandwich.jpg", "Vegetarian, Quick", 4.0, 5, 420, 20, 700, 40, 3, 18),
+    (3, "Tomato Cheese Toast", 15, "toast.jpg", "Vegetarian, Breakfast", 4.2, 8, 350, 14, 500, 38, 4, 14),
+    (4, "Chicken Salad", 20, "salad.jpg", "Chicken, Low Carb", 4.8, 12, 380, 16, 450, 10, 5, 35),
+    (5, "Eggplant Stir Fry", 25, "eggplant.jpg", "Vegan, Asian", 4.1, 4, 300, 12, 600, 35, 9, 10),
+    (6, "Scrambled Eggs", 10, "eggs.jpg", "Vegetarian, Breakfast", 4.6, 20, 250, 18, 300, 2, 0, 16),
+    (7, "Tofu Rice Bowl", 20, "tofu.jpg", "Vegan, Healthy", 4.3, 6, 480, 14, 550, 65, 7, 22),
+    (8, "Butter Chicken", 45, "butter_chicken.jpg", "Chicken, Indian", 4.9, 30, 700, 40, 900, 30, 3, 45),
+]
+
+RECIPE_INGREDIENTS = [
+    (1, 1, 200, "g"), (1, 2, 250, "g"), (1, 3, 2, "tbsp"),
+    (2, 4, 50, "g"), (2, 5, 2, "slices"),
+    (3, 1, 1, "piece"), (3, 4, 40, "g"), (3, 5, 2, "slices"),
+    (4, 6, 300, "g"), (4, 7, 1, "head"), (4, 3, 1, "tbsp"),
+    (5, 9, 1, "piece"), (5, 3, 2, "tbsp"),
+    (6, 8, 3, "pieces"), (6, 10, 10, "g"),
+    (7, 11, 200, "g"), (7, 12, 150, "g"),
+    (8, 6, 500, "g"), (8, 10, 50, "g"), (8, 1, 400, "g"), (8, 12, 200, "g"),
+]
+
+REVIEWS = [
+    (101, 1, 5.0), (101, 2, 4.0), (101, 3, 5.0), (101, 7, 5.0),
+    (102, 1, 5.0), (102, 3, 4.5), (102, 5, 4.0),
+    (103, 4, 5.0), (103, 8, 5.0), (103, 6, 3.5),
+]
+
+
+def create_test_database(db_path: str) -> None:
+    """Create and populate a small database following the server schema."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.executescript(SCHEMA)
+
+    cursor.executemany("INSERT INTO Ingredient (id, name) VALUES (?, ?)", INGREDIENTS)
+    cursor.executemany("""
+        INSERT INTO Recipe (id, name, total_time, images, keywords, aggregated_rating, review_count,
+                            calories, fat_content, sodium_content, carbohydrate_content,
+                            fiber_content, protein_content)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, RECIPES)
+    cursor.executemany("""
+        INSERT INTO RecipeIngredient (recipe_id, ingredient_id, quantity, unit)
+        VALUES (?, ?, ?, ?)
+    """, RECIPE_INGREDIENTS)
+    cursor.executemany("INSERT INTO Review (author_id, recipe_id, rating) VALUES (?, ?, ?)", REVIEWS)
+
+    conn.commit()
+    conn.close()
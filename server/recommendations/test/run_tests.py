@@ -12,7 +12,25 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 # Import all test modules
 from test_leftover_recommendation import TestLeftoverRecommendation
+from test_ingredient_autocomplete import TestIngredientAutocomplete
+from test_leftover_session import TestLeftoverSession
+from test_leftover_planner import TestLeftoverPlanner
+from test_meal_planner import TestMealPlanner
+from test_week_planner import TestWeekPlanner
+from test_shopping_list import TestShoppingList
+from test_ingredient_canonical import TestIngredientCanonical
+from test_ingredient_trigram import TestIngredientTrigram
+from test_ingredient_units import TestIngredientUnits
+from test_ingredient_index import TestIngredientIndex
 from test_nutriment_recommendation import TestNutrimentRecommendation
+from test_nutrient_rtree import TestNutrientRTree
+from test_nutrient_kdtree import TestNutrientKDTree
+from test_recipe_filtering import TestRecipeFilter, TestRecipeBitmask
+from test_recipe_sampler import TestRecipeSampler
+from test_recommendation_api import TestRecommendationAPI
+from test_recommendation_cache import TestRecommendationCache
+from test_file_cache import TestVersionedCache
+from test_recommendation_worker import TestRecommendationWorker, TestPreforkPool
 
 
 def run_all_tests():
@@ -24,7 +42,27 @@ def run_all_tests():
     # Add all test classes
     test_classes = [
         TestLeftoverRecommendation,
-        TestNutrimentRecommendation
+        TestIngredientCanonical,
+        TestIngredientTrigram,
+        TestIngredientAutocomplete,
+        TestIngredientUnits,
+        TestIngredientIndex,
+        TestLeftoverSession,
+        TestLeftoverPlanner,
+        TestMealPlanner,
+        TestWeekPlanner,
+        TestShoppingList,
+        TestNutrimentRecommendation,
+        TestNutrientRTree,
+        TestNutrientKDTree,
+        TestRecipeFilter,
+        TestRecipeBitmask,
+        TestRecipeSampler,
+        TestRecommendationAPI,
+        TestRecommendationCache,
+        TestVersionedCache,
+        TestRecommendationWorker,
+        TestPreforkPool
     ]
     
     for test_class in test_classes:
@@ -44,7 +82,27 @@ def run_specific_test(test_name):
     
     test_modules = {
         'leftover': TestLeftoverRecommendation,
-        'nutriment': TestNutrimentRecommendation
+        'canonical': TestIngredientCanonical,
+        'trigram': TestIngredientTrigram,
+        'autocomplete': TestIngredientAutocomplete,
+        'units': TestIngredientUnits,
+        'ingredient_index': TestIngredientIndex,
+        'session': TestLeftoverSession,
+        'planner': TestLeftoverPlanner,
+        'meal_plan': TestMealPlanner,
+        'week_plan': TestWeekPlanner,
+        'shopping_list': TestShoppingList,
+        'nutriment': TestNutrimentRecommendation,
+        'rtree': TestNutrientRTree,
+        'kdtree': TestNutrientKDTree,
+        'filtering': TestRecipeFilter,
+        'bitmask': TestRecipeBitmask,
+        'sampler': TestRecipeSampler,
+        'api': TestRecommendationAPI,
+        'cache': TestRecommendationCache,
+        'file_cache': TestVersionedCache,
+        'worker': TestRecommendationWorker,
+        'prefork': TestPreforkPool
     }
     
     if test_name not in test_modules:
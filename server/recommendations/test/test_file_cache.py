@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the per-file-version caches.
+"""
+
+import unittest
+import tempfile
+import threading
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from file_cache import VersionedCache, file_version
+
+
+class TestVersionedCache(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a file to cache data of."""
+        self.fd, self.path = tempfile.mkstemp()
+        self.builds = 0
+
+    def tearDown(self):
+        """Clean up the file."""
+        os.close(self.fd)
+        os.unlink(self.path)
+
+    def build(self):
+        self.builds += 1
+        return self.builds
+
+    def change_file(self):
+        stat = os.stat(self.path)
+        with open(self.path, "a") as file:
+            file.write("x")
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    def test_built_once_per_version(self):
+        """Test that values are reused until the file changes, then rebuilt."""
+        cache = VersionedCache()
+        self.assertEqual(cache.get(self.path, self.build), 1)
+        self.assertEqual(cache.get(self.path, self.build), 1)
+
+        self.change_file()
+        self.assertEqual(cache.get(self.path, self.build), 2)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(list(cache._entries), [(file_version(self.path), None)])
+
+        cache.clear()
+        self.assertEqual(cache.get(self.path, self.build), 3)
+
+    def test_extra_keys_and_lru_bound(self):
+        """Test extra keys of one version, and least recently used entries dropped first."""
+        cache = VersionedCache(max_entries=2)
+        self.assertEqual(cache.get(self.path, self.build, "a"), 1)
+        self.assertEqual(cache.get(self.path, self.build, "b"), 2)
+        self.assertEqual(cache.get(self.path, self.build, "a"), 1)
+        self.assertEqual(cache.get(self.path, self.build, "c"), 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get(self.path, self.build, "a"), 1)
+        self.assertEqual(cache.get(self.path, self.build, "b"), 4)
+
+    def test_missing_file(self):
+        """Test that a missing file raises FileNotFoundError."""
+        with self.assertRaises(FileNotFoundError):
+            VersionedCache().get(self.path + ".missing", self.build)
+
+    def test_concurrent_misses_share_one_value(self):
+        """Test that threads missing together all get the value stored first."""
+        cache = VersionedCache()
+        barrier = threading.Barrier(8)
+        results = []
+
+        def build():
+            return object()
+
+        def worker():
+            barrier.wait()
+            results.append(cache.get(self.path, build))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is cache.get(self.path, build) for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the ingredient autocomplete trie.
+"""
+
+import unittest
+import random
+import tempfile
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database
+from ingredient_autocomplete import AutocompleteTrie, autocomplete_ingredients, normalize_prefix
+
+
+class TestIngredientAutocomplete(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def names(self, prefix, limit=10):
+        return [completion["name"] for completion in autocomplete_ingredients(self.db_path, prefix, limit)]
+
+    def test_ranked_by_recipe_count(self):
+        """Test that completions are ordered by the number of recipes using them."""
+        completions = autocomplete_ingredients(self.db_path, "", 3)
+        self.assertEqual([completion["name"] for completion in completions], ["olive oil", "tomato", "bread"])
+        self.assertEqual(completions[0]["recipe_count"], 3)
+        self.assertEqual(completions[0]["id"], 3)
+
+    def test_prefixes(self):
+        """Test completions of full names and of later words."""
+        self.assertEqual(self.names("egg"), ["eggplant", "eggs"])
+        self.assertEqual(self.names("Eggp"), ["eggplant"])
+        self.assertEqual(self.names("oil"), ["olive oil"])
+        self.assertEqual(self.names("olive  o"), ["olive oil"])
+        self.assertEqual(self.names("chicken "), ["chicken breast"])
+        self.assertEqual(self.names("x"), [])
+        self.assertEqual(self.names("tomatoes"), [])
+
+    def test_matches_linear_scan(self):
+        """Test that the trie returns the same completions as scanning every name."""
+        rng = random.Random(5)
+        words = ["red", "green", "bell", "pepper", "peppercorn", "pea", "peanut", "butter", "bean"]
+        entries = []
+        for ingredient_id in range(300):
+            name = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+            entries.append((ingredient_id, name, rng.randint(0, 50)))
+        trie = AutocompleteTrie(entries)
+
+        ranked = sorted(entries, key=lambda entry: (-entry[2], entry[1], entry[0]))
+        for prefix in ("", "p", "pe", "pea", "pean", "pepper", "pepper ", "red pe", "bell pepper b", "z"):
+            expected = [
+                ingredient_id for ingredient_id, name, _ in ranked
+                if any(" ".join(name.split(" ")[start:]).startswith(prefix) for start in range(len(name.split(" "))))
+            ][:7]
+            self.assertEqual([completion["id"] for completion in trie.complete(prefix, 7)], expected, prefix)
+
+    def test_invalid_limit(self):
+        """Test that out of range limits are rejected."""
+        with self.assertRaises(ValueError):
+            autocomplete_ingredients(self.db_path, "egg", 0)
+        with self.assertRaises(ValueError):
+            autocomplete_ingredients(self.db_path, "egg", 1000)
+
+    def test_normalize_prefix(self):
+        """Test prefix normalization."""
+        self.assertEqual(normalize_prefix("  Olive   OI"), "olive oi")
+        self.assertEqual(normalize_prefix("olive "), "olive ")
+        self.assertEqual(normalize_prefix("   "), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the canonical ingredient vocabulary.
+"""
+
+import unittest
+import tempfile
+import os
+import sqlite3
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database
+from ingredient_canonical import build_canonical_tables, canonical_name, load_canonical_vocabulary, CANONICAL_TABLE
+
+
+class TestIngredientCanonical(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_canonical_name(self):
+        """Test case, whitespace, punctuation, plural and synonym normalization."""
+        self.assertEqual(canonical_name("  Cherry   Tomatoes "), "cherry tomato")
+        self.assertEqual(canonical_name("Eggs"), "egg")
+        self.assertEqual(canonical_name("berries"), "berry")
+        self.assertEqual(canonical_name("peaches"), "peach")
+        self.assertEqual(canonical_name("Confectioners' Sugar"), "powdered sugar")
+        self.assertEqual(canonical_name("all-purpose flour"), "all purpose flour")
+        self.assertEqual(canonical_name("baby aubergines"), "baby eggplant")
+        self.assertEqual(canonical_name("asparagus"), "asparagus")
+
+    def test_lookup_uses_whole_words(self):
+        """Test that fridge names resolve to canonical ids by word, not substring."""
+        vocabulary = load_canonical_vocabulary(self.db_path)
+        names = {vocabulary.names[canonical_id] for canonical_id in vocabulary.lookup("Egg")}
+        self.assertEqual(names, {"egg"})
+
+        names = {vocabulary.names[canonical_id] for canonical_id in vocabulary.lookup("chicken")}
+        self.assertEqual(names, {"chicken breast"})
+        self.assertEqual(vocabulary.lookup("Aubergines"), {vocabulary.ids_by_name["eggplant"]})
+        self.assertEqual(vocabulary.lookup("caviar"), set())
+
+    def test_ids_stable_across_rebuilds(self):
+        """Test that stored canonical ids survive rebuilds and new ingredients get new ids."""
+        build_canonical_tables(self.db_path)
+        first = load_canonical_vocabulary(self.db_path)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO Ingredient (id, name) VALUES (13, 'Aardvark Beans')")
+        conn.execute("INSERT INTO Ingredient (id, name) VALUES (14, 'Tomatoes')")
+        conn.commit()
+        conn.close()
+        build_canonical_tables(self.db_path)
+        second = load_canonical_vocabulary(self.db_path)
+
+        for canonical_id, name in first.names.items():
+            self.assertEqual(second.names[canonical_id], name)
+        self.assertEqual(second.ingredient_canonical[14], second.ingredient_canonical[1])
+        self.assertGreater(second.ingredient_canonical[13], max(first.names))
+
+        conn = sqlite3.connect(self.db_path)
+        stored = conn.execute(f"SELECT COUNT(*) FROM {CANONICAL_TABLE}").fetchone()[0]
+        conn.close()
+        self.assertEqual(stored, len(second.names))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the recipe x ingredient matrix and full-catalogue leftover ranking.
+"""
+
+import unittest
+import json
+import tempfile
+import os
+import random
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database, INGREDIENTS, RECIPE_INGREDIENTS
+from ingredient_canonical import CanonicalVocabulary
+from ingredient_index import IngredientIndex, load_ingredient_index
+from leftover_recommendation import (
+    LeftoverIngredient,
+    calculate_ingredient_match_score,
+    get_leftover_recommendations,
+    score_leftover_recipes,
+    top_leftover_recipes,
+    top_shopping_recipes
+)
+from recipe_filtering import DietaryFilter
+
+
+class TestIngredientIndex(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def fridge(self, *names):
+        return [LeftoverIngredient(name, 1, "piece", "2030-01-01") for name in names]
+
+    def test_matrix(self):
+        """Test the CSR rows, recipe sizes and matrix-vector product."""
+        index = load_ingredient_index(self.db_path)
+        rows = {recipe_id: row for row, recipe_id in enumerate(index.recipe_ids.tolist())}
+
+        self.assertEqual(index.recipe_ids.tolist(), list(range(1, 9)))
+        self.assertEqual(int(index.recipe_sizes[rows[8]]), 4)
+
+        tomato_rows = index.count_matches(["tomato"]).nonzero()[0]
+        self.assertEqual(sorted(index.recipe_ids[tomato_rows].tolist()), [1, 3, 8])
+
+    def test_fridge_counts(self):
+        """Test matched, priority and missing counts from one product."""
+        index = load_ingredient_index(self.db_path)
+        matched, priority, missing = index.fridge_counts(["tomato", "cheese"], ["cheese"])
+        row = index.recipe_ids.tolist().index(3)
+
+        self.assertEqual(int(matched[row]), 2)
+        self.assertEqual(int(priority[row]), 1)
+        self.assertEqual(int(missing[row]), int(index.recipe_sizes[row]) - 2)
+        self.assertTrue(((matched + missing) == index.recipe_sizes).all())
+
+    def test_scores_match_exhaustive_scan(self):
+        """Test that indexed scoring equals scoring every recipe's ingredient list."""
+        names = dict(INGREDIENTS)
+        recipe_ingredients = {}
+        for recipe_id, ingredient_id, _, _ in RECIPE_INGREDIENTS:
+            recipe_ingredients.setdefault(recipe_id, []).append(names[ingredient_id])
+
+        index = load_ingredient_index(self.db_path)
+        for fridge in (["tomato"], ["cheese", "bread"], ["oil", "rice", "egg"], ["tomatoes", "chicken"], ["caviar"]):
+            expected = {}
+            for recipe_id, ingredients in recipe_ingredients.items():
+                score = calculate_ingredient_match_score(ingredients, fridge)
+                if score > 0.1:
+                    expected[recipe_id] = score
+            self.assertEqual(score_leftover_recipes(index, self.fridge(*fridge)), expected)
+
+    def test_columns(self):
+        """Test the posting lists and per-ingredient score bounds."""
+        index = load_ingredient_index(self.db_path)
+        tomato = index.vocabulary.ids_by_name["tomato"]
+        rows, counts = index.column(tomato)
+
+        self.assertEqual(index.recipe_ids[rows].tolist(), [1, 3, 8])
+        self.assertEqual(counts.tolist(), [1, 1, 1])
+        self.assertEqual(index.column_max_share[tomato], 1 / 3)
+        self.assertEqual(index.column_max_count[tomato], 1)
+
+    def test_top_k_matches_exhaustive_ranking(self):
+        """Test that MaxScore pruning returns exactly the head of the exhaustive ranking."""
+        import numpy as np
+
+        rng = random.Random(11)
+        vocabulary = CanonicalVocabulary({term: f"item{term}" for term in range(40)}, {})
+        sizes = [rng.randint(1, 8) for _ in range(2000)]
+        # Skewed ingredient frequencies, with repeated ingredients inside recipes
+        indices = [min(int(rng.expovariate(0.15)), 39) for _ in range(sum(sizes))]
+        index = IngredientIndex(
+            vocabulary,
+            np.arange(1, len(sizes) + 1, dtype=np.int64),
+            np.concatenate(([0], np.cumsum(sizes))).astype(np.int64),
+            np.array(indices, dtype=np.int32)
+        )
+
+        for _ in range(20):
+            fridge = [
+                LeftoverIngredient(f"item{min(int(rng.expovariate(0.15)), 39)}", 1, "g",
+                                   rng.choice(["2000-01-01", "2100-01-01"]))
+                for _ in range(rng.randint(1, 6))
+            ]
+            ranking = sorted(score_leftover_recipes(index, fridge).items(), key=lambda item: (-item[1], item[0]))
+            for k in (1, 5, 50):
+                recipe_ids, scores, missing = top_leftover_recipes(index, fridge, k)
+                self.assertEqual(list(zip(recipe_ids.tolist(), scores.tolist())), ranking[:k])
+
+    def test_missing_ingredients_match_set_difference(self):
+        """Test that the vectorized shopping lists equal each recipe's ingredients minus the fridge."""
+        import numpy as np
+
+        rng = random.Random(5)
+        vocabulary = CanonicalVocabulary({term: f"item{term}" for term in range(30)}, {})
+        sizes = [rng.randint(1, 6) for _ in range(300)]
+        indices = [rng.randrange(30) for _ in range(sum(sizes))]
+        index = IngredientIndex(
+            vocabulary,
+            np.arange(1, len(sizes) + 1, dtype=np.int64),
+            np.concatenate(([0], np.cumsum(sizes))).astype(np.int64),
+            np.array(indices, dtype=np.int32)
+        )
+        starts = np.concatenate(([0], np.cumsum(sizes))).tolist()
+
+        for _ in range(10):
+            fridge = {rng.randrange(30) for _ in range(rng.randint(0, 10))}
+            rows = np.array(rng.sample(range(len(sizes)), 20))
+            expected = [
+                [f"item{term}" for term in sorted(set(indices[starts[row]:starts[row + 1]]) - fridge)]
+                for row in rows.tolist()
+            ]
+            self.assertEqual(index.missing_ingredients(rows, [f"item{term}" for term in fridge]), expected)
+
+    def test_shopping_objective(self):
+        """Test ranking by fewest missing ingredients, with shopping lists in the results."""
+        index = load_ingredient_index(self.db_path)
+        recipe_ids, _, missing = top_shopping_recipes(index, self.fridge("tomato", "cheese", "eggs"), 3)
+        self.assertEqual(recipe_ids.tolist(), [3, 2, 6])
+        self.assertEqual(missing.tolist(), [1, 1, 1])
+
+        data = {
+            "ingredients": [{"name": "tomato", "quantity": 1, "unit": "piece", "expiration_date": "2030-01-01"}],
+            "objective": "shopping"
+        }
+        recommendations = get_leftover_recommendations(self.db_path, json.dumps(data), 5)
+        self.assertEqual([rec["id"] for rec in recommendations], [1, 3, 8])
+        self.assertEqual(recommendations[1]["shopping_list"], ["bread", "cheese"])
+
+        data["objective"] = "cheapest"
+        with self.assertRaises(ValueError):
+            get_leftover_recommendations(self.db_path, json.dumps(data), 5)
+
+    def test_ranks_whole_catalogue(self):
+        """Test that the best matches are found wherever they are in the table."""
+        data = {"ingredients": [{"name": "rice", "quantity": 1, "unit": "cup", "expiration_date": "2030-01-01"}]}
+        recommendations = get_leftover_recommendations(self.db_path, json.dumps(data), 2)
+
+        self.assertEqual([rec["id"] for rec in recommendations], [7, 8])
+        self.assertEqual(recommendations[0]["match_score"], 0.5)
+        self.assertEqual(recommendations[0]["missing_ingredients"], 1)
+        self.assertEqual(recommendations[0]["shopping_list"], ["tofu"])
+
+    def test_filter_skips_to_next_best(self):
+        """Test that filtered out recipes are replaced by the next best matches."""
+        data = {"ingredients": [{"name": "tomato", "quantity": 1, "unit": "piece", "expiration_date": "2030-01-01"}]}
+        recommendations = get_leftover_recommendations(
+            self.db_path, json.dumps(data), 5, DietaryFilter(allergies=["dairy"])
+        )
+        self.assertEqual([rec["id"] for rec in recommendations], [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
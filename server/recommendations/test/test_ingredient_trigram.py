@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Unit tests for fuzzy ingredient matching with the trigram index.
+"""
+
+import unittest
+import json
+import tempfile
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database, INGREDIENTS
+from ingredient_canonical import load_canonical_vocabulary
+from ingredient_trigram import TrigramIndex, similarity, trigrams
+from leftover_recommendation import get_leftover_recommendations
+
+
+class TestIngredientTrigram(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_trigrams(self):
+        """Test padded word trigrams and similarity."""
+        self.assertEqual(trigrams("egg"), {"  e", " eg", "egg", "gg "})
+        self.assertEqual(similarity("butter", "butter"), 1.0)
+        self.assertEqual(similarity("butter", ""), 0.0)
+        self.assertGreater(similarity("buter", "butter"), similarity("buter", "bread"))
+
+    def test_search_matches_linear_scan(self):
+        """Test that the index ranks names exactly like comparing the query with every name."""
+        names = {ingredient_id: name for ingredient_id, name in INGREDIENTS}
+        index = TrigramIndex(names)
+        for query in ("buter", "olive oyl", "egplant", "chicken", "xyz"):
+            expected = sorted(
+                ((name_id, similarity(query, name)) for name_id, name in names.items()
+                 if similarity(query, name) >= 0.3),
+                key=lambda match: (-match[1], match[0])
+            )[:5]
+            self.assertEqual(index.search(query), expected)
+
+    def test_fuzzy_lookup(self):
+        """Test that typos and scanned product names resolve to ingredients."""
+        vocabulary = load_canonical_vocabulary(self.db_path)
+
+        def resolve(name):
+            return {vocabulary.names[canonical_id] for canonical_id in vocabulary.lookup(name)}
+
+        self.assertEqual(resolve("egplant"), {"eggplant"})
+        self.assertEqual(resolve("chiken"), {"chicken breast"})
+        self.assertEqual(resolve("Barilla Spaghetti Pasta 500g"), {"pasta"})
+        self.assertEqual(resolve("very_rare_ingredient_xyz"), set())
+
+    def test_fuzzy_leftover_recommendations(self):
+        """Test that a misspelled fridge item still finds its recipes."""
+        data = {"ingredients": [{"name": "Egplants", "quantity": 1, "unit": "piece", "expiration_date": "2030-01-01"}]}
+        recommendations = get_leftover_recommendations(self.db_path, json.dumps(data), 5)
+        self.assertEqual([rec["id"] for rec in recommendations], [5])
+
+
+if __name__ == "__main__":
+    unittest.main()
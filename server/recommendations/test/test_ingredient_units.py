@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Unit tests for unit conversion and quantity-aware leftover coverage.
+"""
+
+import unittest
+import json
+import tempfile
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database
+from ingredient_index import load_ingredient_index
+from ingredient_units import MASS, SLICE, UNKNOWN, VOLUME, to_base_amount, unit_conversion
+from leftover_recommendation import get_leftover_recommendations
+
+
+class TestIngredientUnits(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_unit_conversion(self):
+        """Test base units, densities and unknown units."""
+        self.assertEqual(unit_conversion("kg", "cheese"), (MASS, 1000.0))
+        self.assertEqual(unit_conversion("Slices", "bread"), (SLICE, 1.0))
+        self.assertEqual(unit_conversion("tbsp.", "vanilla extract"), (VOLUME, 14.7868))
+        self.assertEqual(unit_conversion("cups", "all purpose flour"), (MASS, 236.588 * 0.53))
+        self.assertEqual(unit_conversion("loaf", "bread"), (UNKNOWN, 0.0))
+
+        self.assertEqual(to_base_amount(2, "lbs", "chicken breast"), (MASS, 2 * 453.592))
+        self.assertEqual(to_base_amount("two", "g", "cheese"), (UNKNOWN, 0.0))
+        self.assertEqual(to_base_amount(-1, "g", "cheese"), (UNKNOWN, 0.0))
+
+    def test_recipe_quantities_normalized(self):
+        """Test that index entries carry base-unit amounts."""
+        index = load_ingredient_index(self.db_path)
+        row = index.recipe_ids.tolist().index(1)
+        start, end = index.indptr[row], index.indptr[row + 1]
+        amounts = {
+            index.vocabulary.names[column]: (int(dimension), round(float(amount), 2))
+            for column, dimension, amount in zip(index.indices[start:end], index.entry_dimensions[start:end],
+                                                 index.entry_amounts[start:end])
+        }
+        self.assertEqual(amounts, {
+            "tomato": (MASS, 200.0), "pasta": (MASS, 250.0), "olive oil": (MASS, round(2 * 14.7868 * 0.91, 2))
+        })
+
+    def test_quantity_coverage(self):
+        """Test that fridge amounts are compared with recipe amounts."""
+        import numpy as np
+
+        index = load_ingredient_index(self.db_path)
+        sandwich = index.recipe_ids.tolist().index(2)
+
+        def coverage(*items):
+            return float(index.quantity_coverage(np.array([sandwich]), items)[0])
+
+        self.assertEqual(coverage(("cheese", 200, "g"), ("bread", 1, "slice")), 0.5)
+        self.assertEqual(coverage(("cheese", 200, "g"), ("bread", 3, "slices")), 1.0)
+        self.assertEqual(coverage(("cheese", 0.01, "kg"), ("bread", 3, "slices")), 0.5)
+        self.assertEqual(coverage(("cheese", 1, "cup"), ("bread", 1, "loaf")), 1.0)
+        self.assertEqual(coverage(("cheese", 30, "g"), ("cheese", 30, "g")), 0.5)
+        self.assertEqual(coverage(("tomato", 1, "kg")), 0.0)
+
+    def test_recommendations_report_coverage(self):
+        """Test that leftover recommendations include the quantity coverage."""
+        data = {"ingredients": [
+            {"name": "cheese", "quantity": 45, "unit": "g", "expiration_date": "2030-01-01"},
+            {"name": "bread", "quantity": 2, "unit": "slices", "expiration_date": "2030-01-01"}
+        ]}
+        recommendations = get_leftover_recommendations(self.db_path, json.dumps(data), 2)
+        coverage = {rec["id"]: rec["quantity_coverage"] for rec in recommendations}
+        self.assertEqual(coverage, {2: 0.5, 3: 0.67})
+
+
+if __name__ == "__main__":
+    unittest.main()
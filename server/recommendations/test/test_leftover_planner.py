@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the leftover meal planner.
+"""
+
+import unittest
+import random
+import tempfile
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database
+from ingredient_index import load_ingredient_index
+from leftover_planner import plan_leftover_meals, _item_masks
+from leftover_recommendation import LeftoverIngredient, get_priority_ingredients, PRIORITY_BONUS
+from recipe_filtering import DietaryFilter
+from recommendation_api import RecommendationAPI
+
+
+NAMES = ["Tomato", "Pasta", "Olive Oil", "Cheese", "Bread", "Chicken Breast",
+         "Lettuce", "Eggs", "Eggplant", "Butter", "Tofu", "Rice", "Durian"]
+
+
+class TestLeftoverPlanner(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def fridge(self):
+        return [
+            LeftoverIngredient("Tomato", 1, "piece", "2000-01-01"),
+            LeftoverIngredient("Cheese", 1, "slice", "2000-01-01"),
+            LeftoverIngredient("Chicken Breast", 200, "g", "2100-01-01"),
+            LeftoverIngredient("Eggs", 2, "piece", "2000-01-01"),
+            LeftoverIngredient("Rice", 1, "cup", "2100-01-01"),
+            LeftoverIngredient("Durian", 1, "piece", "2000-01-01"),
+        ]
+
+    def test_plan_covers_expiring_items_first(self):
+        """Test that each meal adds the most expiring items not used by the previous ones."""
+        plan = plan_leftover_meals(self.db_path, self.fridge(), 3)
+
+        self.assertEqual([recipe["id"] for recipe in plan["recipes"]], [3, 6, 8])
+        self.assertEqual(plan["recipes"][0]["uses_first"], ["Tomato", "Cheese"])
+        self.assertEqual(plan["recipes"][2]["uses"], ["Tomato", "Chicken Breast", "Rice"])
+        self.assertEqual(plan["recipes"][2]["uses_first"], ["Chicken Breast", "Rice"])
+        self.assertEqual(plan["uncovered"], ["Durian"])
+        self.assertEqual(plan["uncovered_expiring"], ["Durian"])
+        for recipe in plan["recipes"]:
+            self.assertIn("quantity_coverage", recipe)
+
+    def test_plan_respects_dietary_filter(self):
+        """Test that rejected recipes are replaced by the best allowed ones."""
+        plan = plan_leftover_meals(self.db_path, self.fridge(), 3, DietaryFilter(regime="vegetarian"))
+
+        self.assertEqual([recipe["id"] for recipe in plan["recipes"]], [3, 6, 7])
+        self.assertEqual(set(plan["uncovered"]), {"Chicken Breast", "Durian"})
+
+    def test_plan_stops_when_no_recipe_uses_the_fridge(self):
+        """Test planning with fewer usable recipes than requested."""
+        plan = plan_leftover_meals(self.db_path, [LeftoverIngredient("Durian", 1, "piece", "2000-01-01")], 3)
+        self.assertEqual(plan["recipes"], [])
+        self.assertEqual(plan["uncovered_expiring"], ["Durian"])
+
+        self.assertEqual(plan_leftover_meals(self.db_path, [], 3)["recipes"], [])
+
+    def test_lazy_greedy_matches_full_reevaluation(self):
+        """Test that lazy gains pick the same recipes as re-scoring every recipe at every step."""
+        rng = random.Random(4)
+        index = load_ingredient_index(self.db_path)
+
+        for _ in range(30):
+            leftovers = [
+                LeftoverIngredient(name, 1, "piece", rng.choice(["2000-01-01", "2100-01-01"]))
+                for name in rng.sample(NAMES, rng.randint(1, len(NAMES)))
+            ]
+            number = rng.randint(1, 6)
+
+            priority = [bool(get_priority_ingredients([leftover])) for leftover in leftovers]
+            masks = _item_masks(index, leftovers)
+            uses = {
+                int(recipe_id): {item for item in range(len(leftovers)) if int(masks[row, 0]) >> item & 1}
+                for row, recipe_id in enumerate(index.recipe_ids.tolist())
+            }
+            matched, priority_matched, _ = index.fridge_counts(
+                [leftover.name.lower() for leftover in leftovers], get_priority_ingredients(leftovers)
+            )
+            scores = dict(zip(index.recipe_ids.tolist(),
+                              (matched / index.recipe_sizes + priority_matched * PRIORITY_BONUS).tolist()))
+            covered, expected = set(), []
+            candidates = {recipe_id for recipe_id, items in uses.items() if items}
+            while candidates and len(expected) < number:
+                best = min(candidates, key=lambda recipe_id: (
+                    -sum(priority[item] for item in uses[recipe_id] - covered),
+                    -sum(not priority[item] for item in uses[recipe_id] - covered),
+                    -scores[recipe_id], recipe_id
+                ))
+                expected.append(best)
+                covered |= uses[best]
+                candidates.remove(best)
+
+            plan = plan_leftover_meals(self.db_path, leftovers, number)
+            self.assertEqual([recipe["id"] for recipe in plan["recipes"]], expected)
+
+    def test_api_plan(self):
+        """Test the planner through the API, including input errors."""
+        api = RecommendationAPI(self.db_path)
+        ingredients = [
+            {"name": "Eggs", "quantity": 2, "unit": "piece", "expiration_date": "2000-01-01"},
+            {"name": "Rice", "quantity": 1, "unit": "cup", "expiration_date": "2100-01-01"},
+        ]
+
+        result = api.get_leftover_plan({"ingredients": ingredients}, 2)
+        self.assertEqual(result["type"], "leftover_plan")
+        self.assertEqual([recipe["id"] for recipe in result["recipes"]], [6, 7])
+        self.assertEqual(result["uncovered"], [])
+        self.assertIn("filters_applied", result)
+
+        result = api.get_leftover_plan({"ingredients": [{"name": "Eggs"}]}, 2)
+        self.assertIn("error", result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Unit tests for incremental leftover sessions.
+"""
+
+import unittest
+import json
+import random
+import sqlite3
+import tempfile
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database
+from ingredient_canonical import CanonicalVocabulary
+from ingredient_index import IngredientIndex
+from leftover_recommendation import LeftoverIngredient, top_leftover_recipes
+from leftover_session import LeftoverSession, LeftoverSessionStore
+from recommendation_api import RecommendationAPI
+
+
+class TestLeftoverSession(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def item(self, name, expiration_date="2100-01-01"):
+        return {"name": name, "quantity": 1, "unit": "piece", "expiration_date": expiration_date}
+
+    def test_incremental_updates_match_full_scoring(self):
+        """Test that any sequence of adds and removes ranks like scoring the fridge from scratch."""
+        import numpy as np
+
+        rng = random.Random(2)
+        vocabulary = CanonicalVocabulary({term: f"item{term}" for term in range(30)}, {})
+        sizes = [rng.randint(1, 6) for _ in range(500)]
+        index = IngredientIndex(
+            vocabulary,
+            np.arange(1, len(sizes) + 1, dtype=np.int64),
+            np.concatenate(([0], np.cumsum(sizes))).astype(np.int64),
+            np.array([rng.randrange(30) for _ in range(sum(sizes))], dtype=np.int32)
+        )
+
+        session = LeftoverSession(index)
+        for _ in range(60):
+            if session.leftovers and rng.random() < 0.4:
+                session.remove(rng.choice(list(session.leftovers)))
+            else:
+                expiration = rng.choice(["2000-01-01", "2100-01-01"])
+                session.add(LeftoverIngredient(f"Item{rng.randrange(30)}", 1, "g", expiration))
+
+            fridge = list(session.leftovers.values())
+            for k in (1, 10):
+                expected = top_leftover_recipes(index, fridge, k)
+                for actual, wanted in zip(session.top(k), expected):
+                    self.assertEqual(actual.tolist(), wanted.tolist())
+
+            # Counts are only held for the recipes the fridge matches
+            matched_rows = set(np.flatnonzero(index.fridge_counts(
+                [leftover.name.lower() for leftover in fridge], []
+            )[0]).tolist())
+            self.assertEqual(set(session.matched), matched_rows)
+
+        for name in list(session.leftovers):
+            session.remove(name)
+        self.assertEqual((session.matched, session.priority_matched), ({}, {}))
+
+    def test_store_rebuilds_after_database_change(self):
+        """Test that sessions follow a reloaded ingredient index."""
+        store = LeftoverSessionStore(self.db_path)
+        store.create("h1", [LeftoverIngredient("rice", 1, "cup", "2100-01-01")])
+        self.assertEqual(store.get("h1").top(5)[0].tolist(), [7, 8])
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO RecipeIngredient (recipe_id, ingredient_id, quantity, unit) VALUES (2, 12, 1, 'cup')")
+        conn.commit()
+        conn.close()
+
+        session = store.get("h1")
+        self.assertEqual(session.top(5)[0].tolist(), [7, 2, 8])
+        self.assertIsNone(store.get("unknown"))
+        self.assertTrue(store.close("h1"))
+        self.assertIsNone(store.get("h1"))
+
+    def test_store_expires_and_evicts(self):
+        """Test idle expiry and the session limit."""
+        store = LeftoverSessionStore(self.db_path, max_sessions=2, ttl_seconds=0.0)
+        store.create("h1", [])
+        self.assertIsNone(store.get("h1"))
+
+        store = LeftoverSessionStore(self.db_path, max_sessions=2)
+        for household in ("h1", "h2", "h3"):
+            store.create(household, [])
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get("h1"))
+
+    def test_api_session_flow(self):
+        """Test set, add, remove and close through the API."""
+        api = RecommendationAPI(self.db_path)
+
+        result = api.update_leftover_session("h1", "set", {"ingredients": [self.item("cheese")]}, 2)
+        self.assertEqual(result["fridge"], ["cheese"])
+        self.assertEqual([rec["id"] for rec in result["recommendations"]], [2, 3])
+
+        result = api.update_leftover_session("h1", "add", {"ingredient": self.item("Tomato")}, 2)
+        single = api.get_recommendations(
+            "ingredients", json.dumps({"ingredients": [self.item("cheese"), self.item("Tomato")]}), 2
+        )
+        self.assertEqual(result["fridge"], ["cheese", "tomato"])
+        self.assertEqual(result["recommendations"], single["recommendations"])
+
+        result = api.update_leftover_session("h1", "remove", {"name": "cheese", "allergies": ["dairy"]}, 2)
+        self.assertEqual(result["fridge"], ["tomato"])
+        self.assertEqual(result["recommendations"][0]["id"], 1)
+        self.assertEqual(result["filters_applied"]["allergies"], ["dairy"])
+
+        self.assertEqual(api.update_leftover_session("h1", "close", {}), {"household": "h1", "closed": True})
+        self.assertIn("error", api.update_leftover_session("h1", "get", {}))
+        self.assertIn("error", api.update_leftover_session("h1", "explode", {}))
+        self.assertIn("error", api.update_leftover_session("", "set", {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
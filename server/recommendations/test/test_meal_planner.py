@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the daily meal planner.
+"""
+
+import unittest
+import itertools
+import random
+import tempfile
+import os
+import sys
+
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database, RECIPES
+from meal_planner import plan_daily_meals, search_day, deviation_bound, DAY_MEALS
+from nutriment_recommendation import UserProfile, Gender, ActivityLevel, MealType, calculate_nutritional_targets
+from recipe_filtering import DietaryFilter
+from recommendation_api import RecommendationAPI
+
+
+USER = {"age": 30, "gender": "male", "weight": 75.0, "height": 180.0, "activity_level": "moderately_active"}
+
+# id -> (calories, protein, carbs, fat, fiber)
+NUTRIENTS = {recipe[0]: (recipe[7], recipe[12], recipe[10], recipe[8], recipe[11]) for recipe in RECIPES}
+
+
+def brute_force_deviation(shortlists, recipe_ids, daily, costs=None, keys=None, conflicts=None):
+    """Smallest objective over every combination of distinct, non-conflicting candidates."""
+    best = float("inf")
+    for positions in itertools.product(*(range(len(shortlist)) for shortlist in shortlists)):
+        ids = [int(recipe_ids[meal][position]) for meal, position in enumerate(positions)]
+        if len(set(ids)) < len(ids):
+            continue
+        if conflicts is not None:
+            chosen = [int(keys[meal][position]) for meal, position in enumerate(positions)]
+            if any(conflicts[a, b] for a, b in itertools.combinations(chosen, 2)):
+                continue
+        totals = sum(shortlists[meal][position] for meal, position in enumerate(positions))
+        objective = float(deviation_bound(totals, totals, daily))
+        if costs is not None:
+            objective += sum(float(costs[meal][position]) for meal, position in enumerate(positions))
+        best = min(best, objective)
+    return best
+
+
+class TestMealPlanner(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+        self.user = UserProfile(30, Gender.MALE, 75.0, 180.0, ActivityLevel.MODERATELY_ACTIVE)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def daily_targets(self):
+        targets = calculate_nutritional_targets(self.user)
+        return np.array([targets.calories, targets.protein, targets.carbs, targets.fat, targets.fiber])
+
+    def test_deviation(self):
+        """Test the weighted relative deviation, with fiber only counted when short."""
+        daily = np.array([2000.0, 100.0, 250.0, 60.0, 30.0])
+        self.assertAlmostEqual(float(deviation_bound(daily, daily, daily)), 0.0)
+
+        totals = np.array([2200.0, 100.0, 250.0, 60.0, 45.0])
+        self.assertAlmostEqual(float(deviation_bound(totals, totals, daily)), 0.4 * 0.1)
+
+        totals = np.array([2000.0, 50.0, 250.0, 60.0, 15.0])
+        self.assertAlmostEqual(float(deviation_bound(totals, totals, daily)), 0.4 / 3 * 0.5 + 0.1 * 0.5)
+
+        # A range containing the targets is no deviation
+        self.assertAlmostEqual(float(deviation_bound(daily * 0.5, daily * 2, daily)), 0.0)
+
+    def test_search_matches_brute_force(self):
+        """Test that branch-and-bound finds the best combination of distinct candidates."""
+        rng = random.Random(7)
+        daily = self.daily_targets()
+
+        for _ in range(40):
+            meals = rng.randint(1, 4)
+            shortlists, recipe_ids = [], []
+            for _ in range(meals):
+                size = rng.randint(1, 7)
+                shortlists.append(np.array([
+                    [rng.uniform(50, 1200), rng.uniform(0, 60), rng.uniform(0, 150), rng.uniform(0, 50), rng.uniform(0, 12)]
+                    for _ in range(size)
+                ]))
+                # Overlapping ids, so distinctness matters
+                recipe_ids.append(np.array(rng.sample(range(1, 10), size)))
+
+            positions, deviation = search_day(shortlists, recipe_ids, daily)
+            expected = brute_force_deviation(shortlists, recipe_ids, daily)
+            if expected == float("inf"):
+                self.assertEqual(positions, [])
+                continue
+
+            ids = [int(recipe_ids[meal][position]) for meal, position in enumerate(positions)]
+            self.assertEqual(len(set(ids)), meals)
+            totals = sum(shortlists[meal][position] for meal, position in enumerate(positions))
+            self.assertAlmostEqual(float(deviation_bound(totals, totals, daily)), deviation)
+            self.assertAlmostEqual(deviation, expected)
+
+    def test_search_with_costs_and_conflicts(self):
+        """Test that candidate costs and same-day conflicts are searched exactly."""
+        rng = random.Random(11)
+        daily = self.daily_targets()
+
+        for _ in range(40):
+            meals = rng.randint(1, 4)
+            shortlists, recipe_ids, costs, keys = [], [], [], []
+            for _ in range(meals):
+                size = rng.randint(1, 6)
+                shortlists.append(np.array([
+                    [rng.uniform(50, 1200), rng.uniform(0, 60), rng.uniform(0, 150), rng.uniform(0, 50), rng.uniform(0, 12)]
+                    for _ in range(size)
+                ]))
+                recipe_ids.append(np.array(rng.sample(range(1, 10), size)))
+                costs.append(np.array([rng.uniform(-0.3, 0.1) for _ in range(size)]))
+                keys.append(recipe_ids[-1] - 1)
+            conflicts = np.array([[rng.random() < 0.3 for _ in range(9)] for _ in range(9)])
+            conflicts |= conflicts.T
+
+            positions, objective = search_day(shortlists, recipe_ids, daily, costs, keys, conflicts)
+            expected = brute_force_deviation(shortlists, recipe_ids, daily, costs, keys, conflicts)
+            if expected == float("inf"):
+                self.assertEqual(positions, [])
+            else:
+                self.assertEqual(len(positions), meals)
+                self.assertAlmostEqual(objective, expected)
+
+    def test_plan_day(self):
+        """Test that the day plan is the best assignment of distinct recipes to the meals."""
+        plan = plan_daily_meals(self.db_path, self.user)
+
+        self.assertEqual([meal["meal_type"] for meal in plan["meals"]], [meal.value for meal in DAY_MEALS])
+        self.assertEqual(plan["unplanned"], [])
+        ids = [meal["id"] for meal in plan["meals"]]
+        self.assertEqual(len(set(ids)), 4)
+
+        totals = np.sum([NUTRIENTS[recipe_id] for recipe_id in ids], axis=0)
+        self.assertAlmostEqual(plan["totals"]["calories"], totals[0])
+        self.assertAlmostEqual(plan["totals"]["fiber"], totals[4])
+        self.assertAlmostEqual(plan["targets"]["calories"], round(self.daily_targets()[0], 1))
+
+        # Shortlists hold the whole fixture catalogue, so the plan beats every assignment
+        everything = np.array(list(NUTRIENTS.values()))
+        expected = brute_force_deviation([everything] * 4, [np.array(list(NUTRIENTS))] * 4, self.daily_targets())
+        self.assertAlmostEqual(plan["deviation"], round(expected, 4))
+
+    def test_plan_respects_filter_and_exclusions(self):
+        """Test dietary filters, excluded recipes and meals left without candidates."""
+        plan = plan_daily_meals(self.db_path, self.user, DietaryFilter(regime="vegetarian"), exclude=[1])
+        self.assertEqual(len(plan["meals"]), 4)
+        self.assertTrue({meal["id"] for meal in plan["meals"]} <= {2, 3, 5, 6, 7})
+
+        plan = plan_daily_meals(self.db_path, self.user, DietaryFilter(max_calories=100))
+        self.assertEqual(plan["meals"], [])
+        self.assertEqual(plan["unplanned"], [meal.value for meal in DAY_MEALS])
+        self.assertEqual(plan["totals"]["calories"], 0)
+
+    def test_meal_type_is_ignored(self):
+        """Test that the profile's meal type does not scale the daily targets."""
+        lunch = UserProfile(30, Gender.MALE, 75.0, 180.0, ActivityLevel.MODERATELY_ACTIVE, meal_type=MealType.LUNCH)
+        self.assertEqual(plan_daily_meals(self.db_path, lunch), plan_daily_meals(self.db_path, self.user))
+
+    def test_api_meal_plan(self):
+        """Test the planner through the API, including input errors."""
+        api = RecommendationAPI(self.db_path)
+
+        result = api.get_meal_plan(dict(USER, dietary_regime="vegan"))
+        self.assertEqual(result["type"], "meal_plan")
+        # Two vegan recipes: the last meals of the day go unplanned
+        self.assertEqual({meal["id"] for meal in result["meals"]}, {5, 7})
+        self.assertEqual(result["unplanned"], ["dinner", "snack"])
+        self.assertEqual(result["filters_applied"]["dietary_regime"], "vegan")
+
+        result = api.get_meal_plan({"age": 30})
+        self.assertIn("error", result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Unit tests for nearest-neighbour nutrient search on the KD-tree.
+"""
+
+import unittest
+import json
+import math
+import random
+import tempfile
+import sqlite3
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nutriment_recommendation import (
+    ActivityLevel,
+    Gender,
+    MealType,
+    UserProfile,
+    calculate_nutritional_targets,
+    get_nutriment_recommendations,
+    load_nutrition_catalogue,
+    nearest_nutrition_rows
+)
+from nutrient_kdtree import NutrientKDTree
+
+
+class TestNutrientKDTree(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a test database with random recipes."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE Recipe (
+                id INTEGER PRIMARY KEY, name TEXT NOT NULL, total_time INTEGER, images TEXT,
+                calories REAL, protein_content REAL, carbohydrate_content REAL, fat_content REAL,
+                fiber_content REAL, sodium_content REAL, aggregated_rating REAL
+            )
+        """)
+        rng = random.Random(6)
+        conn.executemany("INSERT INTO Recipe VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+            (recipe_id, f"Recipe {recipe_id}", 20, "", rng.uniform(100, 1500), rng.uniform(0, 80),
+             rng.uniform(0, 200), rng.choice([None, rng.uniform(0, 80)]), 5, 500, 4)
+            for recipe_id in range(1, 1501)
+        ])
+        conn.commit()
+        conn.close()
+
+        self.user_data = {
+            "age": 30, "gender": "male", "weight": 75.0, "height": 180.0,
+            "activity_level": "moderately_active", "objective": "nearest"
+        }
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_nearest_matches_brute_force(self):
+        """Test that the tree returns exactly the k nearest points under any weights, ties by id."""
+        import numpy as np
+
+        rng = np.random.default_rng(7)
+        # Rounded coordinates give many equal distances
+        vectors = np.round(rng.uniform(0, 10, (3000, 4)))
+        recipe_ids = np.arange(10, 3010)
+        tree = NutrientKDTree(recipe_ids, vectors)
+
+        for _ in range(20):
+            target = rng.uniform(-2, 12, 4)
+            weights = rng.uniform(0.1, 3, 4)
+            distances = np.sqrt((((vectors - target) * weights) ** 2).sum(axis=1))
+            for k in (1, 7, 50):
+                expected = recipe_ids[np.lexsort((recipe_ids, distances))[:k]].tolist()
+                nearest = tree.nearest(target, k, weights)
+                self.assertEqual([recipe_id for recipe_id, _ in nearest], expected)
+                self.assertAlmostEqual(nearest[-1][1], float(np.sort(distances)[k - 1]))
+
+        self.assertEqual(len(tree.nearest(vectors[0], 5000)), 3000)
+        self.assertEqual(NutrientKDTree(recipe_ids[:0], vectors[:0]).nearest(vectors[0], 3), [])
+
+    def test_meal_type_scaling(self):
+        """Test that nearest recipes follow the meal-scaled targets."""
+        catalogue = load_nutrition_catalogue(self.db_path)
+        for meal_type in (None, MealType.BREAKFAST, MealType.SNACK):
+            targets = calculate_nutritional_targets(
+                UserProfile(30, Gender.MALE, 75.0, 180.0, ActivityLevel.MODERATELY_ACTIVE, meal_type)
+            )
+            target = (targets.calories, targets.protein, targets.carbs, targets.fat)
+            weights = (0.4 / targets.calories, 0.4 / 3 / targets.protein, 0.4 / 3 / targets.carbs, 0.4 / 3 / targets.fat)
+            expected = sorted(
+                (math.sqrt(sum((w * (value - t)) ** 2 for w, value, t in zip(weights, values[:4], target))), row)
+                for row, values in enumerate(catalogue.nutrition.tolist())
+            )[:5]
+
+            rows, distances = nearest_nutrition_rows(catalogue, targets, 5)
+            self.assertEqual(rows, [row for _, row in expected])
+            for distance, (expected_distance, _) in zip(distances, expected):
+                self.assertAlmostEqual(distance, expected_distance)
+
+    def test_nearest_objective(self):
+        """Test nearest-neighbour recommendations, alone and within a tolerance."""
+        recommendations = get_nutriment_recommendations(self.db_path, json.dumps(self.user_data), 5)
+        distances = [rec["nutrient_distance"] for rec in recommendations]
+        self.assertEqual(len(recommendations), 5)
+        self.assertEqual(distances, sorted(distances))
+
+        within = get_nutriment_recommendations(self.db_path, json.dumps(dict(self.user_data, tolerance=0.6)), 5)
+        self.assertGreater(len(within), 0)
+        targets = calculate_nutritional_targets(
+            UserProfile(30, Gender.MALE, 75.0, 180.0, ActivityLevel.MODERATELY_ACTIVE)
+        )
+        for rec in within:
+            for field, target in (("calories", targets.calories), ("protein_content", targets.protein),
+                                  ("carbohydrate_content", targets.carbs), ("fat_content", targets.fat)):
+                self.assertLessEqual(abs((rec[field] or 0) - target), 0.6 * target + 1e-9)
+
+        with self.assertRaises(ValueError):
+            get_nutriment_recommendations(self.db_path, json.dumps(dict(self.user_data, objective="closest")), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
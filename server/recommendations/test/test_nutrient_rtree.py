@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the R*Tree nutrient index.
+"""
+
+import unittest
+import json
+import random
+import tempfile
+import sqlite3
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from nutriment_recommendation import (
+    ActivityLevel,
+    Gender,
+    MealType,
+    UserProfile,
+    calculate_nutritional_targets,
+    get_nutriment_recommendations,
+    load_nutrition_catalogue,
+    nutrient_box_rows
+)
+import nutrient_rtree
+from nutrient_rtree import build_nutrient_rtree, nutrient_rtree_available, query_nutrient_box, target_box
+
+
+class TestNutrientRTree(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a test database with random recipes."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE Recipe (
+                id INTEGER PRIMARY KEY, name TEXT NOT NULL, total_time INTEGER, images TEXT,
+                calories REAL, protein_content REAL, carbohydrate_content REAL, fat_content REAL,
+                fiber_content REAL, sodium_content REAL, aggregated_rating REAL
+            )
+        """)
+        rng = random.Random(3)
+        conn.executemany("INSERT INTO Recipe VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+            (recipe_id, f"Recipe {recipe_id}", 20, "", rng.choice([None, 0, rng.uniform(300, 1200)]),
+             rng.uniform(10, 80), rng.uniform(20, 150), rng.choice([None, rng.uniform(5, 60)]),
+             rng.uniform(0, 15), rng.uniform(0, 1500), rng.uniform(1, 5))
+            for recipe_id in range(1, 2001)
+        ])
+        conn.commit()
+        conn.close()
+
+        self.user = UserProfile(30, Gender.MALE, 75.0, 180.0, ActivityLevel.MODERATELY_ACTIVE, MealType.LUNCH)
+        self.user_data = {
+            "age": 30, "gender": "male", "weight": 75.0, "height": 180.0,
+            "activity_level": "moderately_active", "meal_type": "lunch", "tolerance": 0.5
+        }
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_box_query_matches_scan(self):
+        """Test that the R*Tree finds exactly the recipes a scan finds in the box."""
+        catalogue = load_nutrition_catalogue(self.db_path)
+        targets = calculate_nutritional_targets(self.user)
+        self.assertFalse(nutrient_rtree_available(self.db_path))
+        scanned = nutrient_box_rows(self.db_path, catalogue, targets, 0.5)
+
+        self.assertEqual(build_nutrient_rtree(self.db_path), len(catalogue.recipe_ids))
+        self.assertTrue(nutrient_rtree_available(self.db_path))
+        catalogue = load_nutrition_catalogue(self.db_path)
+        indexed = nutrient_box_rows(self.db_path, catalogue, targets, 0.5)
+
+        self.assertGreater(len(scanned), 0)
+        self.assertEqual(indexed.tolist(), scanned.tolist())
+        box = target_box((targets.calories, targets.protein, targets.carbs, targets.fat), 0.5)
+        self.assertLess(len(query_nutrient_box(self.db_path, box)), len(catalogue.recipe_ids))
+
+        # Changing the database replaces the cached availability of the old version
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO Recipe (id, name) VALUES (5000, 'Water')")
+        conn.commit()
+        conn.close()
+        self.assertTrue(nutrient_rtree_available(self.db_path))
+        path = os.path.abspath(self.db_path)
+        self.assertEqual(len([key for key in nutrient_rtree._table_cache._entries if key[0][0] == path]), 1)
+
+    def test_tolerance_recommendations(self):
+        """Test that a tolerance keeps the ranking of the recipes in the box."""
+        targets = calculate_nutritional_targets(self.user)
+        build_nutrient_rtree(self.db_path)
+
+        recommendations = get_nutriment_recommendations(self.db_path, json.dumps(self.user_data), 5)
+        unrestricted = dict(self.user_data)
+        del unrestricted["tolerance"]
+        ranking = get_nutriment_recommendations(self.db_path, json.dumps(unrestricted), 2000)
+
+        in_box = [
+            rec["id"] for rec in ranking
+            if all(abs((rec[field] or 0) - target) <= 0.5 * target for field, target in (
+                ("calories", targets.calories), ("protein_content", targets.protein),
+                ("carbohydrate_content", targets.carbs), ("fat_content", targets.fat)
+            ))
+        ]
+        self.assertEqual([rec["id"] for rec in recommendations], in_box[:5])
+
+    def test_invalid_tolerance(self):
+        """Test that tolerances must be positive numbers."""
+        for tolerance in (0, -0.1, "10%", True):
+            with self.assertRaises(ValueError):
+                get_nutriment_recommendations(self.db_path, json.dumps(dict(self.user_data, tolerance=tolerance)), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
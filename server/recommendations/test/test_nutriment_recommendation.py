@@ -5,6 +5,7 @@ Unit tests for nutriment recommendation system.
 
 import unittest
 import json
+import random
 import tempfile
 import sqlite3
 import os
@@ -23,7 +24,9 @@ from nutriment_recommendation import (
     calculate_tdee,
     calculate_nutritional_targets,
     calculate_nutrition_score,
-    get_nutriment_recommendations
+    calculate_nutrition_score_matrix,
+    get_nutriment_recommendations,
+    load_nutrition_catalogue
 )
 
 
@@ -399,6 +402,68 @@ class TestNutrimentRecommendation(unittest.TestCase):
                     recommendations[i + 1]["combined_score"]
                 )
     
+    def add_random_recipes(self, count, seed):
+        """Add high-calorie recipes with random nutrition, better rated than the sample ones."""
+        rng = random.Random(seed)
+        self.conn.executemany("INSERT INTO Recipe VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+            (recipe_id, f"Recipe {recipe_id}", 20, "", rng.uniform(1500, 3000), rng.uniform(0, 60),
+             rng.uniform(0, 120), rng.uniform(0, 50), rng.choice([None, rng.uniform(0, 15)]),
+             rng.uniform(0, 1500), rng.choice([None, 4.9, 5.0]))
+            for recipe_id in range(10, 10 + count)
+        ])
+        self.conn.commit()
+
+    def test_vectorized_scores_match_row_scores(self):
+        """Test that scoring the catalogue arrays equals calculate_nutrition_score recipe by recipe."""
+        self.add_random_recipes(50, 1)
+        catalogue = load_nutrition_catalogue(self.db_path)
+        users = [
+            UserProfile(30, Gender.MALE, 75.0, 180.0, ActivityLevel.MODERATELY_ACTIVE, MealType.LUNCH),
+            UserProfile(55, Gender.FEMALE, 60.0, 165.0, ActivityLevel.SEDENTARY)
+        ]
+        targets_list = [calculate_nutritional_targets(user) for user in users]
+
+        nutrition_scores, _ = calculate_nutrition_score_matrix(catalogue.nutrition, catalogue.ratings, targets_list)
+        for user_index, targets in enumerate(targets_list):
+            for row, values in enumerate(catalogue.nutrition.tolist()):
+                recipe_nutrition = dict(zip(
+                    ["calories", "protein_content", "carbohydrate_content", "fat_content", "fiber_content",
+                     "sodium_content"], values
+                ))
+                self.assertAlmostEqual(
+                    nutrition_scores[user_index, row], calculate_nutrition_score(recipe_nutrition, targets)
+                )
+
+    def test_ranks_whole_catalogue(self):
+        """Test that the best fit is found among all recipes, not only the best rated ones."""
+        self.add_random_recipes(80, 2)
+        user_data = {
+            "age": 30, "gender": "male", "weight": 75.0, "height": 180.0,
+            "activity_level": "moderately_active", "meal_type": "lunch"
+        }
+        targets = calculate_nutritional_targets(UserProfile(
+            30, Gender.MALE, 75.0, 180.0, ActivityLevel.MODERATELY_ACTIVE, MealType.LUNCH
+        ))
+        # A perfect fit with the lowest rating of the catalogue
+        self.conn.execute("INSERT INTO Recipe VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            200, "Perfect Fit", 20, "", targets.calories, targets.protein, targets.carbs, targets.fat,
+            targets.fiber, 0, 1.0
+        ))
+        self.conn.commit()
+
+        expected = []
+        for row in self.conn.execute("SELECT * FROM Recipe").fetchall():
+            recipe_nutrition = dict(zip(
+                ["calories", "protein_content", "carbohydrate_content", "fat_content", "fiber_content",
+                 "sodium_content"], [value or 0 for value in row[4:10]]
+            ))
+            combined = calculate_nutrition_score(recipe_nutrition, targets) * 0.7 + (row[10] or 0) / 5.0 * 0.3
+            expected.append((-combined, row[0]))
+
+        recommendations = get_nutriment_recommendations(self.db_path, json.dumps(user_data), 5)
+        self.assertEqual([rec["id"] for rec in recommendations], [recipe_id for _, recipe_id in sorted(expected)[:5]])
+        self.assertIn(200, [rec["id"] for rec in recommendations])
+
     def test_meal_type_adjustment(self):
         """Test that meal type properly adjusts targets."""
         user_data_breakfast = {
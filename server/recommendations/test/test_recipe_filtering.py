@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the dietary filtering system.
+"""
+
+import unittest
+import sqlite3
+import tempfile
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database
+from recipe_filtering import RecipeFilter, DietaryFilter
+import recipe_bitmask
+from recipe_bitmask import build_bitmask_table, bitmask_table_available
+
+
+class TestRecipeFilter(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database and filter."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+        self.filter_system = RecipeFilter(self.db_path)
+        self.all_ids = list(range(1, 9))
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def filtered_ids(self, dietary_filter):
+        return {recipe['id'] for recipe in self.filter_system.get_filtered_recipes(dietary_filter, 100)}
+
+    def test_get_recipes_ingredients(self):
+        """Test that ingredient lists are resolved for a whole candidate set."""
+        ingredients = self.filter_system.get_recipes_ingredients([2, 6, 999])
+
+        self.assertEqual(sorted(ingredients[2]), ["bread", "cheese"])
+        self.assertEqual(sorted(ingredients[6]), ["butter", "eggs"])
+        self.assertEqual(ingredients[999], [])
+        self.assertEqual(sorted(self.filter_system.get_recipe_ingredients(2)), ["bread", "cheese"])
+
+    def test_find_blacklisted_recipes(self):
+        """Test blacklist and allergen checks over a candidate set."""
+        self.assertEqual(
+            self.filter_system.find_blacklisted_recipes(self.all_ids, ["tomato"]), {1, 3, 8}
+        )
+        # Dairy covers cheese and butter
+        self.assertEqual(
+            self.filter_system.find_blacklisted_recipes(self.all_ids, [], ["dairy"]), {2, 3, 6, 8}
+        )
+        self.assertEqual(self.filter_system.find_blacklisted_recipes(self.all_ids, [], []), set())
+        self.assertTrue(self.filter_system.has_blacklisted_ingredients(1, ["tomato"]))
+        self.assertFalse(self.filter_system.has_blacklisted_ingredients(2, ["tomato"]))
+
+    def test_find_blacklisted_recipes_with_preloaded_ingredients(self):
+        """Test that an in-memory ingredient map is used instead of the database."""
+        ingredients = {1: ["peanut butter"], 2: ["rice"]}
+        self.assertEqual(
+            self.filter_system.find_blacklisted_recipes([1, 2], [], ["nuts"], ingredients), {1}
+        )
+
+    def test_blacklisted_ingredients(self):
+        """Test that recipes with a blacklisted ingredient are excluded."""
+        self.assertEqual(self.filtered_ids(DietaryFilter(blacklisted_ingredients=["tomato"])), {2, 4, 5, 6, 7})
+
+    def test_allergies(self):
+        """Test that allergies exclude every ingredient of their group."""
+        # Dairy covers cheese and butter
+        self.assertEqual(self.filtered_ids(DietaryFilter(allergies=["dairy"])), {1, 4, 5, 7})
+
+    def test_combined_filter(self):
+        """Test a regime, an allergy and a blacklist together."""
+        dietary_filter = DietaryFilter(regime="vegetarian", allergies=["eggs"], blacklisted_ingredients=["Bread"])
+        # Substring matching is deliberately conservative: "egg" also excludes eggplant
+        self.assertEqual(self.filtered_ids(dietary_filter), {1, 7})
+
+    def test_filter_recipes_matches_sql_conditions(self):
+        """Test that Python-side filtering agrees with the SQL conditions."""
+        recipes = self.filter_system.get_filtered_recipes(DietaryFilter(), 100)
+        for dietary_filter in (
+            DietaryFilter(blacklisted_ingredients=["tomato"]),
+            DietaryFilter(allergies=["dairy"]),
+            DietaryFilter(regime="vegetarian", allergies=["eggs"], blacklisted_ingredients=["Bread"]),
+        ):
+            python_ids = {recipe['id'] for recipe in self.filter_system.filter_recipes(recipes, dietary_filter)}
+            self.assertEqual(python_ids, self.filtered_ids(dietary_filter))
+
+
+class TestRecipeBitmask(unittest.TestCase):
+
+    FILTERS = [
+        DietaryFilter(regime="vegan"),
+        DietaryFilter(regime="vegetarian", allergies=["eggs"]),
+        DietaryFilter(regime="gluten_free"),
+        DietaryFilter(regime="keto", allergies=["dairy"]),
+        DietaryFilter(allergies=["gluten", "soy"], blacklisted_ingredients=["rice"]),
+    ]
+
+    def setUp(self):
+        """Set up test database with and without the bitmask table."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+        self.filter_system = RecipeFilter(self.db_path)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def filtered_ids(self, dietary_filter):
+        return {recipe['id'] for recipe in self.filter_system.get_filtered_recipes(dietary_filter, 100)}
+
+    def test_bitmask_matches_substring_filtering(self):
+        """Test that building the bitmask table does not change any filter result."""
+        expected = [self.filtered_ids(dietary_filter) for dietary_filter in self.FILTERS]
+        self.assertFalse(bitmask_table_available(self.db_path))
+
+        self.assertEqual(build_bitmask_table(self.db_path), 8)
+        self.assertTrue(bitmask_table_available(self.db_path))
+
+        recipes = self.filter_system.get_filtered_recipes(DietaryFilter(), 100)
+        for dietary_filter, ids in zip(self.FILTERS, expected):
+            self.assertEqual(self.filtered_ids(dietary_filter), ids)
+            python_ids = {recipe['id'] for recipe in self.filter_system.filter_recipes(recipes, dietary_filter)}
+            self.assertEqual(python_ids, ids)
+
+    def test_unindexed_recipes_fall_back_to_substring_checks(self):
+        """Test that recipes added after the build are still filtered correctly."""
+        build_bitmask_table(self.db_path)
+        self.assertTrue(bitmask_table_available(self.db_path))
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO Recipe (id, name, keywords) VALUES (9, 'Cheese Omelette', 'Vegetarian')")
+        conn.execute("INSERT INTO RecipeIngredient (recipe_id, ingredient_id, quantity, unit) VALUES (9, 4, 50, 'g')")
+        conn.commit()
+        conn.close()
+
+        self.assertIn(9, self.filtered_ids(DietaryFilter(regime="vegetarian")))
+        self.assertNotIn(9, self.filtered_ids(DietaryFilter(regime="vegetarian", allergies=["dairy"])))
+
+        # Only the current version of the database stays cached
+        self.assertTrue(bitmask_table_available(self.db_path))
+        path = os.path.abspath(self.db_path)
+        self.assertEqual(len([key for key in recipe_bitmask._table_cache._entries if key[0][0] == path]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the random recipe sampler.
+"""
+
+import unittest
+import json
+import random
+import tempfile
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database
+from recipe_filtering import RecipeFilter, DietaryFilter
+from recipe_sampler import random_order, sample_recipes
+from recommendation_api import RecommendationAPI
+
+
+class TestRecipeSampler(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_random_order_is_a_permutation(self):
+        """Test that the lazy shuffle visits every position exactly once."""
+        order = list(random_order(50, random.Random(1)))
+        self.assertEqual(sorted(order), list(range(50)))
+        self.assertNotEqual(order, list(range(50)))
+
+    def test_seed_makes_samples_reproducible(self):
+        """Test that the same seed draws the same recipes."""
+        first = sample_recipes(self.db_path, "id, name", 4, seed=42)
+        second = sample_recipes(self.db_path, "id, name", 4, seed=42)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len({row[0] for row in first}), 4)
+
+    def test_conditions_applied_to_drawn_ids(self):
+        """Test that only matching recipes are returned, and all of them when asking for more."""
+        conditions, params = RecipeFilter(self.db_path).build_sql_conditions(DietaryFilter(regime="vegan"))
+        rows = sample_recipes(self.db_path, "id", 10, conditions, params, seed=7)
+        self.assertEqual(sorted(row[0] for row in rows), [5, 7])
+
+    def test_seeded_random_recommendations(self):
+        """Test that seeded random API requests are reproducible and cached."""
+        api = RecommendationAPI(self.db_path)
+        data = json.dumps({"seed": 3, "dietary_regime": "vegetarian"})
+
+        first = api.get_recommendations("random", data, 3)
+        second = api.get_recommendations("random", data, 3)
+        uncached = RecommendationAPI(self.db_path, cache_size=0).get_recommendations("random", data, 3)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first, uncached)
+        self.assertEqual(api.cache.stats()["hits"], 1)
+
+    def test_invalid_seed(self):
+        """Test that a non-integer seed is rejected."""
+        result = RecommendationAPI(self.db_path, cache_size=0).get_recommendations(
+            "random", json.dumps({"seed": "abc"}), 3
+        )
+        self.assertIn("error", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
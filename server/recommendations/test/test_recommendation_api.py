@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the RecommendationAPI entry points.
+"""
+
+import unittest
+import json
+import subprocess
+import tempfile
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database
+from recommendation_api import RecommendationAPI
+
+
+class TestRecommendationAPI(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database and API."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+        self.api = RecommendationAPI(self.db_path, cache_size=0)
+
+        self.users = [
+            {"age": 30, "gender": "male", "weight": 75.0, "height": 180.0,
+             "activity_level": "moderately_active", "meal_type": "lunch"},
+            {"age": 55, "gender": "female", "weight": 60.0, "height": 165.0,
+             "activity_level": "sedentary", "meal_type": "breakfast"},
+        ]
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_batch_matches_single_nutriment_calls(self):
+        """Test that the matrix-scored batch returns the same results as single calls."""
+        batch = self.api.get_recommendations_batch(
+            "nutriments", [json.dumps(user) for user in self.users], 3
+        )
+
+        self.assertEqual(batch["count"], 2)
+        for user, result in zip(self.users, batch["results"]):
+            single = self.api.get_recommendations("nutriments", json.dumps(user), 3)
+            self.assertEqual(result, single)
+
+    def test_batch_matches_single_leftover_calls(self):
+        """Test that leftover batches share the catalogue scan without changing results."""
+        fridges = [
+            {"ingredients": [{"name": "tomato", "quantity": 2, "unit": "pieces", "expiration_date": "2030-01-01"}]},
+            {"ingredients": [{"name": "cheese", "quantity": 100, "unit": "g", "expiration_date": "2030-01-01"}]},
+        ]
+        batch = self.api.get_recommendations_batch(
+            "ingredients", [json.dumps(fridge) for fridge in fridges], 2
+        )
+
+        for fridge, result in zip(fridges, batch["results"]):
+            single = self.api.get_recommendations("ingredients", json.dumps(fridge), 2)
+            self.assertEqual(result, single)
+
+    def test_blacklist_applied_during_candidate_generation(self):
+        """Test that blacklisted recipes are never returned, even when they match best."""
+        fridge = {
+            "ingredients": [{"name": "cheese", "quantity": 200, "unit": "g", "expiration_date": "2030-01-01"}],
+            "blacklisted_ingredients": ["cheese"]
+        }
+        result = self.api.get_recommendations("ingredients", json.dumps(fridge), 4)
+
+        recommended_ids = {rec["id"] for rec in result["recommendations"]}
+        self.assertTrue(recommended_ids)
+        self.assertFalse(recommended_ids & {2, 3})
+
+    def test_batch_reports_errors_per_item(self):
+        """Test that one malformed input does not fail the whole batch."""
+        batch = self.api.get_recommendations_batch(
+            "nutriments", [json.dumps(self.users[0]), "{not json"], 2
+        )
+
+        self.assertIn("recommendations", batch["results"][0])
+        self.assertIn("error", batch["results"][1])
+
+    def test_batch_isolates_invalid_profiles(self):
+        """Test that a profile with non-numeric fields fails alone, not its whole group."""
+        bad_users = [dict(self.users[0], age="thirty"), dict(self.users[0], weight=True), dict(self.users[0], height=None)]
+        batch = self.api.get_recommendations_batch(
+            "nutriments", [json.dumps(user) for user in [self.users[0]] + bad_users + [self.users[1]]], 3
+        )
+
+        self.assertEqual(batch["results"][0], self.api.get_recommendations("nutriments", json.dumps(self.users[0]), 3))
+        self.assertEqual(batch["results"][4], self.api.get_recommendations("nutriments", json.dumps(self.users[1]), 3))
+        for result in batch["results"][1:4]:
+            self.assertTrue(result["error"].startswith("Invalid input data"))
+
+    def test_batch_unknown_type(self):
+        """Test that an unknown type is rejected up front."""
+        batch = self.api.get_recommendations_batch("astrology", ["{}"], 2)
+        self.assertIn("error", batch)
+        self.assertIn("valid_types", batch)
+
+    def test_non_preference_requests_skip_heavy_imports(self):
+        """Test that requests in a fresh interpreter only load the engines they use."""
+        src_dir = os.path.join(os.path.dirname(__file__), '..', 'src')
+        # Nutriment scoring runs on numpy arrays; random requests need neither numpy nor pandas
+        for recommendation_type, data, expected in (
+            ("nutriments", self.users[0], [False, True]),
+            ("random", {}, [False, False]),
+        ):
+            script = (
+                "import json, sys\n"
+                f"sys.path.insert(0, {src_dir!r})\n"
+                "from recommendation_api import RecommendationAPI\n"
+                f"RecommendationAPI({self.db_path!r}).get_recommendations({recommendation_type!r}, {json.dumps(data)!r}, 2)\n"
+                "print(json.dumps(['pandas' in sys.modules, 'numpy' in sys.modules]))\n"
+            )
+            output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+            self.assertEqual(json.loads(output.stdout), expected)
+
+if __name__ == "__main__":
+    unittest.main()
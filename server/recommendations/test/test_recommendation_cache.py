@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the recommendation result cache.
+"""
+
+import unittest
+import json
+import sqlite3
+import tempfile
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database
+from recipe_filtering import DietaryFilter
+from recommendation_api import RecommendationAPI
+from recommendation_cache import RecommendationCache, recommendation_cache_key
+
+
+class TestRecommendationCache(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+        self.user = {
+            "age": 30, "gender": "male", "weight": 75.0, "height": 180.0,
+            "activity_level": "moderately_active", "meal_type": "lunch"
+        }
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_key_ignores_order_and_case(self):
+        """Test that equivalent requests share one cache key."""
+        fridge_a = {"ingredients": [
+            {"name": "Tomato", "quantity": 2, "unit": "pieces", "expiration_date": "2030-01-01"},
+            {"name": "cheese", "quantity": 200, "unit": "g", "expiration_date": "2030-01-02"}
+        ], "allergies": ["nuts", "dairy"]}
+        fridge_b = {"ingredients": list(reversed([
+            {"name": "tomato", "quantity": 2, "unit": "pieces", "expiration_date": "2030-01-01"},
+            {"name": "cheese", "quantity": 200, "unit": "g", "expiration_date": "2030-01-02"}
+        ])), "allergies": ["dairy", "nuts"]}
+
+        key_a = recommendation_cache_key("ingredients", fridge_a, 5, DietaryFilter(allergies=["nuts", "dairy"]))
+        key_b = recommendation_cache_key("ingredients", fridge_b, 5, DietaryFilter(allergies=["dairy", "nuts"]))
+        self.assertEqual(key_a, key_b)
+
+        key_c = recommendation_cache_key("ingredients", fridge_a, 3, DietaryFilter(allergies=["nuts", "dairy"]))
+        self.assertNotEqual(key_a, key_c)
+
+    def test_unseeded_random_is_not_cached(self):
+        """Test that random requests without a seed never get a key."""
+        self.assertIsNone(recommendation_cache_key("random", {}, 5, DietaryFilter()))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = RecommendationCache(self.db_path, max_entries=2)
+        cache.put(("a",), {"value": 1})
+        cache.put(("b",), {"value": 2})
+        cache.get(("a",))
+        cache.put(("c",), {"value": 3})
+
+        self.assertIsNotNone(cache.get(("a",)))
+        self.assertIsNone(cache.get(("b",)))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        """Test that expired entries count as misses."""
+        cache = RecommendationCache(self.db_path, ttl_seconds=-1)
+        cache.put(("a",), {"value": 1})
+        self.assertIsNone(cache.get(("a",)))
+
+    def test_returned_values_are_copies(self):
+        """Test that callers cannot modify cached entries."""
+        cache = RecommendationCache(self.db_path)
+        cache.put(("a",), {"items": [1]})
+        cache.get(("a",))["items"].append(2)
+        self.assertEqual(cache.get(("a",)), {"items": [1]})
+
+    def test_database_change_invalidates(self):
+        """Test that writing to the database drops cached results."""
+        cache = RecommendationCache(self.db_path)
+        cache.put(("a",), {"value": 1})
+        self.assertIsNotNone(cache.get(("a",)))
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE Recipe SET name = 'Renamed' WHERE id = 1")
+        conn.commit()
+        conn.close()
+
+        self.assertIsNone(cache.get(("a",)))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_api_serves_repeated_requests_from_cache(self):
+        """Test hit/miss counting through the API."""
+        api = RecommendationAPI(self.db_path)
+        first = api.get_recommendations("nutriments", json.dumps(self.user), 3)
+        second = api.get_recommendations("nutriments", json.dumps(self.user), 3)
+
+        self.assertEqual(first, second)
+        stats = api.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_api_cache_can_be_disabled(self):
+        """Test that cache_size=0 turns caching off."""
+        api = RecommendationAPI(self.db_path, cache_size=0)
+        self.assertIsNone(api.cache)
+        result = api.get_recommendations("nutriments", json.dumps(self.user), 3)
+        self.assertIn("recommendations", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
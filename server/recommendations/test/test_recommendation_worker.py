@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the long-lived recommendation worker.
+"""
+
+import unittest
+import io
+import json
+import signal
+import socket
+import subprocess
+import tempfile
+import time
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database
+from recommendation_api import RecommendationAPI
+from recommendation_worker import RecommendationWorker
+
+
+class TestRecommendationWorker(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database and worker."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+        self.worker = RecommendationWorker(RecommendationAPI(self.db_path))
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_ping(self):
+        """Test the ping method reports the serving process."""
+        response = self.worker.handle_request({"id": 1, "method": "ping"})
+        self.assertEqual(response["id"], 1)
+        self.assertEqual(response["result"]["status"], "ok")
+
+    def test_recommend_with_object_data(self):
+        """Test a nutriments request with embedded JSON data."""
+        response = self.worker.handle_request({
+            "id": "a",
+            "method": "recommend",
+            "type": "nutriments",
+            "data": {
+                "age": 30, "gender": "male", "weight": 75.0, "height": 180.0,
+                "activity_level": "moderately_active", "meal_type": "lunch"
+            },
+            "number": 3
+        })
+
+        self.assertEqual(response["id"], "a")
+        result = response["result"]
+        self.assertEqual(result["type"], "nutriments")
+        self.assertLessEqual(len(result["recommendations"]), 3)
+
+    def test_recommend_with_string_data(self):
+        """Test that data may also be passed as a JSON string like the CLI."""
+        response = self.worker.handle_request({
+            "id": 2,
+            "type": "random",
+            "data": json.dumps({}),
+            "number": 2
+        })
+        self.assertIn("result", response)
+        self.assertEqual(response["result"]["type"], "random")
+
+    def test_autocomplete(self):
+        """Test ingredient completions through the protocol."""
+        response = self.worker.handle_request({"id": 4, "method": "autocomplete", "prefix": "Egg", "limit": 1})
+        self.assertEqual(response["result"]["prefix"], "Egg")
+        self.assertEqual([completion["name"] for completion in response["result"]["completions"]], ["eggplant"])
+
+        response = self.worker.handle_request({"id": 5, "method": "autocomplete"})
+        self.assertIn("error", response)
+
+    def test_leftover_session(self):
+        """Test incremental leftover updates through the protocol."""
+        ingredient = {"name": "rice", "quantity": 1, "unit": "cup", "expiration_date": "2100-01-01"}
+        response = self.worker.handle_request({
+            "id": 6, "method": "leftover_session", "household": "h1", "action": "set",
+            "data": {"ingredients": [ingredient]}, "number": 2
+        })
+        self.assertEqual([rec["id"] for rec in response["result"]["recommendations"]], [7, 8])
+
+        response = self.worker.handle_request({
+            "id": 7, "method": "leftover_session", "household": "h1", "action": "remove",
+            "data": {"name": "rice"}, "number": 2
+        })
+        self.assertEqual(response["result"]["fridge"], [])
+
+    def test_leftover_plan(self):
+        """Test meal planning through the protocol."""
+        ingredient = {"name": "eggs", "quantity": 2, "unit": "piece", "expiration_date": "2000-01-01"}
+        response = self.worker.handle_request({
+            "id": 8, "method": "leftover_plan", "data": {"ingredients": [ingredient]}, "number": 2
+        })
+        self.assertEqual([recipe["id"] for recipe in response["result"]["recipes"]], [6])
+        self.assertEqual(response["result"]["covered"], ["eggs"])
+
+        response = self.worker.handle_request({"id": 9, "method": "leftover_plan", "data": []})
+        self.assertIn("error", response)
+
+    def test_meal_plan(self):
+        """Test daily meal planning through the protocol."""
+        user = {"age": 30, "gender": "female", "weight": 60.0, "height": 165.0, "activity_level": "sedentary"}
+        response = self.worker.handle_request({"id": 10, "method": "meal_plan", "data": user})
+        self.assertEqual([meal["meal_type"] for meal in response["result"]["meals"]],
+                         ["breakfast", "lunch", "dinner", "snack"])
+        self.assertEqual(response["result"]["type"], "meal_plan")
+
+        response = self.worker.handle_request({"id": 11, "method": "meal_plan", "data": []})
+        self.assertIn("error", response)
+
+    def test_weekly_plan(self):
+        """Test weekly meal planning through the protocol."""
+        user = {"age": 30, "gender": "female", "weight": 60.0, "height": 165.0, "activity_level": "sedentary"}
+        response = self.worker.handle_request({"id": 12, "method": "weekly_plan", "data": user, "days": 2})
+        self.assertEqual([day["day"] for day in response["result"]["days"]], [1, 2])
+        ids = [meal["id"] for day in response["result"]["days"] for meal in day["meals"]]
+        self.assertEqual(len(ids), len(set(ids)))
+
+        response = self.worker.handle_request({"id": 13, "method": "weekly_plan", "data": user, "days": "many"})
+        self.assertIn("error", response)
+
+    def test_shopping_list(self):
+        """Test shopping lists through the protocol."""
+        response = self.worker.handle_request({"id": 14, "method": "shopping_list", "data": {"recipe_ids": [1, 1]}})
+        items = {item["name"]: item for item in response["result"]["items"]}
+        self.assertEqual(items["pasta"]["quantities"], [{"amount": 500.0, "unit": "g"}])
+
+        response = self.worker.handle_request({"id": 15, "method": "shopping_list", "data": "[1]"})
+        self.assertIn("error", response)
+
+    def test_unknown_method(self):
+        """Test error response for unknown methods."""
+        response = self.worker.handle_request({"id": 3, "method": "explode"})
+        self.assertIn("error", response)
+
+    def test_invalid_json_line(self):
+        """Test that a malformed line produces an error response instead of crashing."""
+        response = json.loads(self.worker.handle_line("not json"))
+        self.assertIsNone(response["id"])
+        self.assertIn("error", response)
+
+    def test_serve_stream(self):
+        """Test serving several requests over one stream."""
+        requests = [
+            {"id": 1, "method": "ping"},
+            {"id": 2, "type": "random", "data": {}, "number": 1},
+        ]
+        infile = io.StringIO("\n".join(json.dumps(r) for r in requests) + "\n\n")
+        outfile = io.StringIO()
+
+        self.worker.serve_stream(infile, outfile)
+
+        responses = [json.loads(line) for line in outfile.getvalue().splitlines()]
+        self.assertEqual([r["id"] for r in responses], [1, 2])
+
+
+class TestPreforkPool(unittest.TestCase):
+
+    def setUp(self):
+        """Start a pre-forked worker pool on a temporary socket."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "homeal.db")
+        self.socket_path = os.path.join(self.tmp_dir, "worker.sock")
+        create_test_database(self.db_path)
+
+        worker_script = os.path.join(os.path.dirname(__file__), '..', 'src', 'recommendation_worker.py')
+        self.process = subprocess.Popen([
+            sys.executable, worker_script,
+            "--socket", self.socket_path, "--workers", "2", "--db", self.db_path
+        ])
+
+        deadline = time.time() + 10
+        while not os.path.exists(self.socket_path) and time.time() < deadline:
+            time.sleep(0.05)
+
+    def tearDown(self):
+        """Stop the pool and clean up."""
+        self.process.send_signal(signal.SIGTERM)
+        self.process.wait(timeout=10)
+        os.unlink(self.db_path)
+        os.rmdir(self.tmp_dir)
+
+    def send(self, request):
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(self.socket_path)
+        try:
+            client.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            return json.loads(client.makefile().readline())
+        finally:
+            client.close()
+
+    def test_children_share_the_socket(self):
+        """Test that requests are answered by forked children, not the parent."""
+        pids = {self.send({"id": i, "method": "ping"})["result"]["pid"] for i in range(10)}
+        self.assertNotIn(self.process.pid, pids)
+        self.assertLessEqual(len(pids), 2)
+
+    def test_preference_request(self):
+        """Test a preference request served from the preloaded review profiles."""
+        response = self.send({
+            "id": 1,
+            "type": "preferences",
+            "data": {"user_id": 999, "ratings": [
+                {"recipe_id": 1, "rating": 5.0}, {"recipe_id": 3, "rating": 5.0}
+            ]},
+            "number": 2
+        })
+        recommended_ids = [rec["id"] for rec in response["result"]["recommendations"]]
+        self.assertTrue(recommended_ids)
+        self.assertNotIn(1, recommended_ids)
+
+    def test_leftover_sessions_are_refused(self):
+        """Test that session requests fail clearly instead of depending on which child answers."""
+        response = self.send({"id": 1, "method": "leftover_session", "household": "h1", "action": "set",
+                              "data": {"ingredients": []}})
+        self.assertIn("--workers", response["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shopping list of planned meals.
+"""
+
+import unittest
+import sqlite3
+import tempfile
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database
+from ingredient_units import to_base_amount
+from leftover_recommendation import LeftoverIngredient
+from recipe_filtering import SQL_CHUNK_SIZE
+from recommendation_api import RecommendationAPI
+from shopping_list import build_shopping_list
+
+
+class TestShoppingList(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def items(self, shopping_list):
+        return {item["name"]: item for item in shopping_list["items"]}
+
+    def test_aggregates_and_normalizes(self):
+        """Test that quantities add up across recipes and units, repeated recipes counting twice."""
+        items = self.items(build_shopping_list(self.db_path, [1, 4, 5, 8, 8]))
+
+        # 200 g in Tomato Pasta and twice 400 g in Butter Chicken
+        self.assertEqual(items["tomato"]["quantities"], [{"amount": 1000.0, "unit": "g"}])
+        self.assertEqual(items["tomato"]["recipe_ids"], [1, 8])
+        self.assertEqual(items["chicken breast"]["quantities"], [{"amount": 1300.0, "unit": "g"}])
+
+        # 2 + 1 + 2 tbsp of olive oil, weighed like the ingredient index does
+        _, tablespoon = to_base_amount(1, "tbsp", "olive oil")
+        self.assertEqual(items["olive oil"]["quantities"], [{"amount": round(5 * tablespoon, 2), "unit": "g"}])
+        self.assertEqual(items["lettuce"]["quantities"], [{"amount": 1.0, "unit": "head"}])
+        self.assertEqual(list(items), sorted(items))
+        self.assertFalse(any(item["in_fridge"] for item in items.values()))
+
+    def test_fridge_is_subtracted(self):
+        """Test that fridge stock is taken off in comparable units only."""
+        fridge = [
+            LeftoverIngredient("Tomato", 300, "g", "2099-01-01"),
+            LeftoverIngredient("Chicken", 1, "kg", "2099-01-01"),
+            LeftoverIngredient("Butter", 1, "stick", "2099-01-01"),
+            LeftoverIngredient("Durian", 1, "piece", "2099-01-01"),
+        ]
+        shopping_list = build_shopping_list(self.db_path, [1, 8, 8], fridge)
+        items = self.items(shopping_list)
+
+        self.assertEqual(items["tomato"]["quantities"], [{"amount": 700.0, "unit": "g"}])
+        self.assertTrue(items["tomato"]["in_fridge"])
+        # Sticks and grams are not comparable: the butter is still bought, flagged
+        self.assertEqual(items["butter"]["quantities"], [{"amount": 100.0, "unit": "g"}])
+        self.assertTrue(items["butter"]["in_fridge"])
+        self.assertFalse(items["pasta"]["in_fridge"])
+        self.assertEqual(shopping_list["covered"], ["chicken breast"])
+        self.assertNotIn("chicken breast", items)
+
+    def test_unknown_units_and_missing_recipes(self):
+        """Test units without conversion, unusable quantities and recipes without ingredients."""
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany(
+            "INSERT INTO RecipeIngredient (recipe_id, ingredient_id, quantity, unit) VALUES (?, ?, ?, ?)",
+            [(20, 4, 1, "pinch"), (21, 4, 2, "Pinch"), (21, 5, 2, "loaf"), (22, 5, -1, "loaf")]
+        )
+        conn.commit()
+        conn.close()
+
+        shopping_list = build_shopping_list(self.db_path, [2, 20, 21, 22, 99])
+        items = self.items(shopping_list)
+        self.assertEqual(items["cheese"]["quantities"], [{"amount": 50.0, "unit": "g"}, {"amount": 3.0, "unit": "pinch"}])
+        self.assertEqual(items["bread"]["quantities"], [{"amount": 2.0, "unit": "slice"}, {"amount": None, "unit": "loaf"}])
+        self.assertEqual(shopping_list["missing_recipe_ids"], [99])
+
+        # Plans longer than one query chunk; recipes 1 to 8 and 20 to 22 have ingredients
+        ids = list(range(1, SQL_CHUNK_SIZE + 10)) + [8]
+        shopping_list = build_shopping_list(self.db_path, ids)
+        self.assertEqual(self.items(shopping_list)["tomato"]["quantities"],
+                         [{"amount": 1000.0, "unit": "g"}, {"amount": 1.0, "unit": "piece"}])
+        self.assertNotIn(8, shopping_list["missing_recipe_ids"])
+        self.assertEqual(len(shopping_list["missing_recipe_ids"]), len(ids) - 12)
+
+    def test_unusable_quantity_first(self):
+        """Test an ingredient whose first unconvertible quantity is unusable."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "INSERT INTO RecipeIngredient (recipe_id, ingredient_id, quantity, unit) VALUES (?, ?, ?, ?)",
+            (20, 7, "a pinch", "")
+        )
+        conn.commit()
+        conn.close()
+
+        items = self.items(build_shopping_list(self.db_path, [20]))
+        self.assertEqual(items["lettuce"]["quantities"], [{"amount": None, "unit": ""}])
+
+        result = RecommendationAPI(self.db_path).get_shopping_list({"recipe_ids": [4, 20]})
+        self.assertNotIn("error", result)
+        self.assertEqual(self.items(result)["lettuce"]["quantities"],
+                         [{"amount": 1.0, "unit": "head"}, {"amount": None, "unit": ""}])
+
+    def test_api_shopping_list(self):
+        """Test the shopping list through the API, including input errors."""
+        api = RecommendationAPI(self.db_path)
+
+        result = api.get_shopping_list({
+            "recipe_ids": [7],
+            "ingredients": [{"name": "Rice", "quantity": 1, "unit": "kg", "expiration_date": "2099-01-01"}]
+        })
+        self.assertEqual(result["type"], "shopping_list")
+        self.assertEqual([item["name"] for item in result["items"]], ["tofu"])
+        self.assertEqual(result["covered"], ["rice"])
+
+        for data in ({}, {"recipe_ids": 7}, {"recipe_ids": ["7"]}, {"recipe_ids": [True]}):
+            result = api.get_shopping_list(data)
+            self.assertIn("error", result)
+            self.assertEqual(result["type"], "shopping_list")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the weekly meal planner.
+"""
+
+import unittest
+import itertools
+import tempfile
+import os
+import sys
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from fixtures import create_test_database, RECIPE_INGREDIENTS
+import meal_planner
+from meal_planner import plan_daily_meals
+from week_planner import plan_weekly_meals, MAX_DAYS
+from leftover_recommendation import LeftoverIngredient
+from nutriment_recommendation import UserProfile, Gender, ActivityLevel
+from recipe_filtering import DietaryFilter
+from recommendation_api import RecommendationAPI
+
+
+USER = {"age": 30, "gender": "male", "weight": 75.0, "height": 180.0, "activity_level": "moderately_active"}
+
+# recipe id -> ingredient ids
+INGREDIENTS = {
+    recipe_id: {ingredient_id for other_id, ingredient_id, _, _ in RECIPE_INGREDIENTS if other_id == recipe_id}
+    for recipe_id, _, _, _ in RECIPE_INGREDIENTS
+}
+
+
+class TestWeekPlanner(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test database."""
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        create_test_database(self.db_path)
+        self.user = UserProfile(30, Gender.MALE, 75.0, 180.0, ActivityLevel.MODERATELY_ACTIVE)
+
+    def tearDown(self):
+        """Clean up test database."""
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def planned_ids(self, plan):
+        return [[meal["id"] for meal in day["meals"]] for day in plan["days"]]
+
+    def test_no_repeats_and_overlap_limit(self):
+        """Test that recipes are never repeated and same-day meals share few ingredients."""
+        for limit in (0, 1):
+            plan = plan_weekly_meals(self.db_path, self.user, days=3, max_shared_ingredients=limit)
+            self.assertEqual([day["day"] for day in plan["days"]], [1, 2, 3])
+
+            ids = [recipe_id for day in self.planned_ids(plan) for recipe_id in day]
+            self.assertEqual(len(ids), len(set(ids)))
+            for day in self.planned_ids(plan):
+                for first, second in itertools.combinations(day, 2):
+                    self.assertLessEqual(len(INGREDIENTS[first] & INGREDIENTS[second]), limit)
+
+        # Chicken Salad and Butter Chicken share chicken: never on the same day without overlap
+        plan = plan_weekly_meals(self.db_path, self.user, days=2, max_shared_ingredients=0)
+        for day in self.planned_ids(plan):
+            self.assertFalse({4, 8} <= set(day))
+
+    def test_days_match_successive_daily_plans(self):
+        """Test that masking the pools plans each day like a daily plan excluding earlier days."""
+        plan = plan_weekly_meals(self.db_path, self.user, days=2, max_shared_ingredients=99)
+
+        earlier = []
+        for day in plan["days"]:
+            expected = plan_daily_meals(self.db_path, self.user, exclude=earlier)
+            self.assertEqual([meal["id"] for meal in day["meals"]], [meal["id"] for meal in expected["meals"]])
+            self.assertEqual(day["unplanned"], expected["unplanned"])
+            self.assertEqual(day["deviation"], expected["deviation"])
+            earlier += [meal["id"] for meal in day["meals"]]
+        self.assertEqual(plan["targets"], expected["targets"])
+
+    def test_leftovers_are_used_up(self):
+        """Test that fridge items are planned early and reported once used."""
+        fridge = [
+            LeftoverIngredient("Tofu", 200, "g", "2000-01-01"),
+            LeftoverIngredient("Eggplant", 1, "piece", "2000-01-01"),
+            LeftoverIngredient("Durian", 1, "piece", "2000-01-01"),
+        ]
+        plan = plan_weekly_meals(self.db_path, self.user, fridge, days=1)
+
+        meals = {meal["id"]: meal for meal in plan["days"][0]["meals"]}
+        self.assertEqual(meals[7]["uses"], ["Tofu"])
+        self.assertEqual(meals[5]["uses"], ["Eggplant"])
+        self.assertEqual(plan["leftovers_used"], ["Tofu", "Eggplant"])
+        self.assertEqual(plan["leftovers_unused"], ["Durian"])
+
+        # Without the fridge those recipes are not worth it
+        plain = plan_weekly_meals(self.db_path, self.user, days=1)
+        self.assertFalse({5, 7} <= set(self.planned_ids(plain)[0]))
+        self.assertEqual(plain["leftovers_used"], [])
+
+    def test_filters_and_short_catalogues(self):
+        """Test dietary filters and weeks longer than the allowed recipes last."""
+        plan = plan_weekly_meals(self.db_path, self.user, dietary_filter=DietaryFilter(regime="vegetarian"), days=3)
+
+        ids = [recipe_id for day in self.planned_ids(plan) for recipe_id in day]
+        self.assertTrue(set(ids) <= {1, 2, 3, 5, 6, 7})
+        self.assertEqual(plan["days"][2]["meals"], [])
+        self.assertEqual(plan["days"][2]["unplanned"], ["breakfast", "lunch", "dinner", "snack"])
+
+    def test_pools_are_cached(self):
+        """Test that repeated plans reuse the candidate pools."""
+        plan_weekly_meals(self.db_path, self.user, days=2)
+        cached = len(meal_planner._pool_cache)
+        plan_weekly_meals(self.db_path, self.user, days=2)
+        self.assertEqual(len(meal_planner._pool_cache), cached)
+
+    def test_invalid_arguments(self):
+        """Test the days and overlap limit checks."""
+        for days in (0, MAX_DAYS + 1, 1.5, True):
+            with self.assertRaises(ValueError):
+                plan_weekly_meals(self.db_path, self.user, days=days)
+        with self.assertRaises(ValueError):
+            plan_weekly_meals(self.db_path, self.user, days=1, max_shared_ingredients=-1)
+
+    def test_api_weekly_plan(self):
+        """Test the planner through the API, including input errors."""
+        api = RecommendationAPI(self.db_path)
+        data = dict(USER, ingredients=[{"name": "Tofu", "quantity": 1, "unit": "g", "expiration_date": "2000-01-01"}])
+
+        result = api.get_weekly_plan(data, 2)
+        self.assertEqual(result["type"], "weekly_plan")
+        self.assertEqual(len(result["days"]), 2)
+        self.assertEqual(result["leftovers_used"], ["Tofu"])
+        self.assertIn("filters_applied", result)
+
+        self.assertIn("error", api.get_weekly_plan(data, 0))
+        self.assertIn("error", api.get_weekly_plan(dict(data, max_shared_ingredients="two"), 2))
+        self.assertIn("error", api.get_weekly_plan({"age": 30}, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()